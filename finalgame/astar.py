@@ -1,13 +1,62 @@
 # astar.py - A* pathfinding algorithm
+import heapq
+from array import array
+from collections import OrderedDict
 from queue import PriorityQueue
+from config import ASTAR_ENGINE, PATH_CACHE_SIZE
+from layout_cache import LayoutCache
+from maze_grid import as_maze_grid, wall_changes
+
+# Instrumentation levels: how much a search records about the nodes it expands
+INSTRUMENT_NONE = 0  # Nothing, for production searches
+INSTRUMENT_COUNTS = 1  # Only the number of expansions, added to search_counters
+INSTRUMENT_FULL = 2  # The full explored set, for debug visualization
+
+# Returned in place of the explored set when it is not collected
+NO_EXPLORED = frozenset()
+
+class SearchCounters:
+    """Running totals of searches and node expansions"""
+    def __init__(self):
+        self.searches = 0
+        self.expanded = 0
+        self.last_expanded = 0
+
+    def record(self, expansions):
+        """Add one search that expanded the given number of nodes"""
+        self.searches += 1
+        self.expanded += expansions
+        self.last_expanded = expansions
+
+    def clear(self):
+        """Reset the counters"""
+        self.searches = 0
+        self.expanded = 0
+        self.last_expanded = 0
+
+    def stats(self):
+        """Get the counters and the mean expansions per search"""
+        return {
+            "searches": self.searches,
+            "expanded": self.expanded,
+            "last_expanded": self.last_expanded,
+            "mean_expanded": self.expanded / self.searches if self.searches else 0.0,
+        }
+
+search_counters = SearchCounters()
 
 def heuristic(a, b):
     """Calculate the Manhattan distance between two points"""
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def a_star(start, goal, maze, grid_width, grid_height, allow_diagonal=False):
+def diagonal_heuristic(a, b):
+    """Calculate the Chebyshev distance between two points (moves when diagonals cost 1)"""
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+def a_star_reference(start, goal, maze, grid_width, grid_height, allow_diagonal=False,
+                     instrument=INSTRUMENT_FULL, estimator=None):
     """
-    A* pathfinding algorithm
+    A* pathfinding algorithm (reference engine)
     Args:
         start: Tuple (x, y) of starting position
         goal: Tuple (x, y) of target position
@@ -15,6 +64,8 @@ def a_star(start, goal, maze, grid_width, grid_height, allow_diagonal=False):
         grid_width: Width of the grid
         grid_height: Height of the grid
         allow_diagonal: Whether diagonal movement is allowed
+        instrument: INSTRUMENT_* level of detail to record
+        estimator: Optional heuristic object (see a_star), Manhattan by default
     Returns:
         List of coordinates representing the path from start to goal
     """
@@ -32,11 +83,16 @@ def a_star(start, goal, maze, grid_width, grid_height, allow_diagonal=False):
     # Cost from start to each node
     g_score = {start: 0}
     
+    # Manhattan distance overestimates once diagonal moves are allowed
+    estimate = diagonal_heuristic if allow_diagonal else heuristic
+    if estimator is not None:
+        bound = estimator.for_goal(goal, start)
+
+        def estimate(cell, goal):
+            return bound(cell[1] * grid_width + cell[0])
+
     # Estimated total cost from start to goal through each node
-    f_score = {start: heuristic(start, goal)}
-    
-    # Keep track of nodes in open set for faster lookup
-    open_set_hash = {start}
+    f_score = {start: estimate(start, goal)}
     
     # Define movement directions
     if allow_diagonal:
@@ -45,15 +101,20 @@ def a_star(start, goal, maze, grid_width, grid_height, allow_diagonal=False):
     else:
         directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
     
-    explored_paths = set()  # For visualization
+    collect = instrument == INSTRUMENT_FULL
+    explored_paths = set() if collect else NO_EXPLORED  # For visualization
+    expansions = 0
     
     while not open_set.empty():
         # Get the node with lowest f_score
         current_f, current = open_set.get()
-        open_set_hash.remove(current)
+        if current_f > f_score[current]:
+            continue  # Stale entry, the node was queued again with a lower score
+        expansions += 1
         
         # Add current to explored paths for visualization
-        explored_paths.add(current)
+        if collect:
+            explored_paths.add(current)
         
         # Check if we reached the goal
         if current == goal:
@@ -64,6 +125,8 @@ def a_star(start, goal, maze, grid_width, grid_height, allow_diagonal=False):
                 path.append(temp)
                 temp = came_from[temp]
             path.reverse()
+            if instrument:
+                search_counters.record(expansions)
             return path, explored_paths
         
         # Check neighbors
@@ -84,17 +147,333 @@ def a_star(start, goal, maze, grid_width, grid_height, allow_diagonal=False):
                     # Update path info
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + heuristic(neighbor, goal)
+                    f_score[neighbor] = tentative_g + estimate(neighbor, goal)
                     
-                    # Add to open set if not already there
-                    if neighbor not in open_set_hash:
-                        open_set.put((f_score[neighbor], neighbor))
-                        open_set_hash.add(neighbor)
+                    # Queue it, again if it was already queued with a worse score
+                    open_set.put((f_score[neighbor], neighbor))
     
     # No path found - return empty path but explored paths for visualization
+    if instrument:
+        search_counters.record(expansions)
     return [], explored_paths
 
-def get_next_move(ghost_pos, pacman_pos, maze, grid_width, grid_height):
+def build_neighbor_lists(maze, grid_width, grid_height, allow_diagonal=False):
+    """
+    Precompute the walkable neighbors of every cell as flat indices
+    Args:
+        maze: 2D list representing the maze layout
+        grid_width: Width of the grid
+        grid_height: Height of the grid
+        allow_diagonal: Whether diagonal movement is allowed
+    Returns:
+        List indexed by y * grid_width + x of neighbor index lists, in
+        the same order a_star_reference visits them
+    """
+    if allow_diagonal:
+        directions = [(0, 1), (1, 0), (0, -1), (-1, 0),
+                      (1, 1), (1, -1), (-1, 1), (-1, -1)]
+    else:
+        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+    walkable_mask = as_maze_grid(maze, grid_width, grid_height).walkable
+
+    def walkable(x, y):
+        return (0 <= x < grid_width and 0 <= y < grid_height and
+                walkable_mask[y * grid_width + x])
+
+    neighbors = []
+    for y in range(grid_height):
+        for x in range(grid_width):
+            neighbors.append([(y + dy) * grid_width + (x + dx)
+                              for dx, dy in directions if walkable(x + dx, y + dy)])
+    return neighbors
+
+class FlatAStar:
+    """
+    A* engine over flat cell indices (y * width + x)
+
+    Scores live in preallocated arrays that are reused between calls and
+    stamped with a search generation instead of being cleared. Every edge
+    costs 1, so the open list is a bucket queue indexed by f score; each
+    bucket is a small heap ordered like the reference engine's (x, y)
+    tuples, which keeps the returned paths identical.
+    """
+    def __init__(self):
+        self.size = 0
+        self.generation = 0
+        self.g_score = array('i')
+        self.came_from = array('i')
+        self.seen = array('I')  # Generation in which g_score was set
+        self.buckets = []
+        self.expanded = []
+
+        # Neighbor lists of the last maze searched
+        self.maze = None
+        self.layout = None
+        self.neighbors = None
+
+    def _prepare(self, maze, grid_width, grid_height, allow_diagonal):
+        """Resize buffers and rebuild neighbor lists when the maze changes"""
+        size = grid_width * grid_height
+        if size > self.size:
+            self.size = size
+            self.g_score = array('i', [0]) * size
+            self.came_from = array('i', [-1]) * size
+            self.seen = array('I', [0]) * size
+            self.generation = 0
+
+        # Pellets never touch walkability, Game.set_walls does (see MazeGrid.wall_changes)
+        layout = (grid_width, grid_height, allow_diagonal, wall_changes(maze))
+        if maze is not self.maze or layout != self.layout:
+            self.maze = maze
+            self.layout = layout
+            self.neighbors = build_neighbor_lists(maze, grid_width, grid_height, allow_diagonal)
+
+        self.generation += 1
+        if self.generation >= 0xFFFFFFFF:
+            # Stamps are about to wrap, start again from a clean slate
+            for i in range(self.size):
+                self.seen[i] = 0
+            self.generation = 1
+        return self.generation
+
+    def search(self, start, goal, maze, grid_width, grid_height, allow_diagonal=False,
+               instrument=INSTRUMENT_FULL, estimator=None):
+        """Same contract as a_star_reference"""
+        generation = self._prepare(maze, grid_width, grid_height, allow_diagonal)
+        g_score = self.g_score
+        came_from = self.came_from
+        seen = self.seen
+        neighbors = self.neighbors
+        buckets = self.buckets
+        expanded = self.expanded
+        expanded.clear()
+        collect = instrument == INSTRUMENT_FULL
+        expansions = 0
+
+        start_x, start_y = start
+        goal_x, goal_y = goal
+        goal_index = goal_y * grid_width + goal_x
+        start_index = start_y * grid_width + start_x
+
+        bound = estimator.for_goal(goal, start) if estimator is not None else None
+
+        # Open list entries are x * height + y, which orders like (x, y)
+        if bound is not None:
+            start_f = bound(start_index)
+        elif allow_diagonal:
+            start_f = max(abs(start_x - goal_x), abs(start_y - goal_y))
+        else:
+            start_f = abs(start_x - goal_x) + abs(start_y - goal_y)
+        while len(buckets) <= start_f:
+            buckets.append([])
+        buckets[start_f].append(start_x * grid_height + start_y)
+        g_score[start_index] = 0
+        came_from[start_index] = -1
+        seen[start_index] = generation
+        cursor = start_f
+        top = start_f  # Highest bucket used, for cleanup
+        found = False
+
+        while cursor <= top:
+            bucket = buckets[cursor]
+            if not bucket:
+                cursor += 1
+                continue
+            key = heapq.heappop(bucket)
+            cx, cy = divmod(key, grid_height)
+            current = cy * grid_width + cx
+            if bound is not None:
+                current_f = g_score[current] + bound(current)
+            elif allow_diagonal:
+                current_f = g_score[current] + max(abs(cx - goal_x), abs(cy - goal_y))
+            else:
+                current_f = g_score[current] + abs(cx - goal_x) + abs(cy - goal_y)
+            if current_f != cursor:
+                continue  # Stale entry, the node was queued again with a lower score
+            expansions += 1
+            if collect:
+                expanded.append(current)
+
+            if current == goal_index:
+                found = True
+                break
+
+            tentative_g = g_score[current] + 1
+            for neighbor in neighbors[current]:
+                if seen[neighbor] != generation or tentative_g < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    seen[neighbor] = generation
+                    # Queued again if it was already queued with a worse score
+                    ny, nx = divmod(neighbor, grid_width)
+                    if bound is not None:
+                        f = tentative_g + bound(neighbor)
+                    elif allow_diagonal:
+                        f = tentative_g + max(abs(nx - goal_x), abs(ny - goal_y))
+                    else:
+                        f = tentative_g + abs(nx - goal_x) + abs(ny - goal_y)
+                    while len(buckets) <= f:
+                        buckets.append([])
+                    heapq.heappush(buckets[f], nx * grid_height + ny)
+                    if f < cursor:
+                        cursor = f
+                    if f > top:
+                        top = f
+
+        # Leave the buckets empty for the next call
+        for i in range(min(cursor, start_f), top + 1):
+            buckets[i].clear()
+
+        if instrument:
+            search_counters.record(expansions)
+        if collect:
+            explored_paths = {(i % grid_width, i // grid_width) for i in expanded}
+        else:
+            explored_paths = NO_EXPLORED
+        if not found:
+            return [], explored_paths
+
+        path = []
+        temp = goal_index
+        while temp != start_index and came_from[temp] != -1:
+            path.append((temp % grid_width, temp // grid_width))
+            temp = came_from[temp]
+        path.reverse()
+        return path, explored_paths
+
+_flat_engine = FlatAStar()
+
+def a_star_flat(start, goal, maze, grid_width, grid_height, allow_diagonal=False,
+                instrument=INSTRUMENT_FULL, estimator=None):
+    """A* pathfinding over flat indices with a bucket queue (see FlatAStar)"""
+    return _flat_engine.search(tuple(start), tuple(goal), maze, grid_width, grid_height,
+                               allow_diagonal, instrument, estimator)
+
+# Available search engines, selectable at runtime with set_engine; other
+# modules add theirs with register_engine (jps.py adds "jps")
+ENGINES = {
+    "reference": a_star_reference,
+    "flat": a_star_flat,
+}
+_engine = ASTAR_ENGINE
+
+def register_engine(name, search):
+    """Make a search function with a_star's signature selectable as an engine"""
+    ENGINES[name] = search
+
+def set_engine(name):
+    """Select the search engine used by a_star"""
+    global _engine
+    if name not in ENGINES:
+        raise ValueError(f"Unknown A* engine: {name}")
+    _engine = name
+
+def get_engine():
+    """Get the name of the selected search engine"""
+    return _engine
+
+def a_star(start, goal, maze, grid_width, grid_height, allow_diagonal=False,
+           instrument=INSTRUMENT_FULL, engine=None, estimator=None):
+    """
+    A* pathfinding algorithm
+    Args:
+        start: Tuple (x, y) of starting position
+        goal: Tuple (x, y) of target position
+        maze: 2D list representing the maze layout
+        grid_width: Width of the grid
+        grid_height: Height of the grid
+        allow_diagonal: Whether diagonal movement is allowed
+        instrument: INSTRUMENT_* level; below INSTRUMENT_FULL the explored
+            set is not built and NO_EXPLORED is returned in its place
+        engine: Name of the engine to use, defaults to the selected one
+        estimator: Optional heuristic in place of the Manhattan distance:
+            an object whose for_goal(goal, start) returns a function giving
+            a lower bound on the distance from a flat cell index
+            (y * grid_width + x) to the goal, e.g. a
+            landmarks.LandmarkHeuristic built for the same moves
+    Returns:
+        List of coordinates representing the path from start to goal,
+        and the set of explored positions
+    """
+    if estimator is not None and estimator.allow_diagonal != allow_diagonal:
+        raise ValueError("The heuristic was built for different moves than the search")
+    return ENGINES[engine or _engine](start, goal, maze, grid_width, grid_height,
+                                      allow_diagonal, instrument, estimator)
+
+class PathCache:
+    """Bounded LRU cache of search results keyed by (start, goal, walls, engine, moves, heuristic, explored)"""
+    def __init__(self, maxsize=PATH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Get a cached (path, explored) entry, or None on a miss"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, path, explored):
+        """Store a search result, evicting the least recently used entry if full"""
+        self.entries[key] = (tuple(path), explored)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Get hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+path_cache = PathCache()
+
+# Recent wall layouts, mapped to their version number; a layout evicted and
+# seen again gets a new number, so versions are never reused
+_wall_versions = LayoutCache()
+_last_version = 0
+
+def wall_version(maze, grid_width, grid_height):
+    """
+    Get a version number for the wall layout of a maze
+    Mazes with the same walls share a version, so eating pellets never
+    changes it but loading a different maze does. Call this once per level
+    load rather than per query.
+    """
+    # Only walls affect walkability, so the walkable mask identifies the layout
+    layout = (grid_width, grid_height, bytes(as_maze_grid(maze, grid_width, grid_height).walkable))
+    global _last_version
+    version = _wall_versions.get(layout)
+    if version is None:
+        _last_version += 1
+        version = _last_version
+        _wall_versions.put(layout, version)
+    return version
+
+def get_next_move(ghost_pos, pacman_pos, maze, grid_width, grid_height, analysis=None,
+                  wall_version=None, instrument=INSTRUMENT_FULL, allow_diagonal=False, engine=None,
+                  estimator=None):
     """
     Calculate next move for ghost using A* pathfinding
     Args:
@@ -103,10 +482,36 @@ def get_next_move(ghost_pos, pacman_pos, maze, grid_width, grid_height):
         maze: 2D list representing the maze layout
         grid_width: Width of the grid
         grid_height: Height of the grid
+        analysis: Optional MazeAnalysis with precomputed next-hop tables;
+            when given the path is read from the tables without searching
+        wall_version: Optional wall layout version (see wall_version);
+            when given search results are served from path_cache
+        instrument: INSTRUMENT_* level passed on to a_star
+        allow_diagonal: Whether the search may move diagonally
+        engine: Name of the search engine, defaults to the selected one
+        estimator: Optional heuristic object passed on to a_star
     Returns:
         Tuple containing next position and full path
     """
-    path, explored = a_star(ghost_pos, pacman_pos, maze, grid_width, grid_height)
+    if analysis is not None:
+        path = analysis.path(tuple(ghost_pos), tuple(pacman_pos))
+        explored = NO_EXPLORED  # Nothing is explored by a table lookup
+    elif wall_version is not None:
+        # Entries without an explored set can't answer requests that want one
+        full = instrument == INSTRUMENT_FULL
+        key = (tuple(ghost_pos), tuple(pacman_pos), wall_version, engine or _engine,
+               allow_diagonal, estimator, full)
+        entry = path_cache.get(key)
+        if entry is None:
+            path, explored = a_star(ghost_pos, pacman_pos, maze, grid_width, grid_height,
+                                    allow_diagonal, instrument, engine, estimator)
+            path_cache.put(key, path, explored)
+        else:
+            # Copy the path, ghosts consume it as they move
+            path, explored = list(entry[0]), entry[1]
+    else:
+        path, explored = a_star(ghost_pos, pacman_pos, maze, grid_width, grid_height,
+                                allow_diagonal, instrument, engine, estimator)
     
     if not path:
         return ghost_pos, [], explored  # No valid path found
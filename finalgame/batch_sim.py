@@ -0,0 +1,965 @@
+# batch_sim.py - NumPy batch simulator stepping many games at once
+import argparse
+import time
+import numpy as np
+from config import *
+from game import Game
+from maze_analysis import UNREACHABLE
+from maze_io import seal_unreachable
+from rng import GAMMA, GameRandom
+from simulator import Simulator, pellet_policy, random_policy
+
+# Ghost states
+CHASE = 0
+SCATTER = 1
+
+# Direction tables indexed like DIRECTIONS (UP, DOWN, LEFT, RIGHT)
+DIR_X = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+DIR_Y = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+REVERSE = np.array([DIRECTIONS.index((-dx, -dy)) for dx, dy in DIRECTIONS], dtype=np.int32)
+DIR_UP = DIRECTIONS.index(UP)
+DIR_DOWN = DIRECTIONS.index(DOWN)
+DIR_LEFT = DIRECTIONS.index(LEFT)
+DIR_RIGHT = DIRECTIONS.index(RIGHT)
+
+# Valid-direction bitmask -> number of directions and the k-th direction,
+# in DIRECTIONS order like Ghost.find_random_direction builds its list
+MASK_COUNT = np.array([bin(mask).count("1") for mask in range(16)], dtype=np.uint64)
+MASK_NTH = np.array([[d for d in range(4) if mask & (1 << d)] + [0] * (4 - bin(mask).count("1"))
+                     for mask in range(16)], dtype=np.int32)
+
+# Pellet codes
+EMPTY = 0
+PELLET = 1
+POWER_PELLET = 2
+
+
+def build_flee_goals(analysis):
+    """
+    Tabulate the goals of MazeAnalysis.flee_path for every pair of cells
+    Args:
+        analysis: MazeAnalysis of the maze
+    Returns:
+        int32 array where [cell, pacman] is the cell a ghost on cell flees
+        to from pacman, or -1 if it has none
+    """
+    n = analysis.size
+    span = n + 1
+    distances = np.array(analysis.distances, dtype=np.int64).reshape(n, n)
+    reachable = distances != UNREACHABLE
+    runner_valid = reachable & (distances > 0)
+    ghosts = np.arange(n)
+    flee_goals = np.empty((n, n), dtype=np.int32)
+    for pacman in range(n):
+        chaser = distances[pacman]
+        # Same ranking as flow_field.flee_key, rows are ghost cells
+        key = ((distances < chaser) * span + chaser) * span + span - 1 - distances
+        key[~(runner_valid & reachable[pacman])] = -1
+        best = key.argmax(axis=1)
+        flee_goals[:, pacman] = np.where(key[ghosts, best] >= 0, best, -1)
+    return flee_goals
+
+
+def mix64_array(z):
+    """Vectorized rng.mix64 over uint64 arrays (wraps like the masked original)"""
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class BatchSimulator:
+    """
+    Struct-of-arrays simulator for many games of the same maze
+
+    Every field of Pacman, Ghost and Game that affects the rules is kept
+    as one NumPy array with an entry per game (ghost fields are stored
+    ghost-major, so each ghost slot is a contiguous row), and step()
+    advances all games with vectorized operations, mirroring Game.update
+    with the "tables" pathfinder. A ghost path is stored as its next
+    waypoint plus the goal it was planned towards; since table paths are
+    next-hop chains, the rest of the path can always be read back from
+    the shared table.
+
+    Game.rng is a GameRandom, whose draws depend only on the seed and the
+    draw count, so the per-game generators here are just a uint64 state
+    array and random turns stay identical to the object model.
+
+    A game that clears its level goes on to the next one, as Game.reset_game
+    does between levels of runner.run_episode, until max_levels are done.
+
+    The arrays hold a slot per game still being simulated. A game that
+    ends keeps a snapshot of its final state, and its slot runs on unseen
+    until a quarter of the slots have ended, when the running games are
+    packed into fresh arrays. That way no step masks its work by game
+    state, and ended games soon stop costing anything. Temporaries of the
+    per-step work are preallocated for the slot count and written in place.
+
+    On one core that runs 33x the steps per second of Simulator at 4096
+    games and 55x at 65536, short of the 100x it is meant to reach.
+    """
+    # Per-slot fields, packed when ended games are dropped
+    SLOT_FIELDS = ("slot_game", "running", "rng_state", "pellets", "pellets_left", "pacman_x",
+                   "pacman_y", "pacman_cell", "pacman_dir", "pacman_next_dir", "score", "lives",
+                   "level", "power_active", "power_timer")
+    GHOST_FIELDS = ("ghost_x", "ghost_y", "ghost_dir", "ghost_state", "scatter_timer", "scared",
+                    "eaten", "path_timer", "stuck_counter", "last_x", "last_y", "has_path",
+                    "waypoint", "waypoint_x", "waypoint_y", "plan_goal")
+
+    def __init__(self, seeds, dt=1.0 / FPS, game_options=None, max_levels=1):
+        """
+        Args:
+            seeds: Seed of each game, as passed to Game
+            dt: Fixed time step in seconds
+            game_options: Keyword arguments for Game shared by every game
+                (ghost_speed, ghost_speed_step, ghost_modes, layout)
+            max_levels: Levels a game plays; clearing the last one ends it
+        """
+        self.seeds = list(seeds)
+        self.count = len(self.seeds)
+        self.dt = dt
+        self.max_levels = max_levels
+
+        # Everything static is read from a template game
+        template = Game(**(game_options or {}))
+        if template.maze_analysis is None:
+            raise ValueError("BatchSimulator needs a maze small enough for the next-hop tables")
+        self.template = template
+        self.width = template.grid_width
+        self.height = template.grid_height
+        self.ghost_names = [ghost.name for ghost in template.ghosts]
+        self.ghost_count = len(template.ghosts)
+        self.ghost_homes = [ghost.reset_position for ghost in template.ghosts]
+        self.ghost_home_x = np.array([[x] for x, _ in self.ghost_homes], dtype=np.float64)
+        self.ghost_home_y = np.array([[y] for _, y in self.ghost_homes], dtype=np.float64)
+        self.pacman_start = template.pacman.get_position()
+        # Pac-Man's step in each direction, computed like Pacman.update does
+        self.pacman_step_x = (DIR_X * template.pacman.speed).astype(np.float64)
+        self.pacman_step_y = (DIR_Y * template.pacman.speed).astype(np.float64)
+        self.ghost_modes = [mode for mode, _ in template.ghost_modes]
+        self.mode_durations = [duration for _, duration in template.ghost_modes]
+
+        # Walls with a one-cell solid border, flattened: position (x, y) is
+        # padded cell (y + 1) * padded_width + x + 1, so lookups need no bounds checks
+        self.padded_width = self.width + 2
+        walls = np.ones((self.height + 2, self.padded_width), dtype=bool)
+        cells = np.frombuffer(template.maze.cells_view(), dtype=np.uint8).reshape(self.height, self.width)
+        walls[1:-1, 1:-1] = cells == ord('X')
+        pellets = np.zeros(walls.shape, dtype=np.uint8)
+        pellets[1:-1, 1:-1][cells == ord('.')] = PELLET
+        pellets[1:-1, 1:-1][cells == ord('O')] = POWER_PELLET
+        self.walls = walls.ravel()
+        self.initial_pellets = pellets.ravel()
+        padded = np.arange(self.walls.size)
+        self.padded_x = padded % self.padded_width - 1
+        self.padded_y = padded // self.padded_width - 1
+
+        # With solid top and left walls ghosts never step past the padding
+        if not (walls[1].all() and walls[:, 1].all()):
+            raise ValueError("BatchSimulator needs a maze with solid top and left walls")
+        self.pacman_start_cell = (self.pacman_start[1] + 1) * self.padded_width + self.pacman_start[0] + 1
+
+        # Shared next-hop tables, flattened, with -1 for "no next hop"
+        analysis = template.maze_analysis
+        cell_type = np.min_scalar_type(-analysis.size)
+        self.cell_count = analysis.size
+        padded_cell = np.full(walls.shape, -1, dtype=cell_type)
+        padded_cell[1:-1, 1:-1] = np.array(analysis.cell_index).reshape(self.height, self.width)
+        self.padded_cell = padded_cell.ravel()  # Compact cell index, -1 for walls
+        self.cell_x = np.array([x for x, _ in analysis.cells], dtype=np.float64)
+        self.cell_y = np.array([y for _, y in analysis.cells], dtype=np.float64)
+        next_hops = np.array(analysis.next_hops, dtype=np.int64)
+        next_hops[next_hops == UNREACHABLE] = -1
+        self.next_hops = next_hops.astype(cell_type)
+        self.flee_goals = build_flee_goals(analysis).astype(cell_type).ravel()
+
+        # Scatter corners, as chosen by Ghost.get_target_position
+        corners = {
+            "blinky": (self.width - 2, 1),
+            "pinky": (1, 1),
+            "inky": (self.width - 2, self.height - 2),
+            "clyde": (1, self.height - 2),
+        }
+        self.scatter_targets = [corners[name] for name in self.ghost_names]
+
+        # Ghosts update a wave at a time. Inky aims off where Blinky ends the
+        # tick, so when Blinky moves first, Inky goes in a later wave
+        self.waves = [(0, self.ghost_count)]
+        names = self.ghost_names
+        if "blinky" in names and "inky" in names and names.index("blinky") < names.index("inky"):
+            split = names.index("blinky") + 1
+            self.waves = [(0, split), (split, self.ghost_count)]
+
+        # Ghost speeds of each level, taken from Game.reset_game itself
+        speeds = [[ghost.speed for ghost in template.ghosts]]
+        for _ in range(1, max_levels):
+            template.reset_game()
+            speeds.append([ghost.speed for ghost in template.ghosts])
+        speeds = np.array(speeds, dtype=np.float64)
+        # Per-step distances by [level - 1, ghost], computed like Ghost.move_along_path does
+        self.move_speed = speeds * 1.0 * dt * FPS
+        self.scared_move_speed = speeds * 0.5 * dt * FPS
+        # Path-following step by [4 * (ghost_count * (level - 1) + ghost) + 2 * following + scared]
+        zeros = np.zeros_like(speeds)
+        self.follow_speed = np.stack([zeros, zeros, self.move_speed, self.scared_move_speed],
+                                     axis=2).ravel()
+        self.speed_rows = (np.arange(self.ghost_count, dtype=np.intp) * 4)[:, None]
+
+        self.reset()
+
+    def reset(self):
+        """Start every game fresh on level 1, already running"""
+        n = self.count
+        g = self.ghost_count
+        self.steps = 0
+        self.state = np.full(n, GAME_RUNNING, dtype=np.int32)  # Per game, not per slot
+        self.finished = {}  # Ended game -> snapshot of its final state
+        self.slot_of = np.arange(n)  # Game -> its slot while running
+        self.ended_slots = 0  # Slots of ended games not dropped yet
+
+        # All games start together, so they share one ghost mode schedule
+        self.mode_index = 0
+        self.mode_timer = 0
+        self.scatter_pending = False  # Whether some ghost may still be in scatter
+
+        self.slot_game = np.arange(n)
+        self.running = np.ones(n, dtype=bool)
+        self.rng_state = np.array([GameRandom(seed).state for seed in self.seeds], dtype=np.uint64)
+        self.pellets = np.tile(self.initial_pellets, (n, 1))
+        self.pellets_left = np.full(n, np.count_nonzero(self.initial_pellets), dtype=np.int32)
+        self.pacman_x = np.full(n, self.pacman_start[0], dtype=np.float64)
+        self.pacman_y = np.full(n, self.pacman_start[1], dtype=np.float64)
+        self.pacman_cell = np.full(n, self.pacman_start_cell, dtype=np.intp)  # Padded cell he is in
+        self.pacman_dir = np.full(n, DIR_RIGHT, dtype=np.int8)
+        self.pacman_next_dir = np.full(n, DIR_RIGHT, dtype=np.int8)
+        self.score = np.zeros(n, dtype=np.int32)  # Of the current level, like Pacman.score
+        self.lives = np.full(n, 3, dtype=np.int8)
+        self.level = np.ones(n, dtype=np.int16)
+        self.power_active = np.zeros(n, dtype=bool)
+        self.power_timer = np.zeros(n, dtype=np.float64)
+
+        # Ghost fields, one row per ghost slot
+        cell_type = self.next_hops.dtype
+        self.ghost_x = np.repeat(self.ghost_home_x, n, axis=1)
+        self.ghost_y = np.repeat(self.ghost_home_y, n, axis=1)
+        self.ghost_dir = np.full((g, n), DIR_RIGHT, dtype=np.int8)
+        self.ghost_state = np.full((g, n), CHASE, dtype=np.int8)
+        self.scatter_timer = np.zeros((g, n), dtype=np.float64)
+        self.scared = np.zeros((g, n), dtype=bool)
+        self.eaten = np.zeros((g, n), dtype=bool)
+        self.path_timer = np.zeros((g, n), dtype=np.float64)
+        self.stuck_counter = np.zeros((g, n), dtype=np.int8)  # Stops counting at 3
+        self.last_x = np.full((g, n), -1, dtype=np.int16)  # -1: no last position
+        self.last_y = np.full((g, n), -1, dtype=np.int16)
+        self.has_path = np.zeros((g, n), dtype=bool)
+        self.waypoint = np.zeros((g, n), dtype=cell_type)  # Compact cell index
+        self.waypoint_x = np.zeros((g, n), dtype=np.float64)
+        self.waypoint_y = np.zeros((g, n), dtype=np.float64)
+        self.plan_goal = np.zeros((g, n), dtype=cell_type)
+        self._allocate()
+
+    def _allocate(self):
+        """Preallocate the per-step temporaries for the current slot count"""
+        n = len(self.slot_game)
+        shape = (self.ghost_count, n)
+        self.pellet_rows = np.arange(n, dtype=np.intp) * self.initial_pellets.size
+        self._index = np.empty(n, dtype=np.intp)
+        self._cells = np.empty(n, dtype=np.int32)
+        self._kind = np.empty(n, dtype=np.uint8)
+        self._turn = np.empty(n, dtype=bool)
+        self._next_x = np.empty(n, dtype=np.float64)
+        self._next_y = np.empty(n, dtype=np.float64)
+        self._speed_offset = np.empty(n, dtype=np.intp)
+        self._speed = np.empty(shape, dtype=np.float64)
+        self._dx = np.empty(shape, dtype=np.float64)
+        self._dy = np.empty(shape, dtype=np.float64)
+        self._abs_dx = np.empty(shape, dtype=np.float64)
+        self._abs_dy = np.empty(shape, dtype=np.float64)
+        self._limit = np.empty(shape, dtype=np.float64)
+        self._grid_x = np.empty(shape, dtype=np.int16)
+        self._grid_y = np.empty(shape, dtype=np.int16)
+        self._flight = np.empty(shape, dtype=bool)  # Scared and not eaten
+        self._update = np.empty(shape, dtype=bool)
+        self._mask = np.empty(shape, dtype=bool)
+        self._other = np.empty(shape, dtype=bool)
+        self._positive = np.empty(shape, dtype=bool)
+        self._down = np.empty(shape, dtype=bool)
+        self._code = np.empty(shape, dtype=np.intp)
+        self._direction = np.empty(shape, dtype=np.int8)
+
+    @property
+    def done(self):
+        """Per-game flag for games that have ended"""
+        return self.state != GAME_RUNNING
+
+    def _blocked(self, x, y):
+        """Vectorized Pacman/Ghost.check_collision (positions within a cell of the grid)"""
+        return self.walls[(y.astype(np.intp) + 1) * self.padded_width + x.astype(np.intp) + 1]
+
+    def _padded_cells(self, x, y, out):
+        """
+        Padded cells of positions anywhere, like the bounds check of MazeGrid.is_wall
+        Args:
+            x, y: Float position arrays
+            out: intp array for the result
+        """
+        column = np.clip(x.astype(np.intp), -1, self.width)
+        np.clip(y.astype(np.intp), -1, self.height, out=out)
+        out += 1
+        out *= self.padded_width
+        out += column
+        out += 1
+        return out
+
+    def _cell_of(self, x, y):
+        """Compact cell index of grid positions, -1 for walls"""
+        return self.padded_cell[(y.astype(np.intp) + 1) * self.padded_width + x + 1]
+
+    def _random_direction(self, ghost, games):
+        """Ghost.find_random_direction for the given games"""
+        if len(games) == 0:
+            return
+        # Tested at x + dx like Ghost.check_collision does: y = 1.9999999999999998
+        # plus 1 rounds to 3.0, so int(y + 1) isn't always int(y) + 1
+        x = self.ghost_x[ghost, games]
+        y = self.ghost_y[ghost, games]
+        mask = np.zeros(len(games), dtype=np.int32)
+        for d in range(4):
+            mask |= (~self._blocked(x + DIR_X[d], y + DIR_Y[d])).astype(np.int32) << d
+
+        # Don't reverse direction unless it's the only way
+        reverse_bit = 1 << REVERSE[self.ghost_dir[ghost, games]]
+        multiple = (mask & (mask - 1)) != 0
+        mask = np.where(multiple, mask & ~reverse_bit, mask)
+
+        # GameRandom.choice: one draw per game that has a valid direction
+        count = MASK_COUNT[mask]
+        choosing = count > 0
+        games = games[choosing]
+        state = self.rng_state[games] + np.uint64(GAMMA)
+        self.rng_state[games] = state
+        pick = (mix64_array(state) % count[choosing]).astype(np.int32)
+        self.ghost_dir[ghost, games] = MASK_NTH[mask[choosing], pick]
+
+    def _ghost_targets(self, ghost, games):
+        """Vectorized Ghost.get_target_position for a subset of games (scared ghosts flee instead)"""
+        name = self.ghost_names[ghost]
+        width, height = self.width, self.height
+        cell = self.pacman_cell[games]
+        pac_x = self.padded_x[cell]
+        pac_y = self.padded_y[cell]
+        pac_dir = self.pacman_dir[games]
+        pac_dx = DIR_X[pac_dir]
+        pac_dy = DIR_Y[pac_dir]
+
+        # Chase targets by personality
+        if name == "blinky":
+            chase_x, chase_y = pac_x, pac_y
+        elif name == "pinky":
+            facing_up = pac_dir == DIR_UP
+            chase_x = np.where(facing_up, pac_x - 4, pac_x + pac_dx * 4)
+            chase_y = np.where(facing_up, pac_y - 4, pac_y + pac_dy * 4)
+        elif name == "inky":
+            mid_x = pac_x + pac_dx * 2
+            mid_y = pac_y + pac_dy * 2
+            if "blinky" in self.ghost_names:
+                blinky = self.ghost_names.index("blinky")
+                blinky_x = self.ghost_x[blinky, games].astype(np.int32)
+                blinky_y = self.ghost_y[blinky, games].astype(np.int32)
+            else:
+                blinky_x, blinky_y = pac_x, pac_y
+            chase_x = mid_x + (mid_x - blinky_x)
+            chase_y = mid_y + (mid_y - blinky_y)
+        elif name == "clyde":
+            distance = np.abs(self.ghost_x[ghost, games] - pac_x) + np.abs(self.ghost_y[ghost, games] - pac_y)
+            far = distance > 8
+            chase_x = np.where(far, pac_x, 1)
+            chase_y = np.where(far, pac_y, height - 2)
+        else:
+            chase_x, chase_y = pac_x, pac_y
+        target_x = np.clip(chase_x, 1, width - 2)
+        target_y = np.clip(chase_y, 1, height - 2)
+
+        scatter = self.ghost_state[ghost, games] == SCATTER
+        if scatter.any():
+            target_x = np.where(scatter, self.scatter_targets[ghost][0], target_x)
+            target_y = np.where(scatter, self.scatter_targets[ghost][1], target_y)
+
+        eaten = self.eaten[ghost, games]
+        if eaten.any():
+            target_x = np.where(eaten, self.ghost_homes[ghost][0], target_x)
+            target_y = np.where(eaten, self.ghost_homes[ghost][1], target_y)
+        return target_x, target_y
+
+    def _update_ghosts(self, dt):
+        """Vectorized Ghost.update for every ghost slot"""
+        # Timers, stuck counters and replan decisions only depend on each
+        # ghost itself, so all ghosts take them at once
+        if self.scatter_pending:
+            scatter = self.ghost_state == SCATTER
+            np.subtract(self.scatter_timer, dt, out=self.scatter_timer, where=scatter)
+            self.ghost_state[scatter & (self.scatter_timer <= 0)] = CHASE
+            self.scatter_pending = bool((self.ghost_state == SCATTER).any())
+
+        scared = self.scared
+        np.copyto(scared, self.power_active)
+
+        # Stuck detection; only stuck_counter >= 3 matters, so it stops at 3
+        grid_x, grid_y = self._grid_x, self._grid_y
+        np.copyto(grid_x, self.ghost_x, casting="unsafe")
+        np.copyto(grid_y, self.ghost_y, casting="unsafe")
+        same, other = self._mask, self._other
+        np.equal(grid_x, self.last_x, out=same)
+        np.equal(grid_y, self.last_y, out=other)
+        same &= other
+        stuck = self.stuck_counter
+        stuck += 1
+        np.minimum(stuck, 3, out=stuck)
+        stuck *= same
+        np.copyto(self.last_x, grid_x)
+        np.copyto(self.last_y, grid_y)
+
+        timer = self.path_timer
+        timer += dt
+        # Replan when stuck, every 0.5s scared or 1s otherwise, and without
+        # a path, which for a scared ghost only counts while it flees
+        has_path = self.has_path
+        flight = self._flight
+        np.logical_not(self.eaten, out=flight)
+        flight &= scared
+        interval = self._limit
+        np.copyto(interval, 1.0)
+        np.copyto(interval, 0.5, where=scared)
+        update = self._update
+        np.greater_equal(timer, interval, out=update)
+        np.logical_not(scared, out=other)
+        other |= flight
+        np.logical_not(has_path, out=same)
+        other &= same
+        update |= other
+        np.greater_equal(stuck, 3, out=other)
+        update |= other
+
+        for first, last in self.waves:
+            failed = [self._replan(ghost, np.flatnonzero(update[ghost])) for ghost in range(first, last)]
+            # Random turns draw from the game's generator, so they go ghost by ghost
+            for ghost, games in zip(range(first, last), failed):
+                self._random_direction(ghost, games)
+                wandering = np.flatnonzero(~has_path[ghost])
+                if len(wandering):
+                    self._wander(ghost, wandering)
+            self._follow(first, last)
+
+    def _replan(self, ghost, games):
+        """
+        Replan a ghost's path from the next-hop tables
+        Args:
+            ghost: Ghost slot
+            games: Slots where a replan is due
+        Returns:
+            Slots where no path was found
+        """
+        if len(games) == 0:
+            return games
+        self.path_timer[ghost, games] = 0
+        start = self._cell_of(self._grid_x[ghost, games], self._grid_y[ghost, games])
+        target_x, target_y = self._ghost_targets(ghost, games)
+        goal = self._cell_of(target_x, target_y)
+        # Scared ghosts that haven't been eaten flee to their flee_goals cell
+        flee = self._flight[ghost, games]
+        if flee.any():
+            pacman = self.padded_cell[self.pacman_cell[games]]
+            row = np.maximum(start, 0).astype(np.intp) * self.cell_count + np.maximum(pacman, 0)
+            flee_goal = np.where((start >= 0) & (pacman >= 0), self.flee_goals[row], -1)
+            goal = np.where(flee, flee_goal, goal)
+        row = np.maximum(start, 0).astype(np.intp) * self.cell_count + np.maximum(goal, 0)
+        hop = np.where((start >= 0) & (goal >= 0), self.next_hops[row], -1)
+        found = hop >= 0
+        planned = games[found]
+        self._set_waypoint(ghost, planned, hop[found])
+        self.plan_goal[ghost, planned] = goal[found]
+        self.has_path[ghost, planned] = True
+        return games[~found]
+
+    def _wander(self, ghost, games):
+        """Ghost.move_along_path without a path: a random step, turning again if blocked"""
+        self._random_direction(ghost, games)
+        direction = self.ghost_dir[ghost, games]
+        level = self.level[games] - 1
+        step = np.where(self.scared[ghost, games], self.scared_move_speed[level, ghost],
+                        self.move_speed[level, ghost])
+        x = self.ghost_x[ghost, games]
+        y = self.ghost_y[ghost, games]
+        next_x = x + DIR_X[direction] * step
+        next_y = y + DIR_Y[direction] * step
+        blocked = self._blocked(next_x, next_y)
+        self.ghost_x[ghost, games] = np.where(blocked, x, next_x)
+        self.ghost_y[ghost, games] = np.where(blocked, y, next_y)
+        self._random_direction(ghost, games[blocked])
+
+    def _follow(self, first, last):
+        """Vectorized Ghost.move_along_path for the ghosts of a wave that have a path"""
+        rows = slice(first, last)
+        x, y = self.ghost_x[rows], self.ghost_y[rows]
+        target_x, target_y = self.waypoint_x[rows], self.waypoint_y[rows]
+        following = self.has_path[rows]
+        # A ghost without a path moves 0 here, so no step below needs masking
+        code = self._code[rows]
+        np.multiply(following.view(np.uint8), 2, out=code)
+        code += self.scared[rows].view(np.uint8)
+        code += self.speed_rows[rows]
+        code += self._speed_offset
+        speed = self._speed[rows]
+        np.take(self.follow_speed, code, out=speed)
+        dx, dy = self._dx[rows], self._dy[rows]
+        abs_dx, abs_dy = self._abs_dx[rows], self._abs_dy[rows]
+        limit = self._limit[rows]
+        horizontal, other = self._mask[rows], self._other[rows]
+        np.subtract(target_x, x, out=dx)
+        np.subtract(target_y, y, out=dy)
+        np.abs(dx, out=abs_dx)
+        np.abs(dy, out=abs_dy)
+        np.greater(abs_dx, abs_dy, out=horizontal)
+
+        # Heading along the major axis; DIRECTIONS lists UP, DOWN, LEFT, RIGHT,
+        # so it is 2 * horizontal + whether the major axis difference is > 0
+        positive, down = self._positive[rows], self._down[rows]
+        np.greater(dx, 0, out=positive)
+        positive &= horizontal
+        np.greater(dy, 0, out=down)
+        np.greater(down, horizontal, out=down)  # Down and not horizontal
+        positive |= down
+        direction = self._direction[rows]
+        np.add(horizontal.view(np.int8), horizontal.view(np.int8), out=direction)
+        direction += positive.view(np.int8)
+        np.copyto(self.ghost_dir[rows], direction, where=following)
+
+        # The major axis steps at full speed or snaps to the waypoint; the
+        # minor axis only moves by whatever a snap leaves over (never < 0).
+        # Both are min(limit, |d|) towards the waypoint, and differences of
+        # positions less than a cell apart are exact, so a snap lands on it
+        np.subtract(speed, abs_dy, out=limit)
+        np.copyto(limit, speed, where=horizontal)
+        np.minimum(limit, abs_dx, out=limit)
+        np.maximum(limit, 0.0, out=limit)
+        np.copysign(limit, dx, out=limit)
+        x += limit
+        np.copyto(limit, speed)
+        np.subtract(speed, abs_dx, out=limit, where=horizontal)
+        np.minimum(limit, abs_dy, out=limit)
+        np.maximum(limit, 0.0, out=limit)
+        np.copysign(limit, dy, out=limit)
+        y += limit
+
+        # Reaching the waypoint snaps to it and pops it off the path
+        reached = horizontal
+        np.subtract(x, target_x, out=dx)
+        np.abs(dx, out=dx)
+        np.less(dx, 0.1, out=reached)
+        np.subtract(y, target_y, out=dy)
+        np.abs(dy, out=dy)
+        np.less(dy, 0.1, out=other)
+        reached &= other
+        reached &= following
+        np.copyto(x, target_x, where=reached)
+        np.copyto(y, target_y, where=reached)
+        popped = np.flatnonzero(reached)
+        if len(popped):
+            self._advance(popped + first * len(self.slot_game))
+
+    def _advance(self, paths):
+        """
+        Move ghost paths on to the waypoint after the one reached
+        Args:
+            paths: Flat (ghost, slot) indices into the ghost fields
+        """
+        waypoint = self.waypoint.reshape(-1)
+        row = waypoint[paths].astype(np.intp) * self.cell_count + self.plan_goal.reshape(-1)[paths]
+        hops = self.next_hops[row]
+        arrived = hops < 0
+        self.has_path.reshape(-1)[paths[arrived]] = False
+        paths = paths[~arrived]
+        hops = hops[~arrived]
+        waypoint[paths] = hops
+        self.waypoint_x.reshape(-1)[paths] = self.cell_x[hops]
+        self.waypoint_y.reshape(-1)[paths] = self.cell_y[hops]
+
+    def _set_waypoint(self, ghost, games, cells):
+        """Point the given games' ghost paths at new waypoint cells"""
+        self.waypoint[ghost, games] = cells
+        self.waypoint_x[ghost, games] = self.cell_x[cells]
+        self.waypoint_y[ghost, games] = self.cell_y[cells]
+
+    def _update_pacman(self, dt):
+        """Vectorized Pacman.update and Pacman.eat_pellet"""
+        x, y = self.pacman_x, self.pacman_y
+        next_x, next_y = self._next_x, self._next_y
+        cell = self.pacman_cell
+        turn = self._turn
+
+        # Turn where the requested way is open (a no-op if it's the current one)
+        np.take(self.pacman_step_x, self.pacman_next_dir, out=next_x)
+        next_x += x
+        np.take(self.pacman_step_y, self.pacman_next_dir, out=next_y)
+        next_y += y
+        self._padded_cells(next_x, next_y, cell)
+        np.take(self.walls, cell, out=turn)
+        np.logical_not(turn, out=turn)
+        np.copyto(self.pacman_dir, self.pacman_next_dir, where=turn)
+
+        # Move on, unless that runs into a wall
+        np.take(self.pacman_step_x, self.pacman_dir, out=next_x)
+        next_x += x
+        np.take(self.pacman_step_y, self.pacman_dir, out=next_y)
+        next_y += y
+        self._padded_cells(next_x, next_y, cell)
+        np.take(self.walls, cell, out=turn)
+        np.logical_not(turn, out=turn)
+        np.copyto(x, next_x, where=turn)
+        np.copyto(y, next_y, where=turn)
+        self._padded_cells(x, y, cell)
+
+        # The timer only matters while powered, and eating a power pellet resets it
+        self.power_timer -= dt
+        np.greater(self.power_timer, 0, out=turn)
+        self.power_active &= turn
+
+        # Eat whatever is under pacman
+        index = self._index
+        pellets = self.pellets.reshape(-1)
+        np.add(self.pellet_rows, cell, out=index)
+        pellet = np.take(pellets, index, out=self._kind)
+        eating = np.flatnonzero(pellet)
+        if len(eating):
+            kind = pellet[eating]
+            pellets[index[eating]] = EMPTY
+            self.pellets_left[eating] -= 1
+            self.score[eating] += np.where(kind == PELLET, 10, 50)
+            power = eating[kind == POWER_PELLET]
+            self.power_active[power] = True
+            self.power_timer[power] = 10
+
+    def _update_ghost_modes(self, dt):
+        """Game.update_ghost_modes, on the schedule every game shares"""
+        if self.mode_index >= len(self.ghost_modes):
+            return
+        self.mode_timer += dt
+        duration = self.mode_durations[self.mode_index]
+        if duration > 0 and self.mode_timer >= duration:
+            self.mode_timer = 0
+            self.mode_index += 1
+            if self.mode_index < len(self.ghost_modes):
+                mode = self.ghost_modes[self.mode_index]
+                change = ~self.scared & ~self.eaten
+                self.ghost_state[change] = SCATTER if mode == "scatter" else CHASE
+                self.scatter_pending |= mode == "scatter"
+
+    def _reset_positions(self, games):
+        """Vectorized Game.reset_positions"""
+        self.pacman_x[games] = self.pacman_start[0]
+        self.pacman_y[games] = self.pacman_start[1]
+        self.pacman_cell[games] = self.pacman_start_cell
+        self.ghost_x[:, games] = self.ghost_home_x
+        self.ghost_y[:, games] = self.ghost_home_y
+        self.has_path[:, games] = False
+        self.ghost_state[:, games] = CHASE
+        self.scared[:, games] = False
+        self.eaten[:, games] = False
+        self.last_x[:, games] = -1
+        self.last_y[:, games] = -1
+        self.stuck_counter[:, games] = 0
+
+    def _check_ghost_collision(self):
+        """Vectorized Game.check_ghost_collision"""
+        # Find the games with a ghost on Pac-Man, all ghosts at once
+        touching, other = self._mask, self._other
+        np.subtract(self.ghost_x, self.pacman_x, out=self._dx)
+        np.abs(self._dx, out=self._dx)
+        np.less(self._dx, 0.5, out=touching)
+        np.subtract(self.ghost_y, self.pacman_y, out=self._dy)
+        np.abs(self._dy, out=self._dy)
+        np.less(self._dy, 0.5, out=other)
+        touching &= other
+        games = np.flatnonzero(touching.any(axis=0) & self.running)
+        if not len(games):
+            return
+
+        # Those go ghost by ghost, since a catch resets everyone's position
+        for ghost in range(self.ghost_count):
+            touching = ((np.abs(self.ghost_x[ghost, games] - self.pacman_x[games]) < 0.5) &
+                        (np.abs(self.ghost_y[ghost, games] - self.pacman_y[games]) < 0.5))
+            hit = games[touching]
+            if not len(hit):
+                continue
+            scared = self.scared[ghost, hit]
+            eaten = self.eaten[ghost, hit]
+            eats_ghost = hit[scared]
+            caught = hit[~scared & ~eaten]
+
+            self.eaten[ghost, eats_ghost] = True
+            self.scared[ghost, eats_ghost] = False
+            self.has_path[ghost, eats_ghost] = False
+            self.score[eats_ghost] += 200
+
+            self.lives[caught] -= 1
+            self._reset_positions(caught[self.lives[caught] > 0])
+
+    def _next_level(self, slots):
+        """Vectorized Game.reset_game: fresh pellets, Pac-Man and ghosts on the next level"""
+        self.level[slots] += 1
+        self.pellets[slots] = self.initial_pellets
+        self.pellets_left[slots] = np.count_nonzero(self.initial_pellets)
+        self.pacman_dir[slots] = DIR_RIGHT
+        self.pacman_next_dir[slots] = DIR_RIGHT
+        self.score[slots] = 0
+        self.lives[slots] = 3
+        self.power_active[slots] = False
+        self.power_timer[slots] = 0
+        self._reset_positions(slots)
+        self.ghost_dir[:, slots] = DIR_RIGHT
+        self.scatter_timer[:, slots] = 0
+        self.path_timer[:, slots] = 0
+
+    def _end_games(self):
+        """Record the games that ended this step, dropping their slots once enough have"""
+        ended = np.flatnonzero(self.running & ((self.pellets_left == 0) | (self.lives <= 0)))
+        if not len(ended):
+            return
+        # A cleared level that isn't the last starts the next one instead
+        advancing = (self.pellets_left[ended] == 0) & (self.level[ended] < self.max_levels)
+        if advancing.any():
+            self._next_level(ended[advancing])
+            ended = ended[~advancing]
+            if not len(ended):
+                return
+        self.running[ended] = False
+        games = self.slot_game[ended]
+        self.state[games] = np.where(self.pellets_left[ended] == 0, GAME_WON, GAME_OVER)
+        for slot, game in zip(ended.tolist(), games.tolist()):
+            self.finished[game] = self._slot_snapshot(slot, game)
+        self.ended_slots += len(ended)
+        if self.ended_slots * 4 >= len(self.slot_game):
+            self._drop_ended()
+
+    def _drop_ended(self):
+        """Pack the slots of running games into fresh arrays"""
+        keep = np.flatnonzero(self.running)
+        for name in self.SLOT_FIELDS:
+            setattr(self, name, getattr(self, name)[keep])
+        for name in self.GHOST_FIELDS:
+            setattr(self, name, np.ascontiguousarray(getattr(self, name)[:, keep]))
+        self.slot_of[self.slot_game] = np.arange(len(keep))
+        self.ended_slots = 0
+        self._allocate()
+
+    def step(self, actions):
+        """
+        Apply one ACTION_* per game and advance every running game by dt
+        Args:
+            actions: Sequence of ACTION_* values, one per game
+        Returns:
+            Array of game states
+        """
+        actions = np.asarray(actions)
+        if len(self.slot_game) < self.count:
+            actions = actions[self.slot_game]
+        np.copyto(self.pacman_next_dir, actions, where=actions != ACTION_NONE, casting="unsafe")
+
+        dt = self.dt
+        np.subtract(self.level, 1, out=self._speed_offset)
+        self._speed_offset *= 4 * self.ghost_count
+        self._update_ghost_modes(dt)
+        self._update_pacman(dt)
+        self._update_ghosts(dt)
+        self._check_ghost_collision()
+        self._end_games()
+        self.steps += 1
+        return self.state
+
+    def snapshot(self, game):
+        """Get the rule-relevant state of one game, comparable with game_snapshot"""
+        final = self.finished.get(game)
+        if final is not None:
+            return final
+        return self._slot_snapshot(self.slot_of[game], game)
+
+    def _slot_snapshot(self, slot, game):
+        """snapshot() read from a game's slot"""
+        return {
+            "state": int(self.state[game]),
+            "level": int(self.level[slot]),
+            "score": int(self.score[slot]),
+            "lives": int(self.lives[slot]),
+            "pacman": (float(self.pacman_x[slot]), float(self.pacman_y[slot])),
+            "ghosts": [(float(self.ghost_x[i, slot]), float(self.ghost_y[i, slot]),
+                        bool(self.scared[i, slot]), bool(self.eaten[i, slot]))
+                       for i in range(self.ghost_count)],
+        }
+
+
+def game_snapshot(game):
+    """Get the rule-relevant state of a Game, comparable with BatchSimulator.snapshot"""
+    return {
+        "state": game.state,
+        "level": game.level,
+        "score": game.pacman.score,
+        "lives": game.pacman.lives,
+        "pacman": (float(game.pacman.x), float(game.pacman.y)),
+        "ghosts": [(float(ghost.x), float(ghost.y), ghost.scared, ghost.eaten)
+                   for ghost in game.ghosts],
+    }
+
+
+def scenario_actions(seeds, steps):
+    """Pre-roll random_policy actions for each seed, shape (steps, games)"""
+    actions = np.empty((steps, len(seeds)), dtype=np.int64)
+    for column, seed in enumerate(seeds):
+        policy = random_policy(seed)
+        for step in range(steps):
+            actions[step, column] = policy(None)
+    return actions
+
+
+def verify_against_game(seeds, steps=600, policy=random_policy, game_options=None, max_levels=1,
+                        coverage=None):
+    """
+    Check the batch rules against Game.update on seeded scenarios
+    Each scenario is played by a Simulator like runner.run_episode plays
+    it, going on to the next level with Game.reset_game after a win until
+    max_levels are cleared, and the batch is sent the same actions.
+    Args:
+        seeds: Scenario seeds; each seeds both the game and its policy
+        steps: Number of steps per scenario
+        policy: Policy factory taking a seed, like simulator.random_policy
+        game_options: Keyword arguments for Game
+        max_levels: Levels a scenario plays
+        coverage: Optional dictionary filled with what the scenarios went
+            through, so a clean check can be told apart from a short one
+    Returns:
+        List of (seed, step, batch snapshot, game snapshot) mismatches,
+        at most one per scenario
+    """
+    if GHOST_PATHFINDER != "tables":
+        raise ValueError("BatchSimulator mirrors the \"tables\" ghost pathfinder only")
+    seeds = list(seeds)
+    batch = BatchSimulator(seeds, game_options=game_options, max_levels=max_levels)
+    simulators = [Simulator(seed=seed, game_options=game_options) for seed in seeds]
+    policies = [policy(seed) for seed in seeds]
+    stats = {"game steps": 0, "longest game": 0, "levels cleared": 0, "power pellets eaten": 0,
+             "ghosts eaten": 0, "mode switches": 0}
+    mismatches = []
+    stopped = set()  # Columns that diverged or ended
+    actions = np.full(len(seeds), ACTION_NONE, dtype=np.int64)
+    for step in range(steps):
+        for column, simulator in enumerate(simulators):
+            if column not in stopped:
+                actions[column] = policies[column](simulator.game)
+        batch.step(actions)
+        for column, simulator in enumerate(simulators):
+            if column in stopped:
+                continue
+            game = simulator.game
+            power_left = game.power_pellets_left
+            eaten = sum(ghost.eaten for ghost in game.ghosts)
+            simulator.step(int(actions[column]))
+            stats["game steps"] += 1
+            stats["longest game"] = max(stats["longest game"], step + 1)
+            stats["power pellets eaten"] += power_left - game.power_pellets_left
+            stats["ghosts eaten"] += max(0, sum(ghost.eaten for ghost in game.ghosts) - eaten)
+            stats["mode switches"] = max(stats["mode switches"], game.current_ghost_mode)
+            if game.state == GAME_WON:
+                stats["levels cleared"] += 1
+                if game.level < max_levels:
+                    game.reset_game()
+            if simulator.done:
+                stopped.add(column)
+            expected = game_snapshot(game)
+            actual = batch.snapshot(column)
+            if actual != expected:
+                mismatches.append((seeds[column], step, actual, expected))
+                stopped.add(column)
+    if coverage is not None:
+        coverage.update(stats)
+    return mismatches
+
+
+def verify_scenarios(count):
+    """
+    Get the scenario sets --verify checks, each with count seeds
+    Random moves die early, so a pellet-eating policy also plays long games
+    through power pellets and ghost mode switches, and clears levels on
+    config.MAZE with the pellets Pac-Man can't reach walled off.
+    Returns:
+        List of (name, keyword arguments for verify_against_game)
+    """
+    seeds = range(count)
+    sealed = {"layout": seal_unreachable(MAZE)}
+    return [
+        ("random moves", {"seeds": seeds, "steps": 600}),
+        ("pellet eating", {"seeds": seeds, "steps": 2500, "policy": pellet_policy}),
+        ("level clearing", {"seeds": seeds, "steps": 6000, "policy": pellet_policy,
+                            "game_options": sealed, "max_levels": 3}),
+    ]
+
+
+def benchmark(games=4096, steps=500, repeats=3, samples=20):
+    """
+    Measure batch and object-model throughput on the same seeded scenarios
+    Only steps of games still running count, on both sides, and each side
+    reports its best of several repeats, so the ratio is repeatable.
+    Args:
+        games: Number of games in the batch
+        steps: Steps per scenario
+        repeats: Runs of each side
+        samples: Number of scenarios the object model plays per run
+    Returns:
+        Tuple (batch game-steps per second, object-model steps per second)
+    """
+    seeds = list(range(games))
+    actions = scenario_actions(seeds, steps)
+    batch_rate = 0.0
+    for _ in range(repeats):
+        batch = BatchSimulator(seeds)
+        stepped = 0
+        start = time.perf_counter()
+        for step in range(steps):
+            stepped += batch.count - len(batch.finished)
+            batch.step(actions[step])
+        batch_rate = max(batch_rate, stepped / (time.perf_counter() - start))
+
+    object_rate = 0.0
+    for _ in range(repeats):
+        stepped = 0
+        elapsed = 0.0
+        for seed in range(samples):
+            result = Simulator(seed=seed).run(random_policy(seed), max_steps=steps)
+            stepped += result["steps"]
+            elapsed += result["seconds"]
+        object_rate = max(object_rate, stepped / elapsed)
+    return batch_rate, object_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step many Pac-Man games at once with NumPy")
+    parser.add_argument("--games", type=int, default=4096, help="number of games in the batch")
+    parser.add_argument("--steps", type=int, default=500, help="steps to simulate")
+    parser.add_argument("--repeats", type=int, default=3, help="benchmark runs, the best one counts")
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="first check N seeded scenarios against Game.update")
+    args = parser.parse_args()
+
+    if args.verify:
+        for name, scenario in verify_scenarios(args.verify):
+            coverage = {}
+            mismatches = verify_against_game(coverage=coverage, **scenario)
+            for seed, step, actual, expected in mismatches:
+                print(f"seed {seed} diverged at step {step}:\n  batch {actual}\n  game  {expected}")
+            print(f"{name}: {args.verify - len(mismatches)}/{args.verify} scenarios match Game.update "
+                  f"({', '.join(f'{key} {value}' for key, value in coverage.items())})")
+
+    batch_rate, object_rate = benchmark(args.games, args.steps, args.repeats)
+    print(f"batch: {batch_rate:.0f} game-steps/s, object model: {object_rate:.0f} steps/s "
+          f"({batch_rate / object_rate:.1f}x, steps of running games only)")
+
+
+if __name__ == "__main__":
+    main()
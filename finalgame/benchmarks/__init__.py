@@ -0,0 +1,7 @@
+# benchmarks - Seeded performance benchmarks for pathfinding, simulation and rendering
+#
+# Run from the finalgame directory:
+#     python -m benchmarks                       # run everything, print JSON
+#     python -m benchmarks --save-baseline       # store the results as the baseline
+#     python -m benchmarks --baseline            # compare and fail on regressions
+#     python -m benchmarks.verify_paths          # check every path source against BFS
@@ -0,0 +1,57 @@
+# __main__.py - Command line entry point: python -m benchmarks
+import argparse
+import json
+import os
+import sys
+from .harness import BENCHMARKS, compare, load_report, run_all, save_report
+from . import pathfinding, simulation, rendering  # Registers the benchmarks
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the seeded benchmark suite")
+    parser.add_argument("filters", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes per benchmark")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help="compare against a baseline report (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help="store this run as the baseline report")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown per op before failing, as a fraction")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name in BENCHMARKS:
+            print(name)
+        return 0
+
+    def progress(name, result):
+        stats = "".join(f", {value:.1f} {key}" for key, value in result.get("stats", {}).items())
+        print(f"{name:32s} {result['seconds_per_op'] * 1e6:12.2f} us/op "
+              f"({result['ops']} ops, median of {result['repeat']}{stats})", file=sys.stderr)
+
+    report = run_all(args.filters, args.repeat, progress)
+    if args.output:
+        save_report(report, args.output)
+    if args.save_baseline:
+        save_report(report, args.save_baseline)
+    if not args.output and not args.save_baseline:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.baseline:
+        ratios, regressions = compare(report, load_report(args.baseline), args.threshold)
+        for name, ratio in ratios:
+            flag = "REGRESSION" if name in regressions else ""
+            print(f"{name:32s} {ratio:6.2f}x baseline {flag}", file=sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than {1 + args.threshold:.2f}x baseline",
+                  file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# harness.py - Benchmark registry, timing and baseline comparison
+import json
+import platform
+import statistics
+import time
+
+# Registered benchmarks, by name, in registration order
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=None):
+    """
+    Register a benchmark
+    The decorated function does any setup and returns a zero-argument
+    callable that runs one timed pass, plus the number of operations in
+    that pass (searches, ticks, frames) so results can be compared per op.
+    It may also return a third value, a zero-argument callable that runs
+    an untimed pass and returns a dictionary of per-op statistics (such as
+    nodes expanded per search), reported alongside the timings.
+    Slow benchmarks can cap the number of timed passes with repeat.
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeat)
+        return setup
+    return register
+
+
+def run_benchmark(name, repeat=5):
+    """
+    Time one registered benchmark
+    Args:
+        name: Registered benchmark name
+        repeat: Number of timed passes, unless the benchmark caps it lower
+    Returns:
+        Dictionary with the median and best pass time, the time per op and
+        the benchmark's statistics, if it has any
+    """
+    setup, max_repeat = BENCHMARKS[name]
+    if max_repeat is not None:
+        repeat = min(repeat, max_repeat)
+    run, ops, *extra = setup()
+    run()  # Warm-up pass, fills caches the way a running game would
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    median = statistics.median(times)
+    result = {
+        "median_seconds": median,
+        "best_seconds": min(times),
+        "repeat": repeat,
+        "ops": ops,
+        "seconds_per_op": median / ops if ops else median,
+    }
+    if extra:
+        result["stats"] = extra[0]()
+    return result
+
+
+def run_all(names=None, repeat=5, progress=None):
+    """Run the selected benchmarks (all by default) and collect their results"""
+    results = {}
+    for name in BENCHMARKS:
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = run_benchmark(name, repeat)
+        if progress:
+            progress(name, results[name])
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=0.2):
+    """
+    Compare a report against a baseline report
+    Args:
+        report: Output of run_all
+        baseline: Earlier output of run_all
+        threshold: Allowed slowdown as a fraction (0.2 = 20% slower)
+    Returns:
+        List of (name, ratio) pairs for every benchmark in both reports,
+        and the list of names that regressed beyond the threshold
+    """
+    ratios = []
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["seconds_per_op"] / base["seconds_per_op"]
+        ratios.append((name, ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return ratios, regressions
+
+
+def load_report(path):
+    """Read a report written by save_report"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(report, path):
+    """Write a report as JSON"""
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
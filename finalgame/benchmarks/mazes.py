@@ -0,0 +1,82 @@
+# mazes.py - Seeded synthetic mazes for benchmarks
+import random
+
+
+def generate_maze(width, height, seed=0, loop_chance=0.1):
+    """
+    Carve a maze with a randomized depth-first search, then open extra walls
+    Args:
+        width: Maze width (rounded down to an odd number)
+        height: Maze height (rounded down to an odd number)
+        seed: Seed for the layout
+        loop_chance: Chance of removing each remaining inner wall, so the
+            maze has loops like the game maze instead of a single tree
+    Returns:
+        List of row strings using 'X' for walls and ' ' for floor
+    """
+    width -= 1 - width % 2
+    height -= 1 - height % 2
+    rng = random.Random(seed)
+    cells = [['X'] * width for _ in range(height)]
+
+    cells[1][1] = ' '
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy, dx, dy) for dx, dy in ((0, -2), (0, 2), (-2, 0), (2, 0))
+                   if 0 < x + dx < width - 1 and 0 < y + dy < height - 1
+                   and cells[y + dy][x + dx] == 'X']
+        if not options:
+            stack.pop()
+            continue
+        nx, ny, dx, dy = rng.choice(options)
+        cells[y + dy // 2][x + dx // 2] = ' '
+        cells[ny][nx] = ' '
+        stack.append((nx, ny))
+
+    # Knock out walls between two open cells to create loops
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            if cells[y][x] != 'X' or rng.random() >= loop_chance:
+                continue
+            if (cells[y][x - 1] == ' ' and cells[y][x + 1] == ' ') or \
+               (cells[y - 1][x] == ' ' and cells[y + 1][x] == ' '):
+                cells[y][x] = ' '
+
+    return [''.join(row) for row in cells]
+
+
+def open_cells(maze):
+    """List the (x, y) positions that are not walls"""
+    return [(x, y) for y, row in enumerate(maze) for x, cell in enumerate(row) if cell != 'X']
+
+
+def generate_open_map(width, height, seed=0, coverage=0.2, max_block=8):
+    """
+    Scatter rectangular obstacles over an open floor inside a wall border
+    Args:
+        width: Map width
+        height: Map height
+        seed: Seed for the layout
+        coverage: Rough fraction of the inner area covered by obstacles
+        max_block: Longest side of an obstacle
+    Returns:
+        List of row strings using 'X' for walls and ' ' for floor
+    """
+    rng = random.Random(seed)
+    cells = [['X'] * width] + [['X'] + [' '] * (width - 2) + ['X'] for _ in range(height - 2)] + [['X'] * width]
+
+    covered = 0
+    target = coverage * (width - 2) * (height - 2)
+    while covered < target:
+        block_width = rng.randint(1, max_block)
+        block_height = rng.randint(1, max_block)
+        left = rng.randint(1, max(1, width - 1 - block_width))
+        top = rng.randint(1, max(1, height - 1 - block_height))
+        for y in range(top, min(top + block_height, height - 1)):
+            for x in range(left, min(left + block_width, width - 1)):
+                if cells[y][x] != 'X':
+                    cells[y][x] = 'X'
+                    covered += 1
+
+    return [''.join(row) for row in cells]
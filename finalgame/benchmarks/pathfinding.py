@@ -0,0 +1,267 @@
+# pathfinding.py - Pathfinding benchmarks on the game maze and on large synthetic mazes
+import itertools
+import random
+from config import *
+import astar
+import jps  # Registers the "jps" engine
+import junction_graph  # Registers the "junction" engine
+from astar import INSTRUMENT_COUNTS, INSTRUMENT_NONE, search_counters
+from game import Game
+from hpa import HierarchicalMap
+from incremental_planner import IncrementalPlanner
+from landmarks import LandmarkHeuristic
+from maze_analysis import MazeAnalysis
+from maze_grid import MazeGrid
+from simulator import random_policy
+from .harness import benchmark
+from .mazes import generate_maze, generate_open_map, open_cells
+
+# Pairs sampled for the slow reference engine and for the large mazes
+SAMPLED_PAIRS = 1000
+LARGE_MAZE_SIZE = 151
+LARGE_MAZE_PAIRS = 200
+OPEN_MAP_SIZE = 151
+
+# Seeded chase replayed by the replanning benchmarks
+CHASE_SEED = 7
+CHASE_TICKS = 2000
+CHASE_LARGE_SIZE = 63  # Side of the generated maze for the large chase
+
+
+def game_maze():
+    """Get config.MAZE as a grid, with its walkable cells"""
+    maze = MazeGrid(MAZE, GRID_WIDTH, GRID_HEIGHT)
+    cells = [(x, y) for y in range(GRID_HEIGHT) for x in range(GRID_WIDTH) if not maze.is_wall(x, y)]
+    return maze, cells
+
+
+def all_pairs(cells):
+    """Every unordered pair of distinct cells"""
+    return list(itertools.combinations(cells, 2))
+
+
+def sampled_pairs(cells, count, seed=0):
+    """A fixed, seeded sample of cell pairs"""
+    rng = random.Random(seed)
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(count)]
+
+
+def search_pass(engine, pairs, maze, width, height, allow_diagonal=False, estimator=None):
+    """Build a pass that runs one search per pair on the given engine"""
+    search = astar.ENGINES[engine]
+
+    def run():
+        for start, goal in pairs:
+            search(start, goal, maze, width, height, allow_diagonal, INSTRUMENT_NONE, estimator)
+
+    def stats():
+        search_counters.clear()
+        for start, goal in pairs:
+            search(start, goal, maze, width, height, allow_diagonal, INSTRUMENT_COUNTS, estimator)
+        expanded = search_counters.stats()["mean_expanded"]
+        search_counters.clear()
+        return {"expanded/op": expanded}
+    return run, len(pairs), stats
+
+
+def open_map_pass(engine, allow_diagonal=False):
+    """Build a search pass over the seeded open map"""
+    rows = generate_open_map(OPEN_MAP_SIZE, OPEN_MAP_SIZE, seed=1)
+    maze = MazeGrid(rows)
+    pairs = sampled_pairs(open_cells(rows), LARGE_MAZE_PAIRS, seed=1)
+    return search_pass(engine, pairs, maze, maze.width, maze.height, allow_diagonal)
+
+
+@benchmark("astar.maze.all_pairs.flat", repeat=3)
+def bench_maze_all_pairs_flat():
+    maze, cells = game_maze()
+    return search_pass("flat", all_pairs(cells), maze, GRID_WIDTH, GRID_HEIGHT)
+
+
+@benchmark("astar.maze.all_pairs.junction", repeat=3)
+def bench_maze_all_pairs_junction():
+    maze, cells = game_maze()
+    return search_pass("junction", all_pairs(cells), maze, GRID_WIDTH, GRID_HEIGHT)
+
+
+@benchmark("astar.maze.all_pairs.landmarks", repeat=3)
+def bench_maze_all_pairs_landmarks():
+    maze, cells = game_maze()
+    landmarks = LandmarkHeuristic(maze, GRID_WIDTH, GRID_HEIGHT)
+    return search_pass("flat", all_pairs(cells), maze, GRID_WIDTH, GRID_HEIGHT, estimator=landmarks)
+
+
+@benchmark("astar.maze.sampled.reference")
+def bench_maze_sampled_reference():
+    maze, cells = game_maze()
+    return search_pass("reference", sampled_pairs(cells, SAMPLED_PAIRS), maze, GRID_WIDTH, GRID_HEIGHT)
+
+
+@benchmark("astar.maze.all_pairs.tables")
+def bench_maze_all_pairs_tables():
+    maze, cells = game_maze()
+    analysis = MazeAnalysis(maze, GRID_WIDTH, GRID_HEIGHT)
+    pairs = all_pairs(cells)
+
+    def run():
+        for start, goal in pairs:
+            analysis.path(start, goal)
+    return run, len(pairs)
+
+
+@benchmark("astar.large.flat")
+def bench_large_flat():
+    rows = generate_maze(LARGE_MAZE_SIZE, LARGE_MAZE_SIZE, seed=1)
+    maze = MazeGrid(rows)
+    pairs = sampled_pairs(open_cells(rows), LARGE_MAZE_PAIRS, seed=1)
+    return search_pass("flat", pairs, maze, maze.width, maze.height)
+
+
+@benchmark("astar.large.reference", repeat=3)
+def bench_large_reference():
+    rows = generate_maze(LARGE_MAZE_SIZE, LARGE_MAZE_SIZE, seed=1)
+    maze = MazeGrid(rows)
+    pairs = sampled_pairs(open_cells(rows), LARGE_MAZE_PAIRS, seed=1)
+    return search_pass("reference", pairs, maze, maze.width, maze.height)
+
+
+@benchmark("astar.large.landmarks")
+def bench_large_landmarks():
+    rows = generate_maze(LARGE_MAZE_SIZE, LARGE_MAZE_SIZE, seed=1)
+    maze = MazeGrid(rows)
+    landmarks = LandmarkHeuristic(maze, maze.width, maze.height)
+    pairs = sampled_pairs(open_cells(rows), LARGE_MAZE_PAIRS, seed=1)
+    return search_pass("flat", pairs, maze, maze.width, maze.height, estimator=landmarks)
+
+
+@benchmark("astar.large.jps")
+def bench_large_jps():
+    rows = generate_maze(LARGE_MAZE_SIZE, LARGE_MAZE_SIZE, seed=1)
+    maze = MazeGrid(rows)
+    pairs = sampled_pairs(open_cells(rows), LARGE_MAZE_PAIRS, seed=1)
+    return search_pass("jps", pairs, maze, maze.width, maze.height)
+
+
+@benchmark("astar.large.junction")
+def bench_large_junction():
+    rows = generate_maze(LARGE_MAZE_SIZE, LARGE_MAZE_SIZE, seed=1)
+    maze = MazeGrid(rows)
+    pairs = sampled_pairs(open_cells(rows), LARGE_MAZE_PAIRS, seed=1)
+    return search_pass("junction", pairs, maze, maze.width, maze.height)
+
+
+@benchmark("astar.open.flat")
+def bench_open_flat():
+    return open_map_pass("flat")
+
+
+@benchmark("astar.open.jps")
+def bench_open_jps():
+    return open_map_pass("jps")
+
+
+@benchmark("astar.open.diagonal.flat")
+def bench_open_diagonal_flat():
+    return open_map_pass("flat", allow_diagonal=True)
+
+
+@benchmark("astar.open.diagonal.jps")
+def bench_open_diagonal_jps():
+    return open_map_pass("jps", allow_diagonal=True)
+
+
+@benchmark("hpa.large.build", repeat=3)
+def bench_large_hpa_build():
+    rows = generate_maze(LARGE_MAZE_SIZE, LARGE_MAZE_SIZE, seed=1)
+    maze = MazeGrid(rows)
+
+    def run():
+        HierarchicalMap(maze, maze.width, maze.height)
+    return run, 1
+
+
+@benchmark("hpa.large.query")
+def bench_large_hpa_query():
+    rows = generate_maze(LARGE_MAZE_SIZE, LARGE_MAZE_SIZE, seed=1)
+    maze = MazeGrid(rows)
+    hierarchy = HierarchicalMap(maze, maze.width, maze.height)
+    pairs = sampled_pairs(open_cells(rows), LARGE_MAZE_PAIRS, seed=1)
+
+    def run():
+        for start, goal in pairs:
+            hierarchy.path(start, goal, INSTRUMENT_NONE, max_segments=None)
+    return run, len(pairs)
+
+
+def record_chase(layout=None):
+    """
+    Play a seeded chase with A* search and record every ghost replan
+    Pac-Man can't be caught, so the chase runs for all of CHASE_TICKS.
+    Args:
+        layout: Maze rows replacing config.MAZE
+    Returns:
+        The game, and a list of (ghost index, start, goal) for each replan
+        of a chasing ghost, in the order the game made them
+    """
+    dt = 1.0 / FPS
+    game = Game(CHASE_SEED, ghost_modes=[("chase", 0)], layout=layout)
+    game.prepare_pathfinding("search")
+    game.use_flow_field = False  # Every replan is a search of its own
+    game.check_ghost_collision = lambda: None
+    game.state = GAME_RUNNING
+    policy = random_policy(CHASE_SEED)
+    queries = []
+    for _ in range(CHASE_TICKS):
+        before = [(ghost.get_position(), ghost.plan_version) for ghost in game.ghosts]
+        game.apply_action(policy(game))
+        game.update(dt)
+        if game.state != GAME_RUNNING:
+            break
+        for index, (ghost, (start, version)) in enumerate(zip(game.ghosts, before)):
+            if ghost.plan_version != version and not ghost.scared and not ghost.eaten:
+                queries.append((index, start, ghost.target_position))
+    return game, queries
+
+
+def chase_pass(incremental, layout=None):
+    """
+    Build a pass that replays a recorded chase's replans
+    Args:
+        incremental: Repair one IncrementalPlanner per ghost if True, run
+            a full A* search (with the game's heuristic) per replan if not
+        layout: Maze rows replacing config.MAZE
+    """
+    game, queries = record_chase(layout)
+    maze, width, height = game.maze, game.grid_width, game.grid_height
+    landmarks = game.landmarks
+
+    def replay(instrument):
+        if incremental:
+            planners = [IncrementalPlanner() for _ in game.ghosts]
+            for ghost, start, goal in queries:
+                planners[ghost].plan(start, goal, maze, width, height, instrument)
+        else:
+            for ghost, start, goal in queries:
+                astar.a_star(start, goal, maze, width, height, False, instrument, estimator=landmarks)
+
+    def stats():
+        search_counters.clear()
+        replay(INSTRUMENT_COUNTS)
+        expanded = search_counters.stats()["mean_expanded"]
+        search_counters.clear()
+        return {"expanded/op": expanded}
+    return lambda: replay(INSTRUMENT_NONE), len(queries), stats
+
+
+def register_chase_benchmarks():
+    """Register the chase replay with incremental repair and with full re-search, on two mazes"""
+    layout = generate_maze(CHASE_LARGE_SIZE, CHASE_LARGE_SIZE, CHASE_SEED)
+    for incremental in (True, False):
+        kind = "incremental" if incremental else "search"
+        benchmark(f"replan.chase.{kind}", repeat=3)(
+            lambda incremental=incremental: chase_pass(incremental))
+        benchmark(f"replan.chase.large.{kind}", repeat=3)(
+            lambda incremental=incremental: chase_pass(incremental, layout))
+
+
+register_chase_benchmarks()
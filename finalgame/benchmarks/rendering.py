@@ -0,0 +1,108 @@
+# rendering.py - Offscreen rendering benchmarks for the maze, entities and debug overlay
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Render offscreen unless told otherwise
+
+import pygame
+from config import *
+from astar import INSTRUMENT_FULL, a_star
+from debug_layer import DebugLayer
+from game import Game
+from renderer import Renderer
+from sprite_loader import SpriteLoader
+from .harness import benchmark
+
+FRAMES = 200
+SEED = 7
+REPLAN_EVERY = 10  # Frames between simulated ghost replans in the debug benchmark
+
+_display = None
+
+
+def setup_display():
+    """Open the (offscreen) display once and build the sprites and a game"""
+    global _display
+    if _display is None:
+        pygame.display.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        _display = (screen, SpriteLoader(cache_dir=None))
+    screen, sprites = _display
+    game = Game(SEED)
+    game.state = GAME_RUNNING
+    return screen, sprites, game
+
+
+@benchmark("render.maze_layer_build")
+def bench_maze_layer_build():
+    screen, sprites, game = setup_display()
+
+    def run():
+        for _ in range(FRAMES):
+            renderer = Renderer(screen, sprites)
+            renderer.sync(game)
+    return run, FRAMES
+
+
+@benchmark("render.maze_full")
+def bench_maze_full():
+    screen, sprites, game = setup_display()
+    renderer = Renderer(screen, sprites)
+
+    def run():
+        for _ in range(FRAMES):
+            renderer.draw_maze(game)
+    return run, FRAMES
+
+
+@benchmark("render.entities")
+def bench_entities():
+    screen, sprites, game = setup_display()
+    renderer = Renderer(screen, sprites)
+
+    def run():
+        for _ in range(FRAMES):
+            renderer.draw_entities(game)
+    return run, FRAMES
+
+
+@benchmark("render.frame_incremental")
+def bench_frame_incremental():
+    screen, sprites, game = setup_display()
+    renderer = Renderer(screen, sprites)
+    renderer.sync(game)
+
+    def run():
+        for frame in range(FRAMES):
+            # Move one ghost a tile back and forth so there is something to redraw
+            ghost = game.ghosts[0]
+            ghost.x += 1 if frame % 2 == 0 else -1
+            changed = renderer.begin_frame(game)
+            overdrawn = renderer.draw_entities(game)
+            renderer.end_frame(changed, overdrawn)
+    return run, FRAMES
+
+
+@benchmark("render.debug_overlay")
+def bench_debug_overlay():
+    screen, sprites, game = setup_display()
+    game.debug_mode = True
+    layer = DebugLayer()
+    pacman = game.pacman.get_position()
+
+    # Fixed plans from each ghost's start towards pacman's start
+    plans = []
+    for ghost in game.ghosts:
+        path, explored = a_star(ghost.get_position(), pacman, game.maze, GRID_WIDTH, GRID_HEIGHT,
+                                instrument=INSTRUMENT_FULL)
+        plans.append((path, explored))
+
+    def run():
+        for frame in range(FRAMES):
+            for ghost, (path, explored) in zip(game.ghosts, plans):
+                if frame % REPLAN_EVERY == 0:
+                    ghost.path = list(path)
+                    ghost.explored_paths = explored
+                    ghost.plan_version += 1
+                elif len(ghost.path) > 2:
+                    ghost.path.pop(0)
+            layer.draw(screen, game)
+    return run, FRAMES
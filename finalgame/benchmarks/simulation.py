@@ -0,0 +1,126 @@
+# simulation.py - Headless Game.update benchmarks per ghost mode and ghost count
+import random
+from config import *
+from astar import path_cache
+from game import Game, Ghost
+from simulator import random_policy
+from .harness import benchmark
+from .mazes import generate_maze
+
+TICKS = 2000
+SEED = 7
+CROWD_TICKS = 200
+CROWD_SIZES = (4, 64, 256)
+CROWD_LARGE_SIZE = 63  # Side of the generated maze for the large crowd benchmarks
+
+
+def new_game(mode):
+    """Start a seeded game with every ghost held in one mode"""
+    game = Game(SEED, ghost_modes=[("scatter" if mode == "scatter" else "chase", 0)])
+    game.state = GAME_RUNNING
+    return game
+
+
+def tick_pass(mode):
+    """Build a pass of TICKS updates, restarting the game whenever it ends"""
+    dt = 1.0 / FPS
+
+    def run():
+        game = new_game(mode)
+        policy = random_policy(SEED)
+        for _ in range(TICKS):
+            if mode == "scared":
+                # Keep the power pellet running so ghosts stay frightened
+                game.pacman.power_pellet_active = True
+                game.pacman.power_pellet_timer = 10
+            elif mode == "scatter":
+                # Ghosts start (and respawn) in chase, switch them back
+                for ghost in game.ghosts:
+                    if ghost.state == "chase":
+                        ghost.state = "scatter"
+            game.apply_action(policy(game))
+            game.update(dt)
+            if game.state != GAME_RUNNING:
+                game = new_game(mode)
+    return run, TICKS
+
+
+@benchmark("game.update.chase")
+def bench_update_chase():
+    return tick_pass("chase")
+
+
+@benchmark("game.update.scatter")
+def bench_update_scatter():
+    return tick_pass("scatter")
+
+
+@benchmark("game.update.scared")
+def bench_update_scared():
+    return tick_pass("scared")
+
+
+def crowd_game(count, flow_field, layout=None):
+    """
+    Start a seeded chase-only game on A* search with count ghosts, spread
+    over random open cells, that all chase Pac-Man's tile
+    """
+    game = Game(SEED, ghost_modes=[("chase", 0)], layout=layout)
+    game.prepare_pathfinding("search")
+    game.use_flow_field = flow_field
+    rng = random.Random(SEED)
+    cells = [(x, y) for y in range(game.grid_height) for x in range(game.grid_width)
+             if not game.maze.is_wall(x, y)]
+    game.ghosts = []
+    for _ in range(count):
+        x, y = rng.choice(cells)
+        ghost = Ghost(x, y, "blinky", BLINKY_COLOR)
+        ghost.game = game
+        ghost.speed = game.ghost_speed
+        game.ghosts.append(ghost)
+    # Pac-Man can't be caught, or the crowd would end the game within a few ticks
+    game.check_ghost_collision = lambda: None
+    game.state = GAME_RUNNING
+    return game
+
+
+def crowd_pass(count, flow_field, layout=None):
+    """Build a pass of CROWD_TICKS updates with a crowd of chasing ghosts"""
+    dt = 1.0 / FPS
+    builds = []
+
+    def run():
+        # Start cold, repeats would otherwise find every search of the seeded run cached
+        path_cache.clear()
+        game = crowd_game(count, flow_field, layout)
+        policy = random_policy(SEED)
+        built = 0
+        for _ in range(CROWD_TICKS):
+            game.apply_action(policy(game))
+            game.update(dt)
+            if game.state != GAME_RUNNING:
+                built += game.flow_field_builds
+                game = crowd_game(count, flow_field, layout)
+        builds.append(built + game.flow_field_builds)
+
+    def stats():
+        run()  # Every search the ghosts run misses the path cache
+        return {"searches/tick": path_cache.misses / CROWD_TICKS,
+                "field builds/tick": builds[-1] / CROWD_TICKS}
+    return run, CROWD_TICKS, stats
+
+
+def register_crowd_benchmarks():
+    """Register one benchmark per crowd size, with per-ghost searches and with the shared field"""
+    for count in CROWD_SIZES:
+        for flow_field in (False, True):
+            name = f"game.update.crowd.{count}.{'flow' if flow_field else 'search'}"
+            benchmark(name, repeat=3)(lambda count=count, flow_field=flow_field: crowd_pass(count, flow_field))
+    # Searches cost more on a bigger maze, while the field costs one BFS per Pac-Man step
+    layout = generate_maze(CROWD_LARGE_SIZE, CROWD_LARGE_SIZE, SEED)
+    for flow_field in (False, True):
+        name = f"game.update.crowd.large.64.{'flow' if flow_field else 'search'}"
+        benchmark(name, repeat=3)(lambda flow_field=flow_field: crowd_pass(64, flow_field, layout))
+
+
+register_crowd_benchmarks()
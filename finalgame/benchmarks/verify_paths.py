@@ -0,0 +1,154 @@
+# verify_paths.py - Check that every path source finds shortest paths: python -m benchmarks.verify_paths
+import argparse
+import sys
+from collections import deque
+from config import *
+import astar
+import jps  # Registers the "jps" engine
+import junction_graph  # Registers the "junction" engine
+from astar import INSTRUMENT_NONE, build_neighbor_lists
+from flow_field import DistanceField, FieldLayout
+from incremental_planner import IncrementalPlanner
+from landmarks import LandmarkHeuristic
+from maze_analysis import MazeAnalysis
+from maze_grid import MazeGrid
+from .mazes import generate_maze, generate_open_map, open_cells
+from .pathfinding import sampled_pairs
+
+# Size of the generated maze and open map, and pairs sampled on each maze
+CHECK_MAZE_SIZE = 41
+CHECK_PAIRS = 300
+
+
+def check_mazes():
+    """
+    Get the mazes to check on
+    Returns:
+        List of (name, maze, cells) with maze a MazeGrid and cells its
+        walkable positions
+    """
+    mazes = [("config.MAZE", MazeGrid(MAZE, GRID_WIDTH, GRID_HEIGHT),
+              open_cells(MAZE[:GRID_HEIGHT]))]
+    for name, rows in (("generated maze", generate_maze(CHECK_MAZE_SIZE, CHECK_MAZE_SIZE, seed=1)),
+                       ("open map", generate_open_map(CHECK_MAZE_SIZE, CHECK_MAZE_SIZE, seed=1))):
+        mazes.append((name, MazeGrid(rows), open_cells(rows)))
+    return mazes
+
+
+def bfs_distances(neighbors, start):
+    """
+    Get BFS distances from one cell
+    Args:
+        neighbors: Neighbor lists from astar.build_neighbor_lists
+        start: Flat index of the cell
+    Returns:
+        Dictionary of flat index -> distance for every reachable cell
+    """
+    distances = {start: 0}
+    frontier = deque([start])
+    while frontier:
+        current = frontier.popleft()
+        for neighbor in neighbors[current]:
+            if neighbor not in distances:
+                distances[neighbor] = distances[current] + 1
+                frontier.append(neighbor)
+    return distances
+
+
+def path_length(path, start, goal, neighbors, grid_width):
+    """
+    Measure a path, checking that it is made of legal moves
+    Args:
+        path: List of coordinates from the step after start up to goal
+        start: Tuple (x, y) of starting position
+        goal: Tuple (x, y) of target position
+        neighbors: Neighbor lists for the moves the path may use
+        grid_width: Width of the grid
+    Returns:
+        Number of steps, or None if the path is empty, skips a cell or
+        doesn't end at goal
+    """
+    if not path or tuple(path[-1]) != tuple(goal):
+        return None
+    cell = start[1] * grid_width + start[0]
+    for x, y in path:
+        step = y * grid_width + x
+        if step not in neighbors[cell]:
+            return None
+        cell = step
+    return len(path)
+
+
+def path_sources(maze, allow_diagonal):
+    """
+    Get every way of finding a path on a maze
+    Args:
+        maze: MazeGrid to search
+        allow_diagonal: Whether diagonal movement is allowed
+    Returns:
+        List of (name, find) where find(start, goal) returns a path
+    """
+    width, height = maze.width, maze.height
+    landmarks = LandmarkHeuristic(maze, width, height, allow_diagonal=allow_diagonal)
+    sources = []
+    for engine in astar.ENGINES:
+        for heuristic, estimator in (("default", None), ("landmarks", landmarks)):
+            def find(start, goal, engine=engine, estimator=estimator):
+                return astar.a_star(start, goal, maze, width, height, allow_diagonal,
+                                    INSTRUMENT_NONE, engine, estimator)[0]
+            sources.append((f"{engine}/{heuristic}", find))
+    if allow_diagonal:
+        return sources
+
+    # The rest only move in the four directions
+    planner = IncrementalPlanner()
+    analysis = MazeAnalysis(maze, width, height)
+    layout = FieldLayout(maze, width, height)
+    sources.append(("incremental",
+                    lambda start, goal: planner.plan(start, goal, maze, width, height, INSTRUMENT_NONE)[0]))
+    sources.append(("tables", analysis.path))
+    sources.append(("flow field", lambda start, goal: DistanceField(layout, goal).path(start)))
+    return sources
+
+
+def verify_paths(pairs=CHECK_PAIRS):
+    """
+    Check every engine and heuristic, with and without diagonal moves, plus
+    the incremental planner, the tables and the distance fields, against
+    BFS on config.MAZE, a generated maze and an open map
+    Args:
+        pairs: Number of seeded start/goal pairs per maze
+    Returns:
+        List of (maze, moves, source, start, goal, length, expected) for
+        each path that is missing, illegal or longer than the BFS distance
+    """
+    mismatches = []
+    for maze_name, maze, cells in check_mazes():
+        checked = [(start, goal) for start, goal in sampled_pairs(cells, pairs) if start != goal]
+        for allow_diagonal in (False, True):
+            moves = "8-way" if allow_diagonal else "4-way"
+            neighbors = build_neighbor_lists(maze, maze.width, maze.height, allow_diagonal)
+            expected = [bfs_distances(neighbors, start[1] * maze.width + start[0])
+                        .get(goal[1] * maze.width + goal[0]) for start, goal in checked]
+            for source, find in path_sources(maze, allow_diagonal):
+                for (start, goal), distance in zip(checked, expected):
+                    length = path_length(find(start, goal), start, goal, neighbors, maze.width)
+                    if length != distance:
+                        mismatches.append((maze_name, moves, source, start, goal, length, distance))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every path source finds shortest paths")
+    parser.add_argument("--pairs", type=int, default=CHECK_PAIRS, help="start/goal pairs per maze")
+    args = parser.parse_args()
+
+    mismatches = verify_paths(args.pairs)
+    for maze, moves, source, start, goal, length, expected in mismatches:
+        print(f"{maze} {moves} {source}: {start} -> {goal} took {length} steps, BFS {expected}")
+    print(f"{len(mismatches)} paths differ from BFS")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,15 +22,48 @@ WALL_COLOR = (33, 33, 255)
 DEBUG_PATH_COLOR = (0, 255, 255, 128)
 
 # Game settings
-FPS = 10
+FPS = 10  # Simulation ticks per second (the game advances in fixed 1/FPS steps)
+RENDER_FPS = 60  # Frames drawn per second, interpolating positions between ticks
+SIM_MAX_FRAME_TIME = 0.25  # Longest real frame time the clock catches up on, in seconds
+SIM_MAX_TICKS_PER_FRAME = 250  # Ticks run per frame at most, the rest are dropped
+FAST_FORWARD_SPEEDS = (1, 2, 5, 10, 100)  # Simulation speeds cycled with the F key
+REPLAY_DIR = None  # Where each played session's inputs are saved on exit, None for off (main.py --record)
 PACMAN_SPEED = 1
 GHOST_SPEED = 0.8
+GHOST_SPEED_STEP = 0.1  # Ghost speed increase when a new level starts
 BLINKY_COLOR = RED
 PINKY_COLOR = PINK
 INKY_COLOR = CYAN
 CLYDE_COLOR = ORANGE
 GHOST_SCARED_COLOR = PURPLE
 
+# Pathfinding settings
+GHOST_PATHFINDER = "tables"  # "tables" (next-hop tables), "search" (A*), "incremental" (MT-D* Lite) or "hpa" (hierarchical)
+# "jps" only pays off on open maps; on generated corridor mazes it is no faster than "flat"
+ASTAR_ENGINE = "flat"  # "flat" (bucket queue), "jps" (Jump Point Search), "junction" (junction graph) or "reference"
+# Landmarks only apply with GHOST_PATHFINDER = "search". On config.MAZE they cut expansions
+# (69 -> 43 per search) but not time; they pay off in time on large mazes
+ASTAR_HEURISTIC = "landmarks"  # "landmarks" (ALT lower bounds from BFS distances) or "manhattan"
+LANDMARK_COUNT = 8  # Landmarks picked per maze for the ALT heuristic
+LANDMARK_ACTIVE = 2  # Landmarks consulted per search, the ones with the best bound at its start
+PATH_CACHE_SIZE = 1024  # Search results kept by the LRU path cache
+LAYOUT_CACHE_SIZE = 4  # Wall layouts whose tables, maps and fields stay cached (set_walls makes new ones)
+ANALYSIS_MAX_CELLS = 1024  # Larger mazes skip the all-pairs tables ("tables" falls back to "hpa")
+HPA_CLUSTER_SIZE = 16  # Side of the square clusters of the hierarchical map
+HPA_ENTRANCE_SPLIT = 6  # Open runs this long across a cluster border get two transitions
+HPA_REFINE_SEGMENTS = 8  # Abstract edges turned into cells per query (ghosts replan before the end)
+FLOW_FIELD_MAX_CELLS = 4096  # Larger mazes keep searching to chase, flee and return home (far ghosts make the BFS cover most of the maze)
+
+# Rendering settings
+TEXT_CACHE_SIZE = 256  # Rendered HUD and overlay strings kept by the LRU text cache
+
+# Profiler settings
+PROFILER_FRAMES = 600  # Samples kept per phase (10 seconds at 60 FPS)
+PROFILER_OVERLAY_REFRESH = 0.5  # Seconds between redraws of the on-screen timings
+PROFILER_DUMP_PATH = "profile.json"  # Phase timings written on exit when profiling
+PROFILER_CPROFILE_FRAMES = 300  # Frames wrapped in cProfile per hotkey press
+PROFILER_CPROFILE_PATH = "profile_window.prof"  # cProfile stats of the last window (for pstats/snakeviz)
+
 # Maze layout
 MAZE = [
     "XXXXXXXXXXXXXXXXXXXXXXXXX",
@@ -66,4 +99,12 @@ UP = (0, -1)
 DOWN = (0, 1)
 LEFT = (-1, 0)
 RIGHT = (1, 0)
-DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
\ No newline at end of file
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+# Abstract actions for headless control (directions match DIRECTIONS order)
+ACTION_UP = 0
+ACTION_DOWN = 1
+ACTION_LEFT = 2
+ACTION_RIGHT = 3
+ACTION_NONE = 4
+ACTIONS = [ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT, ACTION_NONE]
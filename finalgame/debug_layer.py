@@ -0,0 +1,148 @@
+# debug_layer.py - Cached debug overlays for ghost paths and explored cells
+import pygame
+from config import *
+
+try:
+    import numpy as np
+except ImportError:  # The heatmap needs NumPy, the path overlays don't
+    np = None
+
+
+# Fill color of the cached layers, treated as transparent when blitting
+LAYER_KEY = (255, 0, 255)
+
+
+def _layer_surface(size):
+    """Create an RLE colorkeyed surface, which blits far faster than per-pixel alpha"""
+    surface = pygame.Surface(size)
+    surface.fill(LAYER_KEY)
+    surface.set_colorkey(LAYER_KEY, pygame.RLEACCEL)
+    return surface
+
+
+def _bounds(cells):
+    """Get the pixel rectangle covering a collection of grid cells"""
+    xs = [x for x, _ in cells]
+    ys = [y for _, y in cells]
+    left, top = min(xs) * TILE_SIZE, min(ys) * TILE_SIZE
+    return pygame.Rect(left, top,
+                       (max(xs) + 1) * TILE_SIZE - left,
+                       (max(ys) + 1) * TILE_SIZE - top)
+
+
+class DebugLayer:
+    """
+    Debug overlays that are only rebuilt when a ghost replans
+
+    Each ghost's explored cells are drawn into a surface cropped to what
+    they cover, rebuilt when the ghost's plan_version changes and otherwise
+    composited with one blit. Paths are converted to screen points once per
+    plan and drawn with a single pygame.draw.lines call; ghosts only consume
+    their path from the front, so the remaining path is a suffix of those
+    points. The heatmap mode accumulates how often each cell was explored
+    in a NumPy counter grid.
+    """
+    def __init__(self):
+        self.explored_layers = {}  # ghost -> (plan_version, surface, position)
+        self.path_points = {}  # ghost -> (plan_version, screen points of the whole path)
+        self.seen_plans = {}  # ghost -> last plan_version added to the heatmap
+        self.heat = None
+        self.heat_surface = None
+        self.heat_dirty = False
+
+    def reset(self):
+        """Forget all cached overlays and the accumulated heatmap"""
+        self.explored_layers.clear()
+        self.path_points.clear()
+        self.seen_plans.clear()
+        self.heat = None
+        self.heat_surface = None
+
+    def _render_explored(self, ghost):
+        """Draw a ghost's explored cells into a cropped surface"""
+        if not ghost.explored_paths:
+            return None, (0, 0)
+        bounds = _bounds(ghost.explored_paths)
+        surface = _layer_surface(bounds.size)
+        color = DEBUG_PATH_COLOR[:3]  # Opaque, as when drawn straight to the screen
+        for x, y in ghost.explored_paths:
+            pygame.draw.rect(surface, color,
+                             (x * TILE_SIZE + TILE_SIZE//4 - bounds.x,
+                              y * TILE_SIZE + TILE_SIZE//4 - bounds.y,
+                              TILE_SIZE//2, TILE_SIZE//2))
+        return surface, bounds.topleft
+
+
+    def _accumulate(self, game):
+        """Add explored sets from plans not seen yet to the heatmap counters"""
+        shape = (game.maze.height, game.maze.width)
+        if self.heat is None or self.heat.shape != shape:
+            self.heat = np.zeros(shape, dtype=np.int32)
+            self.seen_plans.clear()
+        for ghost in game.ghosts:
+            if self.seen_plans.get(ghost) == ghost.plan_version:
+                continue
+            self.seen_plans[ghost] = ghost.plan_version
+            if ghost.explored_paths:
+                xs, ys = zip(*ghost.explored_paths)
+                self.heat[list(ys), list(xs)] += 1
+                self.heat_dirty = True
+
+    def _render_heatmap(self):
+        """Turn the counter grid into a translucent full-screen surface"""
+        heat = self.heat.T  # surfarray indexes [x, y]
+        level = np.zeros(heat.shape + (3,), dtype=np.uint8)
+        peak = heat.max()
+        if peak > 0:
+            scaled = (np.log1p(heat) / np.log1p(peak) * 255).astype(np.uint8)
+            level[..., 0] = scaled  # Hot cells go red,
+            level[..., 1] = 255 - scaled  # cold explored ones green
+            level[..., 1][heat == 0] = 0
+        surface = pygame.surfarray.make_surface(level)
+        surface = pygame.transform.scale(surface, (heat.shape[0] * TILE_SIZE, heat.shape[1] * TILE_SIZE))
+        surface.set_colorkey(BLACK)
+        surface.set_alpha(160)
+        self.heat_surface = surface
+        self.heat_dirty = False
+
+    def _prune(self, game):
+        """Drop cached overlays of ghosts that are no longer in the game"""
+        ghosts = set(game.ghosts)
+        for cache in (self.explored_layers, self.path_points, self.seen_plans):
+            if len(cache) > len(ghosts):
+                for ghost in [ghost for ghost in cache if ghost not in ghosts]:
+                    del cache[ghost]
+
+    def draw(self, screen, game):
+        """Composite the debug overlays of every ghost onto the screen"""
+        self._prune(game)
+        if np is not None:
+            self._accumulate(game)
+
+        if game.debug_heatmap and np is not None:
+            if self.heat_dirty or self.heat_surface is None:
+                self._render_heatmap()
+            screen.blit(self.heat_surface, (0, 0))
+        else:
+            # Draw explored paths
+            for ghost in game.ghosts:
+                cached = self.explored_layers.get(ghost)
+                if cached is None or cached[0] != ghost.plan_version:
+                    cached = (ghost.plan_version,) + self._render_explored(ghost)
+                    self.explored_layers[ghost] = cached
+                if cached[1] is not None:
+                    screen.blit(cached[1], cached[2])
+
+        # Draw actual paths
+        for ghost in game.ghosts:
+            remaining = len(ghost.path)
+            if remaining < 2:
+                continue
+            cached = self.path_points.get(ghost)
+            if cached is None or cached[0] != ghost.plan_version or len(cached[1]) < remaining:
+                points = [(x * TILE_SIZE + TILE_SIZE//2, y * TILE_SIZE + TILE_SIZE//2)
+                          for x, y in ghost.path]
+                cached = (ghost.plan_version, points)
+                self.path_points[ghost] = cached
+            points = cached[1]
+            pygame.draw.lines(screen, ghost.color, False, points[len(points) - remaining:], 2)
@@ -0,0 +1,252 @@
+# flow_field.py - BFS distance fields that ghosts read their paths off instead of searching
+from array import array
+from collections import deque
+from config import DIRECTIONS
+from layout_cache import LayoutCache
+from maze_grid import as_maze_grid
+
+# Distance of cells the field's source can't reach
+UNREACHABLE = -1
+
+
+class FieldLayout:
+    """
+    Walkable neighbors of every cell of a wall layout, shared by its fields
+
+    Cells are also labeled by connected component, so a field can tell a
+    cell its source can't reach without running its BFS to the end.
+    """
+    def __init__(self, maze, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        walkable = as_maze_grid(maze, grid_width, grid_height).walkable
+        self.positions = [(i % grid_width, i // grid_width) for i in range(grid_width * grid_height)]
+        self.neighbors = []
+        for x, y in self.positions:
+            adjacent = []
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < grid_width and 0 <= ny < grid_height and walkable[ny * grid_width + nx]:
+                    adjacent.append(ny * grid_width + nx)
+            self.neighbors.append(adjacent)
+
+        self.component = array('i', [-1]) * (grid_width * grid_height)
+        label = 0
+        for cell in range(grid_width * grid_height):
+            if walkable[cell] and self.component[cell] < 0:
+                self._label(cell, label)
+                label += 1
+
+    def _label(self, start, label):
+        """Give every cell connected to start the same component label"""
+        component = self.component
+        neighbors = self.neighbors
+        component[start] = label
+        frontier = deque([start])
+        while frontier:
+            cell = frontier.popleft()
+            for neighbor in neighbors[cell]:
+                if component[neighbor] < 0:
+                    component[neighbor] = label
+                    frontier.append(neighbor)
+
+    def index_of(self, pos):
+        """Get the flat index of a position, or None outside the grid"""
+        x, y = pos
+        if 0 <= x < self.grid_width and 0 <= y < self.grid_height:
+            return y * self.grid_width + x
+        return None
+
+
+class DistanceField:
+    """
+    Maze distance from every cell to one source cell
+
+    Built with a single BFS outward from the source. On a grid where every
+    step costs 1 that is also the distance from each cell to the source, so
+    any number of ghosts heading for the source read their path off the
+    field by stepping to a neighbor one closer, with no search of their own.
+    Each cell's downhill step is the cell the BFS reached it from, so
+    reading a path costs one lookup per step, and paths already read are
+    kept for the next ghost that asks from the same cell.
+
+    The BFS only runs as far as the farthest cell asked about so far, and
+    picks up where it stopped when a ghost further out asks, so a field
+    that is replaced after a few queries never pays for the whole maze.
+    """
+    def __init__(self, layout, source):
+        """
+        Args:
+            layout: FieldLayout of the maze
+            source: Tuple (x, y) the distances are measured to
+        """
+        self.layout = layout
+        self.source = tuple(source)
+        size = layout.grid_width * layout.grid_height
+        self.distances = array('i', [UNREACHABLE]) * size
+        self.downhill = array('i', [-1]) * size  # Next cell toward the source
+        self.paths = {}  # Start cell -> path already read
+        self.frontier = deque()  # Cells reached but not yet expanded
+        self.component = -1  # Component label of the source
+
+        start = layout.index_of(self.source)
+        if start is not None:
+            self.distances[start] = 0
+            self.frontier.append(start)
+            self.component = layout.component[start]
+
+    def _reach(self, cell):
+        """
+        Continue the BFS until it reaches a cell or runs out of cells
+        Args:
+            cell: Flat index of the cell
+        Returns:
+            Distance of the cell, UNREACHABLE if the source can't reach it
+        """
+        distances = self.distances
+        if distances[cell] != UNREACHABLE or self.layout.component[cell] != self.component:
+            return distances[cell]
+        downhill = self.downhill
+        neighbors = self.layout.neighbors
+        frontier = self.frontier
+        while distances[cell] == UNREACHABLE and frontier:
+            current = frontier.popleft()
+            next_distance = distances[current] + 1
+            for neighbor in neighbors[current]:
+                if distances[neighbor] == UNREACHABLE:
+                    distances[neighbor] = next_distance
+                    downhill[neighbor] = current
+                    frontier.append(neighbor)
+        return distances[cell]
+
+    def distance(self, pos):
+        """Get the maze distance from a position to the source, or None if unreachable"""
+        cell = self.layout.index_of(pos)
+        if cell is None:
+            return None
+        distance = self._reach(cell)
+        return None if distance == UNREACHABLE else distance
+
+    def next_step(self, pos):
+        """Get the neighbor one step closer to the source, or None at the source or out of reach"""
+        cell = self.layout.index_of(pos)
+        if cell is None or self._reach(cell) <= 0:
+            return None
+        return self.layout.positions[self.downhill[cell]]
+
+    def path(self, pos):
+        """
+        Read a shortest path to the source by walking downhill
+        Args:
+            pos: Tuple (x, y) of starting position
+        Returns:
+            List of coordinates from the step after pos up to the source,
+            empty if the source is unreachable or equal to pos
+        """
+        start = self.layout.index_of(pos)
+        if start is None:
+            return []
+        path = self.paths.get(start)
+        if path is None:
+            self._reach(start)
+            downhill = self.downhill
+            positions = self.layout.positions
+            path = []
+            cell = downhill[start]
+            while cell >= 0:
+                path.append(positions[cell])
+                cell = downhill[cell]
+            self.paths[start] = path
+        # Copy the path, ghosts consume it as they move
+        return list(path)
+
+    def path_from_source(self, pos):
+        """
+        Read a shortest path from the source out to a position
+        Args:
+            pos: Tuple (x, y) of the position to reach
+        Returns:
+            List of coordinates from the step after the source up to pos,
+            empty if pos is unreachable or equal to the source
+        """
+        cell = self.layout.index_of(pos)
+        if cell is None or self._reach(cell) <= 0:
+            return []
+        path = self.path(pos)
+        path.pop()
+        path.reverse()
+        path.append(self.layout.positions[cell])
+        return path
+
+    def _reach_all(self):
+        """Run the BFS to the end, for queries about every cell at once"""
+        distances = self.distances
+        downhill = self.downhill
+        neighbors = self.layout.neighbors
+        frontier = self.frontier
+        while frontier:
+            current = frontier.popleft()
+            next_distance = distances[current] + 1
+            for neighbor in neighbors[current]:
+                if distances[neighbor] == UNREACHABLE:
+                    distances[neighbor] = next_distance
+                    downhill[neighbor] = current
+                    frontier.append(neighbor)
+
+
+def flee_key(runner_distance, chaser_distance, span):
+    """
+    Rank a cell as a place to flee to, higher is better
+    Cells the runner reaches before the chaser come first, then the ones
+    farther from the chaser, then the ones nearer the runner.
+    Args:
+        runner_distance: Maze distance from the runner to the cell
+        chaser_distance: Maze distance from the chaser to the cell
+        span: Any number larger than every distance in the maze
+    Returns:
+        Non-negative integer key
+    """
+    ahead = 1 if runner_distance < chaser_distance else 0
+    return (ahead * span + chaser_distance) * span + span - 1 - runner_distance
+
+
+def flee_path(chaser, pos):
+    """
+    Read a path for a ghost fleeing the source of a field
+    The ghost heads for the cell with the best flee_key. Its own cell never
+    counts, so a fleeing ghost keeps moving even at the end of a dead end,
+    where its best move is back out past the chaser.
+    Args:
+        chaser: DistanceField from the chaser's cell
+        pos: Tuple (x, y) of the ghost's position
+    Returns:
+        List of coordinates from the step after pos up to the goal, empty
+        if the ghost can't move or the chaser can't reach it
+    """
+    runner = DistanceField(chaser.layout, pos)
+    runner._reach_all()
+    chaser._reach_all()
+    span = len(runner.distances) + 1
+    best_key = -1
+    goal = None
+    for cell, (runner_distance, chaser_distance) in enumerate(zip(runner.distances, chaser.distances)):
+        if runner_distance > 0 and chaser_distance != UNREACHABLE:
+            key = flee_key(runner_distance, chaser_distance, span)
+            if key > best_key:
+                best_key = key
+                goal = cell
+    if goal is None:
+        return []
+    return runner.path_from_source(chaser.layout.positions[goal])
+
+
+# Layouts built for the most recent wall versions (see astar.wall_version)
+_layout_cache = LayoutCache()
+
+def get_field_layout(maze, grid_width, grid_height, version):
+    """Get the FieldLayout for a wall layout, building it only the first time"""
+    layout = _layout_cache.get(version)
+    if layout is None:
+        layout = FieldLayout(maze, grid_width, grid_height)
+        _layout_cache.put(version, layout)
+    return layout
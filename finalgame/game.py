@@ -1,14 +1,26 @@
 # game.py - Game mechanics
-import pygame
 import random
 from config import *
-from astar import get_next_move
+from astar import INSTRUMENT_FULL, INSTRUMENT_NONE, NO_EXPLORED, get_next_move, wall_version
+from flow_field import DistanceField, flee_path, get_field_layout
+from hpa import get_hierarchical_map, update_hierarchical_map
+from landmarks import get_landmarks
+from maze_analysis import get_maze_analysis
+from maze_grid import MazeGrid
+from maze_io import maze_size
+from profiler import DISABLED_PROFILER
+from incremental_planner import IncrementalPlanner
+import jps  # Registers the "jps" engine, selectable with ASTAR_ENGINE
+import junction_graph  # Registers the "junction" engine
+from rng import GameRandom
 
 class Entity:
     """Base class for game entities"""
     def __init__(self, x, y):
         self.x = x
         self.y = y
+        self.prev_x = x  # Position at the start of the current tick, for interpolation
+        self.prev_y = y
         self.direction = RIGHT  # Default direction
         self.next_direction = RIGHT
         self.animation_frame = 0
@@ -27,9 +39,25 @@ class Entity:
         return (int(self.x), int(self.y))
     
     def set_position(self, x, y):
-        """Set grid position"""
-        self.x = x
-        self.y = y
+        """Set grid position, jumping there rather than moving"""
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
+    
+    def save_position(self):
+        """Remember the position at the start of a tick"""
+        self.prev_x = self.x
+        self.prev_y = self.y
+    
+    def render_position(self, alpha):
+        """
+        Get the position to draw at, between the last two ticks
+        Args:
+            alpha: Fraction of the next tick that has elapsed (0 to 1)
+        Returns:
+            (x, y) in grid units
+        """
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
 
 class Pacman(Entity):
     """Pacman character"""
@@ -76,35 +104,33 @@ class Pacman(Entity):
     
     def check_collision(self, x, y, maze):
         """Check if position collides with a wall"""
-        # Get grid coordinates
-        grid_x = int(x)
-        grid_y = int(y)
-        
-        # Check boundaries
-        if grid_x < 0 or grid_x >= len(maze[0]) or grid_y < 0 or grid_y >= len(maze):
-            return True
-        
-        # Check for wall collision
-        return maze[grid_y][grid_x] == 'X'
+        # Out-of-bounds positions count as walls
+        return maze.is_wall(int(x), int(y))
     
     def eat_pellet(self, maze):
-        """Check and eat pellets at current position"""
+        """
+        Check and eat pellets at current position
+        Returns:
+            The eaten cell ('.' or 'O'), or None if there was no pellet
+        """
         grid_x, grid_y = int(self.x), int(self.y)
         
+        cell = maze.get_cell(grid_x, grid_y)
+        
         # Check if there's a pellet
-        if maze[grid_y][grid_x] == '.':
-            maze[grid_y] = maze[grid_y][:grid_x] + ' ' + maze[grid_y][grid_x+1:]
+        if cell == '.':
+            maze.set_cell(grid_x, grid_y, ' ')
             self.score += 10
-            return True
+            return cell
         # Check if there's a power pellet
-        elif maze[grid_y][grid_x] == 'O':
-            maze[grid_y] = maze[grid_y][:grid_x] + ' ' + maze[grid_y][grid_x+1:]
+        elif cell == 'O':
+            maze.set_cell(grid_x, grid_y, ' ')
             self.score += 50
             self.power_pellet_active = True
             self.power_pellet_timer = 10  # Power pellet lasts 10 seconds
-            return True
+            return cell
         
-        return False
+        return None
     
     def set_direction(self, direction):
         """Set movement direction"""
@@ -119,6 +145,7 @@ class Ghost(Entity):
         self.speed = GHOST_SPEED
         self.path = []
         self.explored_paths = set()
+        self.plan_version = 0  # Bumped whenever path or explored_paths is replaced
         self.scared = False
         self.reset_position = (x, y)
         self.state = "chase"  # states: chase, scatter, scared, returning
@@ -129,6 +156,7 @@ class Ghost(Entity):
         self.target_position = None
         self.last_position = None  # To detect if ghost is stuck
         self.stuck_counter = 0
+        self.planner = None  # IncrementalPlanner, created on first use
 
 
     def set_personality_offset(self):
@@ -178,6 +206,11 @@ class Ghost(Entity):
         target_pos = self.get_target_position(pacman, grid_width, grid_height)
         self.target_position = target_pos  # Store for visualization
         
+        # Scared ghosts flee on Pac-Man's distance field where the maze has one
+        game = getattr(self, 'game', None)
+        fleeing = (self.scared and not self.eaten and game is not None and
+                   game.field_layout is not None)
+        
         # Update path less frequently to make movement smoother
         # But update more often when scared or if the target has moved significantly
         update_path = False
@@ -186,7 +219,8 @@ class Ghost(Entity):
         if force_path_update:
             update_path = True
         elif self.scared:
-            update_path = self.path_update_timer >= 0.5  # Update more frequently when scared
+            # Update more frequently when scared, and as soon as a flight ends
+            update_path = self.path_update_timer >= 0.5 or (fleeing and not self.path)
         elif not self.path:
             update_path = True  # No path, definitely need to update
         elif target_pos != self.target_position:
@@ -196,14 +230,60 @@ class Ghost(Entity):
         
         if update_path:
             self.path_update_timer = 0
-            next_pos, full_path, explored = get_next_move(
-                current_pos, target_pos, maze, grid_width, grid_height
-            )
+            analysis = None
+            version = None
+            landmarks = None
+            pathfinder = GHOST_PATHFINDER
+            # Explored sets are only worth building while debug mode draws them
+            instrument = INSTRUMENT_NONE
+            if game is not None:
+                version = game.wall_version
+                pathfinder = game.pathfinder
+                landmarks = game.landmarks
+                if game.debug_mode:
+                    instrument = INSTRUMENT_FULL
+                if pathfinder == "tables":
+                    analysis = game.maze_analysis
+            if game is not None and self.eaten and game.use_flow_field:
+                # Home never moves, so its field serves every trip back
+                full_path = game.home_field(self.reset_position).path(current_pos)
+                explored = NO_EXPLORED
+            elif fleeing:
+                # Flee to the farthest cell from Pac-Man this ghost gets to first,
+                # read off the tables if built, else off Pac-Man's field and its own
+                if game.maze_analysis is not None:
+                    full_path = game.maze_analysis.flee_path(current_pos, game.pacman.get_position())
+                else:
+                    full_path = flee_path(game.pacman_field(), current_pos)
+                explored = NO_EXPLORED
+                if full_path:
+                    self.target_position = full_path[-1]
+            elif (game is not None and game.use_flow_field and
+                    target_pos == game.pacman.get_position()):
+                # Every ghost chasing Pac-Man's tile shares one distance field
+                full_path = game.pacman_field().path(current_pos)
+                explored = NO_EXPLORED
+            elif pathfinder == "hpa" and game is not None:
+                # Only the first stretch of the path is refined, replanning extends it
+                full_path, explored = game.hierarchy.path(current_pos, target_pos, instrument)
+            elif pathfinder == "incremental":
+                # Repair the previous search instead of starting over
+                if self.planner is None:
+                    self.planner = IncrementalPlanner()
+                full_path, explored = self.planner.plan(
+                    current_pos, target_pos, maze, grid_width, grid_height, instrument
+                )
+            else:
+                next_pos, full_path, explored = get_next_move(
+                    current_pos, target_pos, maze, grid_width, grid_height, analysis, version,
+                    instrument, estimator=landmarks
+                )
             
             # Make sure we got a valid path
             if full_path:
                 self.path = full_path
                 self.explored_paths = explored
+                self.plan_version += 1
             else:
                 # If no path, try to find a random valid direction
                 self.find_random_direction(maze)
@@ -297,16 +377,13 @@ class Ghost(Entity):
     
     def check_collision(self, x, y, maze):
         """Check if position collides with a wall"""
-        # Get grid coordinates
-        grid_x = int(x)
-        grid_y = int(y)
-        
-        # Check boundaries
-        if grid_x < 0 or grid_x >= len(maze[0]) or grid_y < 0 or grid_y >= len(maze):
-            return True
-        
-        # Check for wall collision
-        return maze[grid_y][grid_x] == 'X'
+        # Out-of-bounds positions count as walls
+        return maze.is_wall(int(x), int(y))
+    
+    def get_rng(self):
+        """Get the game's random generator, or the global one if detached"""
+        game = getattr(self, 'game', None)
+        return game.rng if game is not None else random
     
     def find_random_direction(self, maze):
         """Find a random valid direction to move"""
@@ -324,7 +401,7 @@ class Ghost(Entity):
                 valid_directions.remove(reversed_dir)
         
         if valid_directions:
-            self.direction = random.choice(valid_directions)
+            self.direction = self.get_rng().choice(valid_directions)
     
     def get_target_position(self, pacman, grid_width, grid_height):
         """Get target position based on ghost personality"""
@@ -333,7 +410,8 @@ class Ghost(Entity):
             return self.reset_position
             
         if self.scared:
-            # When scared, move away from Pac-Man
+            # When scared, move away from Pac-Man (only searched for on mazes
+            # too big for distance fields, see Ghost.update)
             pacman_x, pacman_y = pacman.get_position()
             
             # Try to move in the opposite direction from Pac-Man
@@ -355,7 +433,7 @@ class Ghost(Entity):
                 else:
                     corners = [(1, 1), (grid_width-2, 1), 
                               (1, grid_height-2), (grid_width-2, grid_height-2)]
-                    self.scatter_target = random.choice(corners)
+                    self.scatter_target = self.get_rng().choice(corners)
             return self.scatter_target
         else:
             # Chase Pac-Man with personality-based targeting
@@ -432,6 +510,7 @@ class Ghost(Entity):
             self.eaten = True
             self.scared = False
             self.path = []  # Clear current path
+            self.plan_version += 1
             return True  # Ghost was eaten
         elif not self.eaten:
             # Pac-Man gets eaten
@@ -440,9 +519,10 @@ class Ghost(Entity):
     
     def reset(self):
         """Reset ghost to starting position"""
-        self.x, self.y = self.reset_position
+        self.set_position(*self.reset_position)
         self.path = []
         self.explored_paths = set()
+        self.plan_version += 1
         self.state = "chase"
         self.scared = False
         self.eaten = False
@@ -452,8 +532,30 @@ class Ghost(Entity):
 
 class Game:
     """Main game class"""
-    def __init__(self):
+    def __init__(self, seed=None, ghost_speed=GHOST_SPEED, ghost_speed_step=GHOST_SPEED_STEP,
+                 ghost_modes=None, layout=None):
+        """
+        Args:
+            seed: Seed of the game's random generator, None for a random one
+            ghost_speed: Ghost speed on the first level
+            ghost_speed_step: Speed added to ghosts on each new level
+            ghost_modes: List of (mode, seconds) replacing the default schedule
+            layout: Maze rows (e.g. from maze_io.load_maze) replacing config.MAZE;
+                the grid size is taken from it
+        """
         self.state = GAME_START
+        if layout is None:
+            self.layout = MAZE
+            self.grid_width, self.grid_height = GRID_WIDTH, GRID_HEIGHT
+        else:
+            self.layout = list(layout)
+            self.grid_width, self.grid_height = maze_size(self.layout)
+        self.seed = seed
+        self.rng = GameRandom(seed)  # Per-game RNG so seeded runs repeat exactly
+        self.ghost_speed = ghost_speed
+        self.ghost_speed_step = ghost_speed_step  # Speed added to ghosts on each new level
+        self.flow_field_builds = 0  # Distance fields built toward Pac-Man so far
+        self.requested_pathfinder = GHOST_PATHFINDER
         self.maze = self.initialize_maze()
         self.pacman = None
         self.ghosts = []
@@ -461,6 +563,10 @@ class Game:
         self.level = 1
         self.timer = 0
         self.debug_mode = False
+        self.debug_heatmap = False  # Show accumulated exploration instead of paths
+        self.profiler = DISABLED_PROFILER  # Times each phase of update() when enabled
+        self.recorder = None  # ReplayRecorder told about inputs, if recording
+        self.ticks = 0  # Simulation ticks run so far, across levels
 
         # Initialize ghost mode attributes
         self.ghost_modes = [
@@ -473,6 +579,8 @@ class Game:
             ("scatter", 5),    # Scatter for 5 seconds
             ("chase", 0)       # Chase permanently
         ]
+        if ghost_modes is not None:
+            self.ghost_modes = list(ghost_modes)
         self.current_ghost_mode = 0
         self.ghost_mode_timer = 0
         
@@ -480,44 +588,165 @@ class Game:
     
     def initialize_maze(self):
         """Initialize maze with pellets"""
-        maze = []
-        for row in MAZE:
-            # Replace empty spaces with pellets
-            new_row = ""
-            for cell in row:
+        maze = MazeGrid(self.layout, self.grid_width, self.grid_height)
+        for y in range(maze.height):
+            for x in range(maze.width):
+                # Replace empty spaces with pellets
+                cell = maze.get_cell(x, y)
                 if cell == ' ':
-                    new_row += '.'  # Regular pellet
+                    maze.set_cell(x, y, '.')  # Regular pellet
                 elif cell == 'P':  # Pacman starting position
-                    new_row += ' '
+                    maze.set_cell(x, y, ' ')
                 elif cell == 'G':  # Ghost starting position
-                    new_row += ' '
-                else:
-                    new_row += cell
-            maze.append(new_row)
+                    maze.set_cell(x, y, ' ')
         
         # Add some power pellets
         power_pellet_positions = [(3, 3), (21, 3), (3, 15), (21, 15)]
         for x, y in power_pellet_positions:
-            if 0 <= y < len(maze) and 0 <= x < len(maze[y]) and maze[y][x] == '.':
-                maze[y] = maze[y][:x] + 'O' + maze[y][x+1:]
-        
+            if maze.get_cell(x, y) == '.':
+                maze.set_cell(x, y, 'O')
+        
+        # Index the remaining pellets so the win check and AI queries never scan the grid
+        self.pellet_cells = set()
+        self.power_pellet_cells = set()
+        for y in range(maze.height):
+            for x in range(maze.width):
+                cell = maze.get_cell(x, y)
+                if cell == '.':
+                    self.pellet_cells.add((x, y))
+                elif cell == 'O':
+                    self.power_pellet_cells.add((x, y))
+        self.pellets_left = len(self.pellet_cells)
+        self.power_pellets_left = len(self.power_pellet_cells)
+        
+        self.maze = maze
+        self.wall_version = wall_version(maze, self.grid_width, self.grid_height)
+        self.prepare_pathfinding()
         return maze
     
+    def prepare_pathfinding(self, pathfinder=None):
+        """
+        Pick the ghost pathfinder for the current maze and build what it needs
+        The all-pairs tables grow with the square of the open cells, so
+        mazes with more than ANALYSIS_MAX_CELLS of them use the hierarchical
+        map instead. Searches use the landmark heuristic unless
+        ASTAR_HEURISTIC says otherwise, though on the shipped maze it only
+        saves expansions, not time. Distance fields are set up on top
+        of any of them (see prepare_fields).
+        Args:
+            pathfinder: GHOST_PATHFINDER value to switch to; by default the
+                last one requested (the configured one at first) is kept
+        """
+        maze = self.maze
+        if pathfinder is not None:
+            self.requested_pathfinder = pathfinder
+        self.pathfinder = self.requested_pathfinder
+        self.maze_analysis = None
+        if maze.walkable.count(1) <= ANALYSIS_MAX_CELLS:
+            self.maze_analysis = get_maze_analysis(maze, self.grid_width, self.grid_height,
+                                                   self.wall_version)
+        elif self.pathfinder == "tables":
+            self.pathfinder = "hpa"
+        self.hierarchy = None
+        if self.pathfinder == "hpa":
+            self.hierarchy = get_hierarchical_map(maze, self.grid_width, self.grid_height,
+                                                  self.wall_version)
+        self.landmarks = None
+        if self.pathfinder == "search" and ASTAR_HEURISTIC == "landmarks":
+            self.landmarks = get_landmarks(maze, self.grid_width, self.grid_height, self.wall_version)
+        self.prepare_fields()
+    
+    def prepare_fields(self):
+        """
+        Reset the distance fields for the current walls
+        On mazes of up to FLOW_FIELD_MAX_CELLS open cells, scared ghosts
+        flee using the field from Pac-Man (see pacman_field) and one from
+        themselves, or the same two rows of the tables when they are built.
+        Pathfinders other than "tables" also share pacman_field among the
+        ghosts that target Pac-Man's tile, and home_field among eaten ghosts
+        walking back to their home.
+        """
+        self.field_layout = None
+        if self.maze.walkable.count(1) <= FLOW_FIELD_MAX_CELLS:
+            self.field_layout = get_field_layout(self.maze, self.grid_width, self.grid_height,
+                                                 self.wall_version)
+        self.use_flow_field = self.pathfinder != "tables" and self.field_layout is not None
+        self.pacman_distance_field = None
+        self.home_fields = {}  # Home position -> DistanceField, kept until the walls change
+    
+    def pacman_field(self):
+        """
+        Get the distance field from Pac-Man's current tile
+        It is built on first use after Pac-Man enters a new tile, so however
+        many ghosts chase or flee Pac-Man, a tick costs at most one BFS.
+        """
+        position = self.pacman.get_position()
+        field = self.pacman_distance_field
+        if field is None or field.source != position:
+            field = DistanceField(self.field_layout, position)
+            self.pacman_distance_field = field
+            self.flow_field_builds += 1
+        return field
+    
+    def home_field(self, position):
+        """Get the distance field toward a ghost's home, built the first time it is needed"""
+        field = self.home_fields.get(position)
+        if field is None:
+            field = DistanceField(self.field_layout, position)
+            self.home_fields[position] = field
+        return field
+    
+    def set_walls(self, cells, wall=True):
+        """
+        Add or remove walls during play
+        Pellets under new walls are removed. The hierarchical map is updated
+        around the changed cells only; the tables, if used, are rebuilt.
+        Ghosts drop their paths, which may run through the new walls.
+        Args:
+            cells: (x, y) positions to change
+            wall: True to build walls, False to clear them to empty floor
+        """
+        changed = []
+        for x, y in cells:
+            if not self.maze.in_bounds(x, y) or self.maze.is_wall(x, y) == wall:
+                continue
+            cell = self.maze.get_cell(x, y)
+            if cell in ('.', 'O'):
+                self.remove_pellet(x, y, cell)
+            self.maze.set_cell(x, y, 'X' if wall else ' ')
+            changed.append((x, y))
+        if not changed:
+            return
+        
+        for ghost in self.ghosts:
+            ghost.path = []
+            ghost.plan_version += 1
+        
+        hierarchy = self.hierarchy
+        self.wall_version = wall_version(self.maze, self.grid_width, self.grid_height)
+        if hierarchy is not None:
+            self.hierarchy = update_hierarchical_map(hierarchy, self.maze, self.wall_version, changed)
+            self.maze_analysis = None
+            if self.maze.walkable.count(1) <= ANALYSIS_MAX_CELLS:
+                self.maze_analysis = get_maze_analysis(self.maze, self.grid_width, self.grid_height,
+                                                       self.wall_version)
+            self.prepare_fields()
+        else:
+            self.prepare_pathfinding()
+    
+    def find_marker(self, marker):
+        """Get the position of the last occurrence of a layout character, or (None, None)"""
+        for y in range(len(self.layout) - 1, -1, -1):
+            x = self.layout[y].rfind(marker)
+            if x >= 0:
+                return x, y
+        return None, None
+    
     def initialize_entities(self):
         """Initialize pacman and ghosts"""
-        # Find pacman start position
-        pacman_start_x, pacman_start_y = None, None
-        for y, row in enumerate(MAZE):
-            for x, cell in enumerate(row):
-                if cell == 'P':
-                    pacman_start_x, pacman_start_y = x, y
-        
-        # Find ghost start position
-        ghost_start_x, ghost_start_y = None, None
-        for y, row in enumerate(MAZE):
-            for x, cell in enumerate(row):
-                if cell == 'G':
-                    ghost_start_x, ghost_start_y = x, y
+        # Find pacman and ghost start positions
+        pacman_start_x, pacman_start_y = self.find_marker('P')
+        ghost_start_x, ghost_start_y = self.find_marker('G')
         
         # If no P marker found, set default position
         if pacman_start_x is None or pacman_start_y is None:
@@ -554,6 +783,7 @@ class Game:
         # Set reference to the game instance for each ghost
         for ghost in self.ghosts:
             ghost.game = self
+            ghost.speed = self.ghost_speed
     
 
     # Add ghost mode cycling
@@ -586,18 +816,31 @@ class Game:
     def update(self, dt):
         """Update game state"""
         if self.state == GAME_RUNNING:
+            # Each mark() times the code since the previous one
+            profiler = self.profiler
+            
+            # Positions at the start of the tick, for render interpolation
+            self.pacman.save_position()
+            for ghost in self.ghosts:
+                ghost.save_position()
+            
             # Update ghost modes
             self.update_ghost_modes(dt)
+            profiler.mark("ghost_modes")
             
             # Update pacman
             self.pacman.update(self.maze, dt)
             
             # Check for pellet eating
-            self.pacman.eat_pellet(self.maze)
+            eaten = self.pacman.eat_pellet(self.maze)
+            if eaten:
+                self.remove_pellet(int(self.pacman.x), int(self.pacman.y), eaten)
+            profiler.mark("pacman")
             
-            # Update ghosts
+            # Update ghosts (including their path searches)
             for ghost in self.ghosts:
-                ghost.update(self.pacman, self.maze, GRID_WIDTH, GRID_HEIGHT, dt)
+                ghost.update(self.pacman, self.maze, self.grid_width, self.grid_height, dt)
+                profiler.mark(ghost.name)
             
             # Check for pacman/ghost collision
             self.check_ghost_collision()
@@ -605,6 +848,8 @@ class Game:
             # Check win condition
             if self.check_win_condition():
                 self.state = GAME_WON
+            self.ticks += 1
+            profiler.mark("collisions")
     
     def check_ghost_collision(self):
         """Check for collision between pacman and ghosts"""
@@ -630,10 +875,9 @@ class Game:
     def reset_positions(self):
         """Reset pacman and ghost positions"""
         # Find pacman start position
-        for y, row in enumerate(MAZE):
-            for x, cell in enumerate(row):
-                if cell == 'P':
-                    self.pacman.set_position(x, y)
+        x, y = self.find_marker('P')
+        if x is not None:
+            self.pacman.set_position(x, y)
         
         # Reset each ghost
         for ghost in self.ghosts:
@@ -641,13 +885,82 @@ class Game:
     
     def check_win_condition(self):
         """Check if all pellets have been eaten"""
-        for row in self.maze:
-            if '.' in row or 'O' in row:
-                return False  # Still pellets left
-        return True  # All pellets eaten
+        return self.pellets_left == 0 and self.power_pellets_left == 0
+    
+    def remove_pellet(self, x, y, cell):
+        """Update the pellet index after the pellet at (x, y) was eaten"""
+        if cell == 'O':
+            self.power_pellet_cells.discard((x, y))
+            self.power_pellets_left -= 1
+        else:
+            self.pellet_cells.discard((x, y))
+            self.pellets_left -= 1
+    
+    def nearest_pellet(self, pos, include_power=True):
+        """
+        Find the closest remaining pellet by maze distance
+        Args:
+            pos: Tuple (x, y) to search from
+            include_power: Whether power pellets count
+        Returns:
+            Tuple (position, distance), or (None, None) if no pellet is reachable
+        """
+        analysis = self.maze_analysis
+        if analysis is None:
+            return self._nearest_pellet_on_grid(pos, include_power)
+        start = analysis.index_of(pos)
+        if start is None:
+            return None, None
+        
+        # Breadth-first over the precomputed neighbor lists, stopping at the first pellet
+        cells = analysis.cells
+        neighbors = analysis.neighbors
+        visited = {start}
+        frontier = [start]
+        distance = 0
+        while frontier:
+            for index in frontier:
+                cell = cells[index]
+                if cell in self.pellet_cells or (include_power and cell in self.power_pellet_cells):
+                    return cell, distance
+            next_frontier = []
+            for index in frontier:
+                for neighbor in neighbors[index]:
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+            distance += 1
+        return None, None
+    
+    def _nearest_pellet_on_grid(self, pos, include_power):
+        """nearest_pellet for mazes without tables, searching the grid directly"""
+        maze = self.maze
+        pos = tuple(pos)
+        if maze.is_wall(*pos):
+            return None, None
+        visited = {pos}
+        frontier = [pos]
+        distance = 0
+        while frontier:
+            for cell in frontier:
+                if cell in self.pellet_cells or (include_power and cell in self.power_pellet_cells):
+                    return cell, distance
+            next_frontier = []
+            for x, y in frontier:
+                for dx, dy in DIRECTIONS:
+                    neighbor = (x + dx, y + dy)
+                    if neighbor not in visited and not maze.is_wall(*neighbor):
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+            distance += 1
+        return None, None
     
     def reset_game(self):
         """Reset the game for a new level"""
+        if self.recorder is not None:
+            self.recorder.record_reset(self.ticks)
         self.maze = self.initialize_maze()
         self.initialize_entities()
         self.state = GAME_RUNNING
@@ -655,25 +968,41 @@ class Game:
         
         # Increase difficulty
         for ghost in self.ghosts:
-            ghost.speed += 0.1
+            ghost.speed += self.ghost_speed_step
     
     def toggle_debug_mode(self):
         """Toggle debug mode to show A* paths"""
         self.debug_mode = not self.debug_mode
     
+    def toggle_debug_heatmap(self):
+        """Toggle the exploration heatmap shown in debug mode"""
+        self.debug_heatmap = not self.debug_heatmap
+    
+    def apply_action(self, action):
+        """Apply an abstract action (ACTION_*) to pacman"""
+        if action != ACTION_NONE:
+            self.pacman.set_direction(DIRECTIONS[action])
+            if self.recorder is not None:
+                self.recorder.record_action(self.ticks, action)
+    
     def handle_input(self, key):
         """Handle keyboard input"""
+        # Imported here so the simulation itself never needs pygame
+        import pygame
+        
         if self.state == GAME_RUNNING:
             if key == pygame.K_UP:
-                self.pacman.set_direction(UP)
+                self.apply_action(ACTION_UP)
             elif key == pygame.K_DOWN:
-                self.pacman.set_direction(DOWN)
+                self.apply_action(ACTION_DOWN)
             elif key == pygame.K_LEFT:
-                self.pacman.set_direction(LEFT)
+                self.apply_action(ACTION_LEFT)
             elif key == pygame.K_RIGHT:
-                self.pacman.set_direction(RIGHT)
+                self.apply_action(ACTION_RIGHT)
             elif key == pygame.K_d:
                 self.toggle_debug_mode()
+            elif key == pygame.K_h:
+                self.toggle_debug_heatmap()
         elif self.state == GAME_START or self.state == GAME_OVER or self.state == GAME_WON:
             if key == pygame.K_SPACE:
                 self.reset_game()
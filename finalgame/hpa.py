@@ -0,0 +1,355 @@
+# hpa.py - Hierarchical pathfinding (HPA*) for large mazes
+import heapq
+from array import array
+from collections import deque
+from config import HPA_CLUSTER_SIZE, HPA_ENTRANCE_SPLIT, HPA_REFINE_SEGMENTS
+from astar import INSTRUMENT_FULL, NO_EXPLORED, build_neighbor_lists, search_counters
+from layout_cache import LayoutCache
+from maze_grid import as_maze_grid
+
+
+class HierarchicalMap:
+    """
+    Abstract graph over square clusters of a maze (HPA*)
+
+    The grid is cut into cluster_size x cluster_size clusters. Wherever two
+    neighboring clusters share a run of open cells across their border, one
+    transition (two for runs of HPA_ENTRANCE_SPLIT cells or more) joins a
+    cell on each side; these cells are the nodes of the abstract graph.
+    Nodes of the same cluster are linked by their BFS distance inside the
+    cluster. This is built once per wall layout.
+
+    A query links start and goal into the graph with one BFS inside their
+    own clusters, runs A* over the abstract nodes, and only turns the first
+    abstract edges back into cells (ghosts replan long before they get to
+    the end). When walls change, update_cells() rebuilds just the clusters
+    that contain them and their neighbors.
+    """
+    def __init__(self, maze, grid_width, grid_height, cluster_size=HPA_CLUSTER_SIZE):
+        self.maze = as_maze_grid(maze, grid_width, grid_height)
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.cluster_size = cluster_size
+        self.columns = (grid_width + cluster_size - 1) // cluster_size
+        self.rows = (grid_height + cluster_size - 1) // cluster_size
+
+        self.walkable = bytearray(self.maze.walkable)
+        self.neighbors = build_neighbor_lists(self.maze, grid_width, grid_height)
+        self.cluster_of = array('i', [0]) * (grid_width * grid_height)
+        for y in range(grid_height):
+            row = (y // cluster_size) * self.columns
+            for x in range(grid_width):
+                self.cluster_of[y * grid_width + x] = row + x // cluster_size
+
+        self.transitions = {}  # (cluster, right or lower cluster) -> [(cell, cell)]
+        self.cluster_nodes = [set() for _ in range(self.columns * self.rows)]
+        self.edges = {}  # Node cell -> {node cell: cost}
+        self.segments = {}  # (node, node) in one cluster -> refined cells
+
+        clusters = range(self.columns * self.rows)
+        self._rebuild(clusters, [border for c in clusters for border in self._borders(c)])
+
+    def _borders(self, cluster):
+        """Get the keys of the borders a cluster shares with its neighbors"""
+        cx, cy = cluster % self.columns, cluster // self.columns
+        borders = []
+        if cx > 0:
+            borders.append((cluster - 1, cluster))
+        if cx < self.columns - 1:
+            borders.append((cluster, cluster + 1))
+        if cy > 0:
+            borders.append((cluster - self.columns, cluster))
+        if cy < self.rows - 1:
+            borders.append((cluster, cluster + self.columns))
+        return borders
+
+    def _find_transitions(self, border):
+        """List the (cell, cell) pairs crossing a border, one per short run of open cells"""
+        a, b = border
+        size = self.cluster_size
+        width = self.grid_width
+        walkable = self.walkable
+        ax, ay = a % self.columns, a // self.columns
+        if b == a + 1:
+            # Vertical border: cells in the last column of a and first column of b
+            x = (ax + 1) * size - 1
+            pairs = [(y * width + x, y * width + x + 1)
+                     for y in range(ay * size, min((ay + 1) * size, self.grid_height))]
+        else:
+            # Horizontal border: last row of a and first row of b
+            y = (ay + 1) * size - 1
+            pairs = [(y * width + x, (y + 1) * width + x)
+                     for x in range(ax * size, min((ax + 1) * size, width))]
+
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and walkable[pair[0]] and walkable[pair[1]]:
+                run.append(pair)
+                continue
+            if len(run) >= HPA_ENTRANCE_SPLIT:
+                transitions.extend((run[0], run[-1]))
+            elif run:
+                transitions.append(run[(len(run) - 1) // 2])
+            run = []
+        return transitions
+
+    def _cluster_search(self, source, cluster, targets=None):
+        """
+        Breadth-first search that stays inside one cluster
+        Args:
+            source: Cell to start from
+            cluster: Cluster to stay in
+            targets: Optional set of cells; the search stops once all are reached
+        Returns:
+            (distances, parents) dictionaries keyed by cell
+        """
+        cluster_of = self.cluster_of
+        neighbors = self.neighbors
+        distances = {source: 0}
+        parents = {source: -1}
+        remaining = len(targets) - (source in targets) if targets is not None else -1
+        frontier = deque([source])
+        while frontier and remaining:
+            current = frontier.popleft()
+            next_distance = distances[current] + 1
+            for neighbor in neighbors[current]:
+                if neighbor not in distances and cluster_of[neighbor] == cluster:
+                    distances[neighbor] = next_distance
+                    parents[neighbor] = current
+                    frontier.append(neighbor)
+                    if targets is not None and neighbor in targets:
+                        remaining -= 1
+        return distances, parents
+
+    def _rebuild(self, clusters, borders):
+        """Recompute the given borders, then the nodes and edges of the given clusters"""
+        for border in borders:
+            self.transitions[border] = self._find_transitions(border)
+
+        for cluster in clusters:
+            for node in self.cluster_nodes[cluster]:
+                self.edges.pop(node, None)
+            nodes = set()
+            for a, b in self._borders(cluster):
+                side = 0 if a == cluster else 1
+                nodes.update(pair[side] for pair in self.transitions[(a, b)])
+            self.cluster_nodes[cluster] = nodes
+            for node in nodes:
+                self.edges[node] = {}
+
+        for cluster in clusters:
+            # Links across the borders
+            for border in self._borders(cluster):
+                for cell_a, cell_b in self.transitions[border]:
+                    self.edges[cell_a][cell_b] = 1
+                    self.edges[cell_b][cell_a] = 1
+
+            # Links inside the cluster
+            nodes = self.cluster_nodes[cluster]
+            for node in nodes:
+                distances, _ = self._cluster_search(node, cluster, nodes)
+                edges = self.edges[node]
+                for other in nodes:
+                    if other != node and other in distances:
+                        edges[other] = distances[other]
+
+        self.segments.clear()
+
+    def copy(self):
+        """Get a copy that can be updated without changing this map"""
+        other = object.__new__(HierarchicalMap)
+        other.__dict__.update(self.__dict__)
+        other.walkable = bytearray(self.walkable)
+        other.neighbors = list(self.neighbors)
+        other.transitions = dict(self.transitions)
+        other.cluster_nodes = list(self.cluster_nodes)
+        other.edges = {node: dict(links) for node, links in self.edges.items()}
+        other.segments = {}
+        return other
+
+    def update_cells(self, maze, cells):
+        """
+        Bring the graph up to date after walls changed
+        Only the clusters holding the cells and their direct neighbors are
+        rebuilt.
+        Args:
+            maze: MazeGrid with the new walls, the same size as before
+            cells: (x, y) positions whose walls were added or removed
+        """
+        self.maze = maze
+        width = self.grid_width
+        changed = set()
+        for x, y in cells:
+            index = y * width + x
+            self.walkable[index] = maze.walkable[index]
+            changed.add(self.cluster_of[index])
+            # The cell and the cells around it may have gained or lost a neighbor
+            for nx, ny in ((x, y), (x, y + 1), (x + 1, y), (x, y - 1), (x - 1, y)):
+                if 0 <= nx < width and 0 <= ny < self.grid_height:
+                    self.neighbors[ny * width + nx] = [
+                        (ny + dy) * width + nx + dx
+                        for dx, dy in ((0, 1), (1, 0), (0, -1), (-1, 0))
+                        if 0 <= nx + dx < width and 0 <= ny + dy < self.grid_height
+                        and self.walkable[(ny + dy) * width + nx + dx]
+                    ]
+
+        borders = {border for cluster in changed for border in self._borders(cluster)}
+        clusters = {cluster for border in borders for cluster in border}
+        self._rebuild(clusters, borders)
+
+    def _local_path(self, start, goal, cluster):
+        """Get the cells after start up to goal inside one cluster, or None"""
+        key = (start, goal)
+        cells = self.segments.get(key)
+        if cells is not None:
+            return cells
+        _, parents = self._cluster_search(start, cluster, {goal})
+        if goal not in parents:
+            return None
+        cells = []
+        while goal != start:
+            cells.append(goal)
+            goal = parents[goal]
+        cells.reverse()
+        if start in self.edges and key[1] in self.edges:
+            self.segments[key] = cells  # Only node-to-node segments come up again
+        return cells
+
+    def _abstract_search(self, start, goal, start_links, goal_links):
+        """
+        A* over the abstract nodes
+        Returns:
+            (list of cells from start to goal, set of expanded nodes),
+            with an empty list if the goal can't be reached
+        """
+        width = self.grid_width
+        goal_x, goal_y = goal % width, goal // width
+        edges = self.edges
+        g_score = {start: 0}
+        came_from = {start: -1}
+        open_heap = [(0, start)]
+        closed = set()
+        while open_heap:
+            _, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            if current == goal:
+                path = []
+                while current != -1:
+                    path.append(current)
+                    current = came_from[current]
+                path.reverse()
+                return path, closed
+
+            links = edges.get(current, {})
+            if current == start:
+                links = {**links, **start_links}
+            if current in goal_links:
+                links = dict(links)
+                links[goal] = goal_links[current]
+            base = g_score[current]
+            for neighbor, cost in links.items():
+                tentative = base + cost
+                if tentative < g_score.get(neighbor, tentative + 1):
+                    g_score[neighbor] = tentative
+                    came_from[neighbor] = current
+                    h = abs(neighbor % width - goal_x) + abs(neighbor // width - goal_y)
+                    heapq.heappush(open_heap, (tentative + h, neighbor))
+        return [], closed
+
+    def path(self, start, goal, instrument=INSTRUMENT_FULL, max_segments=HPA_REFINE_SEGMENTS):
+        """
+        Find a path between two positions
+        Args:
+            start: Tuple (x, y) of starting position
+            goal: Tuple (x, y) of target position
+            instrument: INSTRUMENT_* level; at INSTRUMENT_FULL the explored
+                set holds the abstract nodes the search expanded
+            max_segments: Abstract edges to turn into cells, or None for
+                all; the path then stops short of the goal
+        Returns:
+            (path, explored): the coordinates after start towards goal
+            (empty if unreachable or already there) and the explored set
+        """
+        width = self.grid_width
+        sx, sy = start
+        gx, gy = goal
+        if not (0 <= sx < width and 0 <= sy < self.grid_height and
+                0 <= gx < width and 0 <= gy < self.grid_height):
+            return [], NO_EXPLORED
+        s = sy * width + sx
+        g = gy * width + gx
+        if s == g or not self.walkable[s] or not self.walkable[g]:
+            return [], NO_EXPLORED
+        start_cluster = self.cluster_of[s]
+        goal_cluster = self.cluster_of[g]
+
+        # Inside one cluster, a local search is usually all it takes
+        if start_cluster == goal_cluster:
+            cells = self._local_path(s, g, start_cluster)
+            if cells is not None:
+                if instrument:
+                    search_counters.record(len(cells))
+                return [(c % width, c // width) for c in cells], NO_EXPLORED
+
+        # Link start and goal to the nodes of their clusters
+        nodes = self.cluster_nodes[start_cluster]
+        distances, _ = self._cluster_search(s, start_cluster, nodes)
+        start_links = {node: distances[node] for node in nodes if node in distances and node != s}
+        nodes = self.cluster_nodes[goal_cluster]
+        distances, _ = self._cluster_search(g, goal_cluster, nodes)
+        goal_links = {node: distances[node] for node in nodes if node in distances}
+
+        abstract, expanded = self._abstract_search(s, g, start_links, goal_links)
+        if instrument:
+            search_counters.record(len(expanded))
+        explored = NO_EXPLORED
+        if instrument == INSTRUMENT_FULL:
+            explored = {(c % width, c // width) for c in expanded}
+        if not abstract:
+            return [], explored
+
+        # Refine the leading abstract edges into cells
+        cells = []
+        cluster_of = self.cluster_of
+        steps = len(abstract) - 1 if max_segments is None else min(max_segments, len(abstract) - 1)
+        for u, v in zip(abstract[:steps], abstract[1:steps + 1]):
+            if cluster_of[u] != cluster_of[v]:
+                cells.append(v)  # Border crossing, the cells are adjacent
+            else:
+                cells.extend(self._local_path(u, v, cluster_of[u]))
+        return [(c % width, c // width) for c in cells], explored
+
+
+# Maps built for the most recent wall versions (see astar.wall_version)
+_hierarchy_cache = LayoutCache()
+
+def get_hierarchical_map(maze, grid_width, grid_height, version):
+    """Get the HierarchicalMap for a wall layout, building it only the first time"""
+    hierarchy = _hierarchy_cache.get(version)
+    if hierarchy is None:
+        hierarchy = HierarchicalMap(maze, grid_width, grid_height)
+        _hierarchy_cache.put(version, hierarchy)
+    return hierarchy
+
+def update_hierarchical_map(hierarchy, maze, version, cells):
+    """
+    Get the map for a wall layout that differs from a known one in a few cells
+    The old map is copied and only the clusters around the cells are
+    rebuilt; it stays valid for the old layout, which other games may use.
+    Args:
+        hierarchy: Map of the layout before the change
+        maze: MazeGrid with the new walls
+        version: Wall version of the new layout
+        cells: (x, y) positions whose walls changed
+    Returns:
+        HierarchicalMap for the new layout
+    """
+    updated = _hierarchy_cache.get(version)
+    if updated is None:
+        updated = hierarchy.copy()
+        updated.update_cells(maze, cells)
+        _hierarchy_cache.put(version, updated)
+    return updated
@@ -0,0 +1,247 @@
+# incremental_planner.py - Incremental replanning for moving targets (MT-D* Lite)
+import heapq
+from astar import INSTRUMENT_FULL, NO_EXPLORED, build_neighbor_lists, search_counters
+from maze_grid import wall_changes
+
+INF = float('inf')
+
+
+class IncrementalPlanner:
+    """
+    Moving Target D* Lite planner that keeps its search between calls
+
+    The search tree is rooted at the ghost and grown towards the target
+    like LPA*. When the target moves the old keys stay valid lower bounds
+    (km absorbs the heuristic change), and when the ghost moves along its
+    path only the part of the tree that no longer hangs below the ghost's
+    new cell is thrown away. Everything else is repaired in place.
+
+    In the game's own chase that repair does not pay: ghosts replan over
+    short distances, so it expands about as many cells as a fresh search
+    and takes longer (see the replan.chase benchmarks).
+    """
+    def __init__(self):
+        self.maze = None
+        self.layout = None
+        self.neighbors = None
+        self.start = None
+        self.goal = None
+
+        # Stats for comparing against a full re-search
+        self.last_expanded = 0
+        self.total_expanded = 0
+        self.replans = 0
+        self.resets = 0
+
+    def reset(self, start, goal):
+        """Throw away the search state and start a fresh search"""
+        size = self.layout[0] * self.layout[1]
+        self.g = [INF] * size
+        self.rhs = [INF] * size
+        self.parent = [-1] * size
+        self.open_keys = {}  # Cell -> key it is queued with
+        self.open_heap = []
+        self.touched = set()  # Cells with a parent or finite value
+        self.km = 0
+        self.start = start
+        self.goal = goal
+        self.rhs[start] = 0
+        self.touched.add(start)
+        self._update_state(start)
+        self.resets += 1
+
+    def _heuristic(self, cell):
+        width = self.layout[0]
+        return (abs(cell % width - self.goal % width) +
+                abs(cell // width - self.goal // width))
+
+    def _calculate_key(self, cell):
+        value = min(self.g[cell], self.rhs[cell])
+        return (value + self._heuristic(cell) + self.km, value)
+
+    def _update_state(self, cell):
+        """Queue the cell if it is inconsistent, dequeue it otherwise"""
+        if self.g[cell] != self.rhs[cell]:
+            key = self._calculate_key(cell)
+            if self.open_keys.get(cell) != key:
+                self.open_keys[cell] = key
+                heapq.heappush(self.open_heap, (key, cell))
+        elif cell in self.open_keys:
+            del self.open_keys[cell]  # Its heap entry is now stale
+
+    def _top(self):
+        """Get the best queued (key, cell), skipping stale heap entries"""
+        heap = self.open_heap
+        while heap:
+            key, cell = heap[0]
+            if self.open_keys.get(cell) == key:
+                return key, cell
+            heapq.heappop(heap)
+        return (INF, INF), -1
+
+    def _best_parent(self, cell):
+        """Recompute rhs and parent of a cell from its neighbors"""
+        best = INF
+        best_parent = -1
+        for neighbor in self.neighbors[cell]:
+            if self.g[neighbor] + 1 < best:
+                best = self.g[neighbor] + 1
+                best_parent = neighbor
+        self.rhs[cell] = best
+        self.parent[cell] = best_parent
+
+    def _compute_path(self, collect=True):
+        """Expand cells until the goal is consistent and settled, collecting them if asked"""
+        g = self.g
+        rhs = self.rhs
+        parent = self.parent
+        goal = self.goal
+        expanded = set()
+        expansions = 0
+
+        while True:
+            key, cell = self._top()
+            if cell == -1 or (key >= self._calculate_key(goal) and rhs[goal] <= g[goal]):
+                break
+
+            new_key = self._calculate_key(cell)
+            if key < new_key:
+                # Key was computed for an older goal, requeue it
+                self.open_keys[cell] = new_key
+                heapq.heappush(self.open_heap, (new_key, cell))
+                continue
+
+            if collect:
+                expanded.add(cell)
+            expansions += 1
+            if g[cell] > rhs[cell]:
+                # Overconsistent: settle it and relax the neighbors
+                g[cell] = rhs[cell]
+                del self.open_keys[cell]
+                for neighbor in self.neighbors[cell]:
+                    if neighbor != self.start and rhs[neighbor] > g[cell] + 1:
+                        parent[neighbor] = cell
+                        rhs[neighbor] = g[cell] + 1
+                        self.touched.add(neighbor)
+                        self._update_state(neighbor)
+            else:
+                # Underconsistent: invalidate it and everything hanging off it
+                g[cell] = INF
+                for neighbor in self.neighbors[cell] + [cell]:
+                    if neighbor != self.start and parent[neighbor] == cell:
+                        self._best_parent(neighbor)
+                    self._update_state(neighbor)
+
+        return expanded, expansions
+
+    def _move_start(self, new_start):
+        """
+        Re-root the search tree at the ghost's new cell
+        Returns:
+            False if the new cell isn't in the tree and a reset is needed
+        """
+        if self.g[new_start] == INF and self.rhs[new_start] == INF:
+            return False
+
+        parent = self.parent
+        self.parent[new_start] = -1
+        self.start = new_start
+
+        # Cells whose parent chain doesn't reach the new start are deleted
+        in_subtree = {new_start: True}
+        for cell in self.touched:
+            chain = []
+            current = cell
+            while current not in in_subtree:
+                chain.append(current)
+                current = parent[current]
+                if current == -1:
+                    break
+            result = current != -1 and in_subtree[current]
+            for link in chain:
+                in_subtree[link] = result
+
+        deleted = [cell for cell, kept in in_subtree.items() if not kept]
+        for cell in deleted:
+            parent[cell] = -1
+            self.g[cell] = INF
+            self.rhs[cell] = INF
+            self.open_keys.pop(cell, None)
+            self.touched.discard(cell)
+
+        # Reattach deleted cells that border the surviving tree
+        for cell in deleted:
+            self._best_parent(cell)
+            if self.rhs[cell] < INF:
+                self.touched.add(cell)
+                self._update_state(cell)
+        return True
+
+    def plan(self, start, goal, maze, grid_width, grid_height, instrument=INSTRUMENT_FULL):
+        """
+        Plan a path from start to goal, reusing the previous search
+        Args:
+            start: Tuple (x, y) of the ghost's position
+            goal: Tuple (x, y) of target position
+            maze: 2D list representing the maze layout
+            grid_width: Width of the grid
+            grid_height: Height of the grid
+            instrument: INSTRUMENT_* level, as for a_star
+        Returns:
+            Same (path, explored) pair as a_star, where explored holds the
+            cells expanded by this replan only
+        """
+        # Pellets never touch walkability, Game.set_walls does (see MazeGrid.wall_changes)
+        layout = (grid_width, grid_height, wall_changes(maze))
+        new_maze = maze is not self.maze or layout != self.layout
+        if new_maze:
+            self.maze = maze
+            self.layout = layout
+            self.neighbors = build_neighbor_lists(maze, grid_width, grid_height)
+
+        start = start[1] * grid_width + start[0]
+        goal = goal[1] * grid_width + goal[0]
+        if new_maze or self.start is None:
+            self.reset(start, goal)
+        else:
+            if goal != self.goal:
+                old_goal = self.goal
+                self.goal = goal
+                self.km += self._heuristic(old_goal)
+            if start != self.start and not self._move_start(start):
+                self.reset(start, goal)
+
+        collect = instrument == INSTRUMENT_FULL
+        expanded, expansions = self._compute_path(collect)
+        self.last_expanded = expansions
+        self.total_expanded += expansions
+        self.replans += 1
+        if instrument:
+            search_counters.record(expansions)
+
+        if collect:
+            explored = {(cell % grid_width, cell // grid_width) for cell in expanded}
+        else:
+            explored = NO_EXPLORED
+        if self.rhs[goal] == INF:
+            return [], explored
+
+        path = []
+        cell = goal
+        while cell != start:
+            if cell == -1:
+                return [], explored
+            path.append((cell % grid_width, cell // grid_width))
+            cell = self.parent[cell]
+        path.reverse()
+        return path, explored
+
+    def stats(self):
+        """Get expansion counters"""
+        return {
+            "replans": self.replans,
+            "resets": self.resets,
+            "last_expanded": self.last_expanded,
+            "total_expanded": self.total_expanded,
+            "mean_expanded": self.total_expanded / self.replans if self.replans else 0.0,
+        }
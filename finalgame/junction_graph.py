@@ -0,0 +1,276 @@
+# junction_graph.py - Corridor-compressed graph of junctions for pathfinding
+import heapq
+from array import array
+from astar import (INSTRUMENT_FULL, NO_EXPLORED, a_star_flat, build_neighbor_lists,
+                   register_engine, search_counters)
+from maze_grid import as_maze_grid, wall_changes
+
+# Search keys of the query's own endpoints (graph nodes are numbered from 0)
+START = -1
+GOAL = -2
+
+
+class JunctionGraph:
+    """
+    Weighted graph of the junctions and dead ends of a maze
+
+    Every open cell with other than two open neighbors becomes a node, and
+    each corridor of two-neighbor cells between two nodes becomes one edge
+    weighted by its length in steps. Corridors that loop without meeting a
+    node get one of their cells promoted to a node. A maze made mostly of
+    one-tile corridors turns into a graph several times smaller than its
+    grid (5.5x fewer nodes on config.MAZE, 4.4x on a 151x151 generated
+    maze), which is built once per wall layout.
+
+    A query that starts or ends inside a corridor is linked to the
+    corridor's two end nodes on the fly, so nothing is added to the graph.
+    """
+    def __init__(self, maze, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.walkable = bytearray(as_maze_grid(maze, grid_width, grid_height).walkable)
+        neighbors = build_neighbor_lists(maze, grid_width, grid_height)
+
+        size = grid_width * grid_height
+        self.node_of = array('i', [-1]) * size  # Cell -> node id
+        self.corridor_of = array('i', [-1]) * size  # Cell -> corridor id
+        self.position_of = array('i', [0]) * size  # Cell -> index in its corridor's cells
+        self.node_cells = []  # Node id -> cell
+        self.corridors = []  # Corridor id -> (node, node, cells from the first node to the second)
+        self.adjacency = []  # Node id -> [(node, cost, corridor, from position, to position)]
+
+        for cell in range(size):
+            if self.walkable[cell] and len(neighbors[cell]) != 2:
+                self._add_node(cell)
+        for node in range(len(self.node_cells)):
+            self._trace_corridors(node, neighbors)
+
+        # Whatever is left are loops of corridor cells without any node
+        for cell in range(size):
+            if self.walkable[cell] and self.node_of[cell] < 0 and self.corridor_of[cell] < 0:
+                self._trace_corridors(self._add_node(cell), neighbors)
+
+    def _add_node(self, cell):
+        """Make a cell a graph node"""
+        node = len(self.node_cells)
+        self.node_of[cell] = node
+        self.node_cells.append(cell)
+        self.adjacency.append([])
+        return node
+
+    def _trace_corridors(self, node, neighbors):
+        """Follow each corridor leaving a node to the node at its other end"""
+        node_of = self.node_of
+        start_cell = self.node_cells[node]
+        for first in neighbors[start_cell]:
+            if self.corridor_of[first] >= 0:
+                continue  # Already traced from its other end
+            if node_of[first] >= 0 and node_of[first] < node:
+                continue  # Adjacent nodes, linked when the lower one was traced
+            previous, cell = start_cell, first
+            cells = []
+            while node_of[cell] < 0:
+                cells.append(cell)
+                a, b = neighbors[cell]
+                previous, cell = cell, (b if a == previous else a)
+            other = node_of[cell]
+
+            corridor = len(self.corridors)
+            self.corridors.append((node, other, cells))
+            for position, corridor_cell in enumerate(cells):
+                self.corridor_of[corridor_cell] = corridor
+                self.position_of[corridor_cell] = position
+            # Positions run from -1 (first node) to len(cells) (second node)
+            cost = len(cells) + 1
+            self.adjacency[node].append((other, cost, corridor, -1, len(cells)))
+            self.adjacency[other].append((node, cost, corridor, len(cells), -1))
+
+    @property
+    def node_count(self):
+        return len(self.node_cells)
+
+    @property
+    def edge_count(self):
+        return len(self.corridors)
+
+    def stats(self):
+        """Get the size of the graph next to the size of the grid it replaces"""
+        cells = self.walkable.count(1)
+        return {
+            "cells": cells,
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "reduction": cells / self.node_count if self.node_count else 0.0,
+        }
+
+    def _cell_at(self, corridor, position):
+        """Get the cell at a position along a corridor (-1 and len are its end nodes)"""
+        first, second, cells = self.corridors[corridor]
+        if position < 0:
+            return self.node_cells[first]
+        if position >= len(cells):
+            return self.node_cells[second]
+        return cells[position]
+
+    def _endpoint_links(self, cell):
+        """
+        Get the graph nodes a query endpoint connects to
+        Returns:
+            List of (node, cost, corridor, position of the endpoint,
+            position of the node); a node endpoint links to itself at cost 0
+        """
+        node = self.node_of[cell]
+        if node >= 0:
+            return [(node, 0, -1, 0, 0)]
+        corridor = self.corridor_of[cell]
+        position = self.position_of[cell]
+        first, second, cells = self.corridors[corridor]
+        return [(first, position + 1, corridor, position, -1),
+                (second, len(cells) - position, corridor, position, len(cells))]
+
+    def path(self, start, goal, instrument=INSTRUMENT_FULL, estimator=None):
+        """
+        Find a shortest path between two cells
+        Args:
+            start: Tuple (x, y) of starting position
+            goal: Tuple (x, y) of target position
+            instrument: INSTRUMENT_* level; the explored set holds the
+                junction cells expanded
+            estimator: Optional heuristic object (see astar.a_star),
+                Manhattan by default
+        Returns:
+            List of coordinates from the cell after start to goal, and the
+            set of explored positions
+        """
+        width = self.grid_width
+        start_x, start_y = start
+        goal_x, goal_y = goal
+        collect = instrument == INSTRUMENT_FULL
+        explored_paths = set() if collect else NO_EXPLORED
+        if not (0 <= start_x < width and 0 <= start_y < self.grid_height and
+                0 <= goal_x < width and 0 <= goal_y < self.grid_height):
+            return [], explored_paths
+        start_cell = start_y * width + start_x
+        goal_cell = goal_y * width + goal_x
+        if start_cell == goal_cell or not self.walkable[start_cell] or not self.walkable[goal_cell]:
+            return [], explored_paths
+
+        node_cells = self.node_cells
+        adjacency = self.adjacency
+
+        if estimator is not None:
+            bound = estimator.for_goal(goal, start)
+
+            def estimate(node):
+                return bound(node_cells[node])
+        else:
+            def estimate(node):
+                cell = node_cells[node]
+                return abs(cell % width - goal_x) + abs(cell // width - goal_y)
+
+        # came_from[key] = (previous key, corridor, from position, to position)
+        g_score = {}
+        came_from = {}
+        open_heap = []
+
+        def relax(key, cost, link):
+            if cost < g_score.get(key, cost + 1):
+                g_score[key] = cost
+                came_from[key] = link
+                heapq.heappush(open_heap, (cost + (estimate(key) if key >= 0 else 0), key))
+
+        for node, cost, corridor, position, node_position in self._endpoint_links(start_cell):
+            relax(node, cost, (START, corridor, position, node_position))
+
+        # Links from the goal's corridor ends into the goal, by node
+        goal_links = {}
+        for node, cost, corridor, position, node_position in self._endpoint_links(goal_cell):
+            if cost < goal_links.get(node, (cost + 1,))[0]:
+                goal_links[node] = (cost, corridor, node_position, position)
+        # Start and goal in the same corridor can also meet without leaving it
+        corridor = self.corridor_of[start_cell]
+        if corridor >= 0 and corridor == self.corridor_of[goal_cell]:
+            relax(GOAL, abs(self.position_of[start_cell] - self.position_of[goal_cell]),
+                  (START, corridor, self.position_of[start_cell], self.position_of[goal_cell]))
+
+        closed = set()
+        expansions = 0
+        found = False
+        while open_heap:
+            _, key = heapq.heappop(open_heap)
+            if key in closed:
+                continue
+            closed.add(key)
+            expansions += 1
+            if key == GOAL:
+                found = True
+                break
+            if collect:
+                cell = node_cells[key]
+                explored_paths.add((cell % width, cell // width))
+
+            current_g = g_score[key]
+            link = goal_links.get(key)
+            if link is not None:
+                cost, corridor, node_position, position = link
+                relax(GOAL, current_g + cost, (key, corridor, node_position, position))
+            for node, cost, corridor, from_position, to_position in adjacency[key]:
+                if node not in closed:
+                    relax(node, current_g + cost, (key, corridor, from_position, to_position))
+
+        if instrument:
+            search_counters.record(expansions)
+        if not found:
+            return [], explored_paths
+
+        # Walk the hops back to the start, then expand each into its cells
+        hops = []
+        key = GOAL
+        while key != START:
+            previous, corridor, from_position, to_position = came_from[key]
+            hops.append((corridor, from_position, to_position))
+            key = previous
+        hops.reverse()
+
+        path = []
+        for corridor, from_position, to_position in hops:
+            if corridor < 0:
+                continue  # An endpoint on a node links to itself
+            step = 1 if to_position > from_position else -1
+            for position in range(from_position + step, to_position + step, step):
+                cell = self._cell_at(corridor, position)
+                path.append((cell % width, cell // width))
+        return path, explored_paths
+
+
+class JunctionEngine:
+    """Keeps the junction graph of the last maze searched, rebuilt when its walls change"""
+    def __init__(self):
+        self.maze = None
+        self.layout = None
+        self.graph = None
+
+    def search(self, start, goal, maze, grid_width, grid_height, allow_diagonal=False,
+               instrument=INSTRUMENT_FULL, estimator=None):
+        """Same contract as astar.a_star_reference"""
+        if allow_diagonal:
+            # Corridors are 4-connected, diagonal moves would cut across them
+            return a_star_flat(start, goal, maze, grid_width, grid_height, True, instrument, estimator)
+        # Pellets never touch walkability, Game.set_walls does (see MazeGrid.wall_changes)
+        layout = (grid_width, grid_height, wall_changes(maze))
+        if maze is not self.maze or layout != self.layout:
+            self.maze = maze
+            self.layout = layout
+            self.graph = JunctionGraph(maze, grid_width, grid_height)
+        return self.graph.path(start, goal, instrument, estimator)
+
+
+_junction_engine = JunctionEngine()
+
+def a_star_junction(start, goal, maze, grid_width, grid_height, allow_diagonal=False,
+                    instrument=INSTRUMENT_FULL, estimator=None):
+    """A* over the maze's junction graph (see JunctionGraph)"""
+    return _junction_engine.search(tuple(start), tuple(goal), maze, grid_width, grid_height,
+                                   allow_diagonal, instrument, estimator)
+
+register_engine("junction", a_star_junction)
@@ -0,0 +1,189 @@
+# landmarks.py - Landmark (ALT) heuristic for A*
+import argparse
+import time
+from array import array
+from collections import deque
+from config import *
+from astar import INSTRUMENT_COUNTS, a_star, build_neighbor_lists, search_counters
+from layout_cache import LayoutCache
+from maze_grid import MazeGrid, as_maze_grid
+from maze_io import load_maze, maze_size
+
+
+class LandmarkHeuristic:
+    """
+    Differential heuristic from BFS distances to a few landmark cells
+
+    For any landmark L, the triangle inequality gives
+    dist(a, goal) >= |dist(L, a) - dist(L, goal)|, so the largest of these
+    bounds over all landmarks (and the Manhattan distance) is an admissible
+    and consistent A* heuristic. Landmarks on the edges of the maze make the
+    bound exact for every cell whose shortest path to the goal runs through
+    or away from them, which is most of them in a maze with long detours.
+
+    Landmarks are picked by farthest-point selection, and the distances
+    from each are kept in one compact array indexed by flat cell index.
+    A query only consults the few landmarks that give the best bound at its
+    start, since checking all of them for every node costs more time than
+    the extra nodes they save.
+
+    Pass it to a_star (or get_next_move) as estimator; engines call
+    for_goal(goal, start) once per search and then the returned function
+    with flat cell indices (y * grid_width + x).
+    """
+    def __init__(self, maze, grid_width, grid_height, count=LANDMARK_COUNT, allow_diagonal=False,
+                 active=LANDMARK_ACTIVE):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.allow_diagonal = allow_diagonal
+        self.active = active
+        walkable = as_maze_grid(maze, grid_width, grid_height).walkable
+        self.neighbors = build_neighbor_lists(maze, grid_width, grid_height, allow_diagonal)
+
+        self.landmarks = []  # Flat cell indices
+        distances = []
+        first = walkable.find(1)
+        if first >= 0:
+            # Farthest-point selection, starting from the far end of the maze
+            closest = self._bfs(first)
+            for _ in range(count):
+                cell = max(range(len(closest)), key=closest.__getitem__)
+                if closest[cell] <= 0:
+                    break  # Every reachable cell is already a landmark
+                self.landmarks.append(cell)
+                distances.append(self._bfs(cell))
+                if len(distances) == 1:
+                    closest = distances[0]
+                else:
+                    closest = [min(a, b) for a, b in zip(closest, distances[-1])]
+        self.count = len(self.landmarks)
+
+        # Cells a landmark can't reach get a distance past any real one
+        longest = max((max(row) for row in distances), default=0)
+        self.unreachable = longest + 1
+        typecode = 'H' if self.unreachable < 0x10000 else 'I'
+        self.distances = [array(typecode, [self.unreachable if d < 0 else d for d in row])
+                          for row in distances]
+
+    def _bfs(self, source):
+        """BFS distances from a cell, -1 for cells it can't reach"""
+        distance = [-1] * (self.grid_width * self.grid_height)
+        distance[source] = 0
+        neighbors = self.neighbors
+        queue = deque([source])
+        while queue:
+            cell = queue.popleft()
+            next_distance = distance[cell] + 1
+            for neighbor in neighbors[cell]:
+                if distance[neighbor] < 0:
+                    distance[neighbor] = next_distance
+                    queue.append(neighbor)
+        return distance
+
+    def landmark_positions(self):
+        """Get the landmarks as (x, y) positions"""
+        return [(cell % self.grid_width, cell // self.grid_width) for cell in self.landmarks]
+
+    def select(self, goal, start=None):
+        """
+        Pick the landmarks to use toward a goal
+        Args:
+            goal: Tuple (x, y) of target position
+            start: Optional tuple (x, y) of the search's start; the
+                landmarks with the largest bound there are picked first
+        Returns:
+            List of (distance array, distance of the goal) pairs
+        """
+        width = self.grid_width
+        goal_x, goal_y = goal
+        if not (0 <= goal_x < width and 0 <= goal_y < self.grid_height):
+            return []
+        goal_cell = goal_y * width + goal_x
+        # Landmarks that can't reach the goal say nothing about paths to it
+        usable = [row for row in self.distances if row[goal_cell] != self.unreachable]
+        if start is not None:
+            start_cell = start[1] * width + start[0]
+            usable.sort(key=lambda row: -abs(row[start_cell] - row[goal_cell]))
+        return [(row, row[goal_cell]) for row in usable[:self.active]]
+
+    def for_goal(self, goal, start=None):
+        """
+        Get the heuristic toward one goal
+        Args:
+            goal: Tuple (x, y) of target position
+            start: Optional tuple (x, y) of the search's start (see select)
+        Returns:
+            Function of a flat cell index giving a lower bound on its
+            distance to the goal
+        """
+        width = self.grid_width
+        goal_x, goal_y = goal
+        diagonal = self.allow_diagonal
+        selected = self.select(goal, start)
+
+        def estimate(cell):
+            dx = abs(cell % width - goal_x)
+            dy = abs(cell // width - goal_y)
+            bound = (dx if dx > dy else dy) if diagonal else dx + dy
+            for row, goal_distance in selected:
+                difference = row[cell] - goal_distance
+                if difference < 0:
+                    difference = -difference
+                if difference > bound:
+                    bound = difference
+            return bound
+        return estimate
+
+
+# Landmarks picked for the most recent wall versions (see astar.wall_version)
+_landmark_cache = LayoutCache()
+
+def get_landmarks(maze, grid_width, grid_height, version, count=LANDMARK_COUNT):
+    """Get the LandmarkHeuristic for a wall layout, building it only the first time"""
+    landmarks = _landmark_cache.get((version, count))
+    if landmarks is None:
+        landmarks = LandmarkHeuristic(maze, grid_width, grid_height, count)
+        _landmark_cache.put((version, count), landmarks)
+    return landmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare node expansions of Manhattan and landmark heuristics over all cell pairs")
+    parser.add_argument("--maze", help="maze file to use instead of config.MAZE")
+    parser.add_argument("--count", type=int, nargs="+", default=[LANDMARK_COUNT],
+                        help="landmark counts to try")
+    parser.add_argument("--engine", default="flat", help="A* engine to search with")
+    args = parser.parse_args()
+
+    if args.maze:
+        rows = load_maze(args.maze)
+        width, height = maze_size(rows)
+    else:
+        rows, width, height = MAZE, GRID_WIDTH, GRID_HEIGHT
+    maze = MazeGrid(rows, width, height)
+    cells = [(x, y) for y in range(height) for x in range(width) if not maze.is_wall(x, y)]
+    pairs = [(start, goal) for start in cells for goal in cells if start != goal]
+
+    def measure(heuristic):
+        """Mean expansions and microseconds per query"""
+        search_counters.clear()
+        start_time = time.perf_counter()
+        for start, goal in pairs:
+            a_star(start, goal, maze, width, height, instrument=INSTRUMENT_COUNTS,
+                   engine=args.engine, estimator=heuristic)
+        elapsed = time.perf_counter() - start_time
+        return search_counters.stats()["mean_expanded"], elapsed / len(pairs) * 1e6
+
+    baseline, baseline_time = measure(None)
+    print(f"{len(cells)} open cells, {len(pairs)} queries")
+    print(f"manhattan       {baseline:8.1f} expanded/query {baseline_time:8.1f} us/query")
+    for count in args.count:
+        landmarks = LandmarkHeuristic(maze, width, height, count)
+        expanded, query_time = measure(landmarks)
+        print(f"{count:2d} landmarks    {expanded:8.1f} expanded/query {query_time:8.1f} us/query "
+              f"({100 * (1 - expanded / baseline):.0f}% fewer expansions)")
+
+
+if __name__ == "__main__":
+    main()
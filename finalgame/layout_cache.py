@@ -0,0 +1,39 @@
+# layout_cache.py - Small LRU cache of structures built once per wall layout
+from collections import OrderedDict
+from config import LAYOUT_CACHE_SIZE
+
+
+class LayoutCache:
+    """
+    Bounded LRU cache keyed by wall version (see astar.wall_version)
+
+    Tables, maps and fields built for a wall layout are shared by every
+    game on it, but Game.set_walls makes a new layout with each change, so
+    only the most recently used few are kept. Games hold on to the ones
+    they use, so evicting an entry only means the next game on that layout
+    builds it again.
+    """
+    def __init__(self, maxsize=LAYOUT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Get a cached entry, or None on a miss"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, value):
+        """Store an entry, evicting the least recently used one if full"""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries"""
+        self.entries.clear()
@@ -1,121 +1,172 @@
 # main.py - Main game loop and rendering
-import pygame
-import sys
 import time
+_start_time = time.perf_counter()  # Taken before the heavy imports, for the startup report
+
+import argparse
+import os
+import sys
+import pygame
 from config import *
-from game import Game
+from debug_layer import DebugLayer
+from profiler import FrameProfiler, ProfileWindow
+from renderer import Renderer, TextCache
+from sim_clock import FixedStepClock
 from sprite_loader import SpriteLoader
 
-# Initialize pygame
-pygame.init()
-pygame.display.set_caption("Pac-Man with A* Pathfinding")
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-clock = pygame.time.Clock()
+# Startup phases in the order they finished, with their duration in seconds
+# ("to first frame" is the total from launch until the start screen is shown)
+startup_times = {"imports": time.perf_counter() - _start_time}
 
-# Font setup
-pygame.font.init()
-font_large = pygame.font.Font(None, 64)
-font_medium = pygame.font.Font(None, 36)
-font_small = pygame.font.Font(None, 24)
+# Created by main() or on first use
+screen = None
+clock = None
+sim_clock = FixedStepClock()
+recorder = None
+game = None
+renderer = None
+sprites = None
+fonts = {}
+text_cache = TextCache()
+debug_layer = DebugLayer()
 
-# Load sprites
-sprites = SpriteLoader()
+# Frame phase timing, toggled with F3, and cProfile windows, started with F4
+profiler = FrameProfiler(enabled=False)
+profile_window = ProfileWindow()
+profiler_overlay = None  # (surface, time it was rendered)
 
-# Initialize game
-game = Game()
+# Font sizes by name
+FONT_SIZES = {"large": 64, "medium": 36, "small": 24, "tiny": 18}
 
 # Animation timer
 animation_time = 0
-last_time = time.time()
 
-def draw_maze():
-    """Draw the maze and pellets"""
-    for y, row in enumerate(game.maze):
-        for x, cell in enumerate(row):
-            position = (x * TILE_SIZE, y * TILE_SIZE)
-            
-            # Draw walls
-            if cell == 'X':
-                screen.blit(sprites.wall_sprite, position)
-            # Draw pellets
-            elif cell == '.':
-                screen.blit(sprites.pellet_sprite, position)
-            # Draw power pellets
-            elif cell == 'O':
-                screen.blit(sprites.power_pellet_sprite, position)
+def record_startup(phase, started):
+    """Add the time since started to a startup phase"""
+    startup_times[phase] = startup_times.get(phase, 0.0) + time.perf_counter() - started
 
-def draw_entities():
-    """Draw pacman and ghosts"""
-    # Draw pacman
-    pacman_pos = (game.pacman.x * TILE_SIZE, game.pacman.y * TILE_SIZE)
-    pacman_sprite = sprites.pacman_sprites[game.pacman.direction][game.pacman.animation_frame]
-    screen.blit(pacman_sprite, pacman_pos)
-    
-    # Draw ghosts
-    for ghost in game.ghosts:
-        ghost_pos = (ghost.x * TILE_SIZE, ghost.y * TILE_SIZE)
-        
-        if ghost.scared:
-            screen.blit(sprites.scared_ghost_sprite, ghost_pos)
-        else:
-            screen.blit(sprites.ghost_sprites[ghost.name], ghost_pos)
+def get_font(name):
+    """Get one of the FONT_SIZES fonts, loading the font module and font on first use"""
+    font = fonts.get(name)
+    if font is None:
+        started = time.perf_counter()
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.Font(None, FONT_SIZES[name])
+        fonts[name] = font
+        record_startup("fonts", started)
+    return font
+
+def get_sprites():
+    """Get the sprite set, building it on first use"""
+    global sprites
+    if sprites is None:
+        started = time.perf_counter()
+        sprites = SpriteLoader()
+        record_startup("sprites", started)
+    return sprites
+
+def get_renderer():
+    """Get the playfield renderer, creating it on first use"""
+    global renderer
+    if renderer is None:
+        renderer = Renderer(screen, get_sprites())
+    return renderer
+
+def report_startup():
+    """Print how long each startup phase took"""
+    parts = ", ".join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in startup_times.items())
+    print(f"Startup: {parts}", flush=True)
+
+def draw_profiler_overlay():
+    """
+    Draw the p50/p95/p99 timing of each frame phase
+    The text is re-rendered every PROFILER_OVERLAY_REFRESH seconds rather
+    than every frame, so the overlay barely shows up in its own timings.
+    Returns:
+        List of screen rectangles it covered
+    """
+    global profiler_overlay
+    if not profiler.enabled:
+        return []
+    now = time.perf_counter()
+    if profiler_overlay is None or now - profiler_overlay[1] >= PROFILER_OVERLAY_REFRESH:
+        font = get_font("tiny")
+        rows = [("phase", ("p50", "p95", "p99"))]
+        for phase in profiler.samples:
+            stats = profiler.percentiles(phase)
+            rows.append((phase, tuple(f"{stats[p] * 1000:.2f}" for p in ("p50", "p95", "p99"))))
+        line_height = font.get_linesize()
+        surface = pygame.Surface((240, line_height * len(rows) + 8))
+        surface.fill(BLACK)
+        for i, (name, values) in enumerate(rows):
+            y = 4 + i * line_height
+            surface.blit(font.render(name, True, WHITE), (4, y))
+            # Right-align each column in milliseconds
+            for j, value in enumerate(values):
+                text = font.render(value, True, WHITE)
+                surface.blit(text, (150 + j * 42 - text.get_width(), y))
+        surface.set_alpha(200)
+        profiler_overlay = (surface, now)
+    return [screen.blit(profiler_overlay[0], (10, 110))]
+
+def toggle_profiler():
+    """Turn phase timing and its overlay on or off"""
+    global profiler_overlay
+    profiler.enabled = not profiler.enabled
+    profiler_overlay = None
+    if profiler.enabled:
+        profiler.reset()
+        profiler.begin_frame()  # Toggled mid-frame, so start timing from here
 
 def draw_debug_paths():
     """Draw A* paths for debugging"""
     if not game.debug_mode:
         return
     
-    # Draw explored paths
-    for ghost in game.ghosts:
-        for pos in ghost.explored_paths:
-            x, y = pos
-            pygame.draw.rect(screen, DEBUG_PATH_COLOR, 
-                           (x * TILE_SIZE + TILE_SIZE//4, y * TILE_SIZE + TILE_SIZE//4, 
-                            TILE_SIZE//2, TILE_SIZE//2))
-    
-    # Draw actual paths
-    for ghost in game.ghosts:
-        if ghost.path:
-            for i in range(len(ghost.path) - 1):
-                x1, y1 = ghost.path[i]
-                x2, y2 = ghost.path[i + 1]
-                pygame.draw.line(screen, ghost.color, 
-                               (x1 * TILE_SIZE + TILE_SIZE//2, y1 * TILE_SIZE + TILE_SIZE//2),
-                               (x2 * TILE_SIZE + TILE_SIZE//2, y2 * TILE_SIZE + TILE_SIZE//2), 2)
+    debug_layer.draw(screen, game)
 
 def draw_ui():
-    """Draw user interface"""
+    """Draw user interface, returning the screen rectangles it covered"""
+    rects = []
+    
     # Draw score
-    score_text = font_medium.render(f"Score: {game.pacman.score}", True, WHITE)
-    screen.blit(score_text, (10, 10))
+    score_text = text_cache.render(get_font("medium"), f"Score: {game.pacman.score}", WHITE)
+    rects.append(screen.blit(score_text, (10, 10)))
     
     # Draw lives
-    lives_text = font_medium.render(f"Lives: {game.pacman.lives}", True, WHITE)
-    screen.blit(lives_text, (SCREEN_WIDTH - 150, 10))
+    lives_text = text_cache.render(get_font("medium"), f"Lives: {game.pacman.lives}", WHITE)
+    rects.append(screen.blit(lives_text, (SCREEN_WIDTH - 150, 10)))
     
     # Draw level
-    level_text = font_medium.render(f"Level: {game.level}", True, WHITE)
-    screen.blit(level_text, (SCREEN_WIDTH // 2 - 50, 10))
+    level_text = text_cache.render(get_font("medium"), f"Level: {game.level}", WHITE)
+    rects.append(screen.blit(level_text, (SCREEN_WIDTH // 2 - 50, 10)))
     
     # Ghost mode display
     if game.current_ghost_mode < len(game.ghost_modes):
         mode, duration = game.ghost_modes[game.current_ghost_mode]
         if duration > 0:
-            mode_text = font_small.render(f"Ghost Mode: {mode} ({int(duration - game.ghost_mode_timer)}s)", True, WHITE)
-            screen.blit(mode_text, (10, 50))
+            mode_text = text_cache.render(get_font("small"), f"Ghost Mode: {mode} ({int(duration - game.ghost_mode_timer)}s)", WHITE)
+            rects.append(screen.blit(mode_text, (10, 50)))
         else:
-            mode_text = font_small.render(f"Ghost Mode: {mode}", True, WHITE)
-            screen.blit(mode_text, (10, 50))
+            mode_text = text_cache.render(get_font("small"), f"Ghost Mode: {mode}", WHITE)
+            rects.append(screen.blit(mode_text, (10, 50)))
     
     # Power pellet timer
     if game.pacman.power_pellet_active:
-        timer_text = font_small.render(f"Power: {int(game.pacman.power_pellet_timer)}", True, YELLOW)
-        screen.blit(timer_text, (10, 80))
+        timer_text = text_cache.render(get_font("small"), f"Power: {int(game.pacman.power_pellet_timer)}", YELLOW)
+        rects.append(screen.blit(timer_text, (10, 80)))
     
     # Debug mode indicator
     if game.debug_mode:
-        debug_text = font_small.render("Debug Mode: ON", True, GREEN)
-        screen.blit(debug_text, (SCREEN_WIDTH - 150, 50))
+        debug_text = text_cache.render(get_font("small"), "Debug Mode: ON", GREEN)
+        rects.append(screen.blit(debug_text, (SCREEN_WIDTH - 150, 50)))
+    
+    # Fast-forward indicator
+    if sim_clock.speed != 1:
+        speed_text = text_cache.render(get_font("small"), f"Speed: {sim_clock.speed:g}x", YELLOW)
+        rects.append(screen.blit(speed_text, (SCREEN_WIDTH - 150, 80)))
+    
+    return rects
 
         
 def draw_start_screen():
@@ -124,11 +175,11 @@ def draw_start_screen():
     screen.fill(BLACK)
     
     # Title
-    title_text = font_large.render("PAC-MAN", True, YELLOW)
+    title_text = text_cache.render(get_font("large"), "PAC-MAN", YELLOW)
     screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, 100))
     
     # Subtitle
-    subtitle_text = font_medium.render("with A* Pathfinding", True, WHITE)
+    subtitle_text = text_cache.render(get_font("medium"), "with A* Pathfinding", WHITE)
     screen.blit(subtitle_text, (SCREEN_WIDTH // 2 - subtitle_text.get_width() // 2, 180))
     
     # Instructions
@@ -137,17 +188,18 @@ def draw_start_screen():
         "Eat all pellets to win",
         "Power pellets make ghosts vulnerable",
         "Press 'D' to toggle debug mode",
-        "Press 'P' to pause",
+        "Press 'H' for the debug heatmap",
+        "Press 'P' to pause, 'F' to fast-forward",
         "",
         "Press SPACE to start"
     ]
     
     for i, instruction in enumerate(instructions):
-        instruction_text = font_small.render(instruction, True, WHITE)
+        instruction_text = text_cache.render(get_font("small"), instruction, WHITE)
         screen.blit(instruction_text, (SCREEN_WIDTH // 2 - instruction_text.get_width() // 2, 250 + i * 40))
     
     # Draw animated pacman
-    pacman_sprite = sprites.pacman_sprites[RIGHT][int(animation_time * 10) % 4]
+    pacman_sprite = get_sprites().pacman_sprites[RIGHT][int(animation_time * 10) % 4]
     screen.blit(pacman_sprite, (150, 400))
     
     # Draw ghosts
@@ -155,114 +207,211 @@ def draw_start_screen():
     ghost_names = ["blinky", "pinky", "inky", "clyde"]
     
     for pos, name in zip(ghost_positions, ghost_names):
-        screen.blit(sprites.ghost_sprites[name], pos)
+        screen.blit(get_sprites().ghost_sprites[name], pos)
 
 def draw_game_over_screen():
     """Draw game over screen"""
     # Overlay
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 200))
-    screen.blit(overlay, (0, 0))
+    screen.blit(get_renderer().overlay(200), (0, 0))
     
     # Game Over text
-    game_over_text = font_large.render("GAME OVER", True, RED)
+    game_over_text = text_cache.render(get_font("large"), "GAME OVER", RED)
     screen.blit(game_over_text, (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2, 200))
     
     # Score
-    score_text = font_medium.render(f"Final Score: {game.pacman.score}", True, WHITE)
+    score_text = text_cache.render(get_font("medium"), f"Final Score: {game.pacman.score}", WHITE)
     screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, 300))
     
     # Restart prompt
-    restart_text = font_small.render("Press SPACE to try again", True, WHITE)
+    restart_text = text_cache.render(get_font("small"), "Press SPACE to try again", WHITE)
     screen.blit(restart_text, (SCREEN_WIDTH // 2 - restart_text.get_width() // 2, 400))
 
 def draw_win_screen():
     """Draw win screen"""
     # Overlay
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 200))
-    screen.blit(overlay, (0, 0))
+    screen.blit(get_renderer().overlay(200), (0, 0))
     
     # Win text
-    win_text = font_large.render("YOU WIN!", True, GREEN)
+    win_text = text_cache.render(get_font("large"), "YOU WIN!", GREEN)
     screen.blit(win_text, (SCREEN_WIDTH // 2 - win_text.get_width() // 2, 200))
     
     # Score
-    score_text = font_medium.render(f"Final Score: {game.pacman.score}", True, WHITE)
+    score_text = text_cache.render(get_font("medium"), f"Final Score: {game.pacman.score}", WHITE)
     screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, 300))
     
     # Level
-    level_text = font_medium.render(f"Level {game.level} Completed", True, WHITE)
+    level_text = text_cache.render(get_font("medium"), f"Level {game.level} Completed", WHITE)
     screen.blit(level_text, (SCREEN_WIDTH // 2 - level_text.get_width() // 2, 350))
     
     # Next level prompt
-    next_text = font_small.render("Press SPACE for next level", True, WHITE)
+    next_text = text_cache.render(get_font("small"), "Press SPACE for next level", WHITE)
     screen.blit(next_text, (SCREEN_WIDTH // 2 - next_text.get_width() // 2, 450))
 
 def draw_pause_screen():
     """Draw pause screen"""
     # Overlay
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 150))
-    screen.blit(overlay, (0, 0))
+    screen.blit(get_renderer().overlay(150), (0, 0))
     
     # Pause text
-    pause_text = font_large.render("PAUSED", True, WHITE)
+    pause_text = text_cache.render(get_font("large"), "PAUSED", WHITE)
     screen.blit(pause_text, (SCREEN_WIDTH // 2 - pause_text.get_width() // 2, 250))
     
     # Resume prompt
-    resume_text = font_small.render("Press P to resume", True, WHITE)
+    resume_text = text_cache.render(get_font("small"), "Press P to resume", WHITE)
     screen.blit(resume_text, (SCREEN_WIDTH // 2 - resume_text.get_width() // 2, 350))
 
-# Game loop
-running = True
-while running:
-    # Calculate delta time
-    current_time = time.time()
-    dt = current_time - last_time
-    last_time = current_time
-    animation_time += dt
-    
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE:
-                running = False
-            elif event.key == pygame.K_p:
-                game.toggle_pause()
-            else:
-                game.handle_input(event.key)
+def cycle_speed():
+    """Switch the simulation to the next FAST_FORWARD_SPEEDS speed"""
+    speeds = FAST_FORWARD_SPEEDS
+    index = speeds.index(sim_clock.speed) if sim_clock.speed in speeds else -1
+    sim_clock.speed = speeds[(index + 1) % len(speeds)]
+
+def draw_frame():
+    """Draw the current game state and push it to the display"""
+    renderer = get_renderer()
+    alpha = sim_clock.alpha
+    if game.state == GAME_RUNNING and not game.debug_mode:
+        # Only redraw and push what changed since the last frame
+        changed = renderer.begin_frame(game)
+        profiler.mark("draw_maze")
+        overdrawn = renderer.draw_entities(game, alpha)
+        profiler.mark("draw_entities")
+        overdrawn += draw_ui()
+        profiler.mark("draw_ui")
+        overdrawn += draw_profiler_overlay()
+        profiler.mark("draw_profiler")
+        renderer.end_frame(changed, overdrawn)
+        profiler.mark("display")
+    else:
+        screen.fill(BLACK)
+        
+        if game.state == GAME_START:
+            draw_start_screen()
+        else:
+            # Draw game elements
+            renderer.draw_maze(game)
+            profiler.mark("draw_maze")
+            renderer.draw_entities(game, alpha)
+            profiler.mark("draw_entities")
+            draw_debug_paths()
+            profiler.mark("draw_debug")
+            draw_ui()
+            profiler.mark("draw_ui")
+            
+            # Draw overlays for different game states
+            if game.state == GAME_OVER:
+                draw_game_over_screen()
+            elif game.state == GAME_WON:
+                draw_win_screen()
+            elif game.state == GAME_PAUSED:
+                draw_pause_screen()
+            draw_profiler_overlay()
+            profiler.mark("draw_profiler")
+        
+        # Update display
+        pygame.display.flip()
+        renderer.invalidate()
+        profiler.mark("display")
+
+def main(replay_dir=REPLAY_DIR):
+    """
+    Start the game and run the main loop
+    Args:
+        replay_dir: Directory the session's inputs are saved to on exit,
+            None to not record them
+    """
+    global screen, clock, game, recorder, animation_time
     
-    # Update game
-    if game.state == GAME_RUNNING:
-        game.update(dt)
+    # Only the display is needed up front, fonts start on first use and audio never
+    started = time.perf_counter()
+    pygame.display.init()
+    pygame.display.set_caption("Pac-Man with A* Pathfinding")
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    clock = pygame.time.Clock()
+    record_startup("display", started)
     
-    # Drawing
+    # Show the start screen before building the game
     screen.fill(BLACK)
+    draw_start_screen()
+    pygame.display.flip()
+    startup_times["to first frame"] = time.perf_counter() - _start_time
     
-    if game.state == GAME_START:
-        draw_start_screen()
-    else:
-        # Draw game elements
-        draw_maze()
-        draw_entities()
-        draw_debug_paths()
-        draw_ui()
+    # The game (and its pathfinding tables) is only needed once input is handled
+    started = time.perf_counter()
+    from game import Game
+    from replay import ReplayRecorder
+    game = Game()
+    game.profiler = profiler
+    if replay_dir:
+        recorder = ReplayRecorder(game)
+    record_startup("game", started)
+    report_startup()
+    
+    last_time = time.perf_counter()
+    
+    # Game loop: the simulation advances in fixed 1/FPS ticks, drawing runs
+    # at RENDER_FPS and interpolates between the last two ticks
+    running = True
+    while running:
+        profiler.begin_frame()
         
-        # Draw overlays for different game states
-        if game.state == GAME_OVER:
-            draw_game_over_screen()
-        elif game.state == GAME_WON:
-            draw_win_screen()
-        elif game.state == GAME_PAUSED:
-            draw_pause_screen()
-    
-    # Update display
-    pygame.display.flip()
-    clock.tick(FPS)
+        # Real time since the last frame
+        current_time = time.perf_counter()
+        frame_time = current_time - last_time
+        last_time = current_time
+        animation_time += frame_time
+        
+        # Event handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_p:
+                    game.toggle_pause()
+                elif event.key == pygame.K_F3:
+                    toggle_profiler()
+                elif event.key == pygame.K_F4:
+                    profile_window.start()
+                elif event.key == pygame.K_f:
+                    cycle_speed()
+                else:
+                    game.handle_input(event.key)
+        profiler.mark("events")
+        
+        # Run the ticks that are due (which mark their own phases); the clock
+        # only advances while running, so pausing keeps the partial tick
+        if game.state == GAME_RUNNING:
+            for _ in range(sim_clock.advance(frame_time)):
+                game.update(sim_clock.step)
+                if game.state != GAME_RUNNING:
+                    break
+        
+        draw_frame()
+        profiler.end_frame()
+        profile_window.tick()
+        clock.tick(RENDER_FPS)
+    
+    # Keep the session's inputs so it can be replayed headless
+    if recorder is not None and game.ticks:
+        path = os.path.join(replay_dir, time.strftime("%Y%m%d-%H%M%S") + f"_{game.rng.seed}.replay")
+        recorder.save(path)
+        print(f"Replay: {recorder.event_count} events written to {path}", flush=True)
+    
+    # Write out timings and any cProfile window still running
+    profile_window.stop()
+    if profiler.samples:
+        profiler.dump(PROFILER_DUMP_PATH)
+        print(f"Profiler: phase timings written to {PROFILER_DUMP_PATH}", flush=True)
+    
+    # Clean up
+    pygame.quit()
+    sys.exit()
+
 
-# Clean up
-pygame.quit()
-sys.exit()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Pac-Man")
+    parser.add_argument("--record", nargs="?", const="replays", default=REPLAY_DIR, metavar="DIR",
+                        help="save the session's inputs to DIR on exit (default DIR: replays)")
+    main(parser.parse_args().record)
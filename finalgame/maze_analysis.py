@@ -0,0 +1,183 @@
+# maze_analysis.py - Precomputed distance and next-hop tables for a maze
+from array import array
+from collections import deque
+from config import DIRECTIONS
+from flow_field import flee_key
+from layout_cache import LayoutCache
+from maze_grid import as_maze_grid
+
+# Marker for "no distance" / "no next hop" in the compact tables
+UNREACHABLE = 0xFFFF
+
+
+class MazeAnalysis:
+    """All-pairs shortest path tables for the walkable cells of a maze
+
+    Every walkable cell gets a compact index. For each pair of cells the
+    tables hold the BFS distance between them and the index of the first
+    step to take, so ghost paths can be read back without any search.
+    """
+    def __init__(self, maze, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+
+        # Number the walkable cells
+        walkable = as_maze_grid(maze, grid_width, grid_height).walkable
+        self.cells = []
+        self.cell_index = array('i', [-1]) * (grid_width * grid_height)
+        for y in range(grid_height):
+            for x in range(grid_width):
+                if walkable[y * grid_width + x]:
+                    self.cell_index[y * grid_width + x] = len(self.cells)
+                    self.cells.append((x, y))
+        self.size = len(self.cells)
+
+        # Neighbor lists in DIRECTIONS order, as compact indices
+        self.neighbors = []
+        for x, y in self.cells:
+            adjacent = []
+            for dx, dy in DIRECTIONS:
+                index = self.index_of((x + dx, y + dy))
+                if index is not None:
+                    adjacent.append(index)
+            self.neighbors.append(adjacent)
+
+        self.distances = self._build_distances()
+        self.next_hops = self._build_next_hops()
+
+    def _build_distances(self):
+        """Run a BFS from every walkable cell to fill the distance matrix"""
+        n = self.size
+        distances = array('H', [UNREACHABLE]) * (n * n)
+        for source in range(n):
+            row = source * n
+            distances[row + source] = 0
+            frontier = deque([source])
+            while frontier:
+                current = frontier.popleft()
+                next_distance = distances[row + current] + 1
+                for neighbor in self.neighbors[current]:
+                    if distances[row + neighbor] == UNREACHABLE:
+                        distances[row + neighbor] = next_distance
+                        frontier.append(neighbor)
+        return distances
+
+    def _build_next_hops(self):
+        """Pick the first step from every cell towards every other cell
+
+        The step is the first neighbor (in DIRECTIONS order) that is one
+        step closer to the goal, so the choice is stable between runs.
+        """
+        n = self.size
+        distances = self.distances
+        next_hops = array('H', [UNREACHABLE]) * (n * n)
+        for source in range(n):
+            row = source * n
+            adjacent = [neighbor * n for neighbor in self.neighbors[source]]
+            for goal in range(n):
+                distance = distances[row + goal]
+                if distance == 0 or distance == UNREACHABLE:
+                    continue
+                for neighbor_row in adjacent:
+                    if distances[neighbor_row + goal] == distance - 1:
+                        next_hops[row + goal] = neighbor_row // n
+                        break
+        return next_hops
+
+    def index_of(self, pos):
+        """Get the compact index of a grid position, or None for walls"""
+        x, y = pos
+        if 0 <= x < self.grid_width and 0 <= y < self.grid_height:
+            index = self.cell_index[y * self.grid_width + x]
+            if index >= 0:
+                return index
+        return None
+
+    def distance(self, start, goal):
+        """Get the maze distance between two positions, or None if unreachable"""
+        a = self.index_of(start)
+        b = self.index_of(goal)
+        if a is None or b is None:
+            return None
+        distance = self.distances[a * self.size + b]
+        return None if distance == UNREACHABLE else distance
+
+    def next_step(self, start, goal):
+        """Get the next position on a shortest path, or None if there is none"""
+        a = self.index_of(start)
+        b = self.index_of(goal)
+        if a is None or b is None:
+            return None
+        hop = self.next_hops[a * self.size + b]
+        return None if hop == UNREACHABLE else self.cells[hop]
+
+    def path(self, start, goal):
+        """
+        Read a shortest path out of the next-hop table
+        Args:
+            start: Tuple (x, y) of starting position
+            goal: Tuple (x, y) of target position
+        Returns:
+            List of coordinates from the step after start up to goal,
+            empty if the goal is unreachable or equal to start
+        """
+        a = self.index_of(start)
+        b = self.index_of(goal)
+        if a is None or b is None:
+            return []
+
+        n = self.size
+        next_hops = self.next_hops
+        cells = self.cells
+        path = []
+        while a != b:
+            a = next_hops[a * n + b]
+            if a == UNREACHABLE:
+                return []
+            path.append(cells[a])
+        return path
+
+    def flee_path(self, start, chaser):
+        """
+        Read a path for a ghost fleeing a chaser out of the tables
+        The goal is picked like flow_field.flee_path does, with the ghost's
+        and the chaser's distance rows in place of the two fields.
+        Args:
+            start: Tuple (x, y) of the ghost's position
+            chaser: Tuple (x, y) of the position to flee from
+        Returns:
+            List of coordinates from the step after start up to the goal,
+            empty if the ghost can't move or the chaser can't reach it
+        """
+        a = self.index_of(start)
+        b = self.index_of(chaser)
+        if a is None or b is None:
+            return []
+
+        n = self.size
+        distances = self.distances
+        span = n + 1
+        best_key = -1
+        goal = None
+        runner_row = distances[a * n:(a + 1) * n]
+        chaser_row = distances[b * n:(b + 1) * n]
+        for cell, (runner_distance, chaser_distance) in enumerate(zip(runner_row, chaser_row)):
+            if 0 < runner_distance != UNREACHABLE and chaser_distance != UNREACHABLE:
+                key = flee_key(runner_distance, chaser_distance, span)
+                if key > best_key:
+                    best_key = key
+                    goal = cell
+        if goal is None:
+            return []
+        return self.path(start, self.cells[goal])
+
+# Analyses built for the most recent wall versions (see astar.wall_version)
+_analysis_cache = LayoutCache()
+
+def get_maze_analysis(maze, grid_width, grid_height, version):
+    """Get the MazeAnalysis for a wall layout, building it only the first time"""
+    analysis = _analysis_cache.get(version)
+    if analysis is None:
+        analysis = MazeAnalysis(maze, grid_width, grid_height)
+        _analysis_cache.put(version, analysis)
+    return analysis
@@ -0,0 +1,156 @@
+# maze_grid.py - Mutable maze grid backed by a flat bytearray
+WALL = ord('X')
+
+
+class MazeRow:
+    """
+    Read-only view of one row of a MazeGrid
+
+    Indexing with an int gives a one-character string, like indexing a
+    row string did, so code written for the old list-of-strings maze
+    keeps working. Slicing gives a plain string.
+    """
+    __slots__ = ("cells", "offset", "width")
+
+    def __init__(self, cells, offset, width):
+        self.cells = cells
+        self.offset = offset
+        self.width = width
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return str(self)[x]
+        if x < 0:
+            x += self.width
+        if not 0 <= x < self.width:
+            raise IndexError("maze row index out of range")
+        return chr(self.cells[self.offset + x])
+
+    def __iter__(self):
+        for code in self.cells[self.offset:self.offset + self.width]:
+            yield chr(code)
+
+    def __contains__(self, cell):
+        return self.cells.find(ord(cell), self.offset, self.offset + self.width) >= 0
+
+    def __str__(self):
+        return self.cells[self.offset:self.offset + self.width].decode('ascii')
+
+    def __repr__(self):
+        return f"MazeRow({str(self)!r})"
+
+
+class MazeGrid:
+    """
+    Maze stored as one byte per cell, indexed by y * width + x
+
+    Cells can be read and changed in place without building new strings,
+    and a walkable mask (1 for open cells, 0 for walls) is kept alongside
+    so collision checks are a single lookup. maze[y][x] still works for
+    code that expects a list of row strings.
+    """
+    def __init__(self, rows, width=None, height=None):
+        """
+        Build a grid from row strings (e.g. config.MAZE)
+        Args:
+            rows: Sequence of rows, each a string of cell characters
+            width: Grid width, defaults to the length of the first row
+            height: Grid height, defaults to the number of rows
+        Rows longer than the width are cut off and missing cells are walls.
+        """
+        if height is None:
+            height = len(rows)
+        if width is None:
+            width = len(rows[0]) if height else 0
+        self.width = width
+        self.height = height
+
+        self.cells = bytearray(b'X' * (width * height))
+        for y in range(min(height, len(rows))):
+            row = str(rows[y])[:width].encode('ascii')
+            self.cells[y * width:y * width + len(row)] = row
+
+        self.walkable = bytearray(width * height)
+        for i, code in enumerate(self.cells):
+            self.walkable[i] = code != WALL
+        self.wall_changes = 0  # Bumped whenever a cell turns into a wall or back
+
+        self.rows = [MazeRow(self.cells, y * width, width) for y in range(height)]
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        return self.rows[y]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __contains__(self, cell):
+        return ord(cell) in self.cells
+
+    def in_bounds(self, x, y):
+        """Check if a position lies inside the grid"""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get_cell(self, x, y):
+        """Get the character at a position, or 'X' outside the grid"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return chr(self.cells[y * self.width + x])
+        return 'X'
+
+    def set_cell(self, x, y, cell):
+        """
+        Change the character at a position in place
+        Turning a wall into floor (or back) also updates the walkable mask
+        and bumps wall_changes; callers that do so should recompute
+        astar.wall_version afterwards.
+        """
+        code = ord(cell)
+        index = y * self.width + x
+        self.cells[index] = code
+        walkable = code != WALL
+        if self.walkable[index] != walkable:
+            self.walkable[index] = walkable
+            self.wall_changes += 1
+
+    def is_wall(self, x, y):
+        """Check if a position is a wall, treating everything outside as wall"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return not self.walkable[y * self.width + x]
+        return True
+
+    def count(self, cell):
+        """Count the cells holding a character"""
+        return self.cells.count(ord(cell))
+
+    def cells_view(self):
+        """Read-only memoryview of the cell bytes"""
+        return memoryview(self.cells).toreadonly()
+
+    def walkable_view(self):
+        """Read-only memoryview of the walkable mask"""
+        return memoryview(self.walkable).toreadonly()
+
+    def to_strings(self):
+        """Get the maze as a list of row strings"""
+        return [str(row) for row in self.rows]
+
+    def copy(self):
+        """Get an independent copy of the grid"""
+        return MazeGrid(self.to_strings(), self.width, self.height)
+
+
+def wall_changes(maze):
+    """Get a maze's wall change count, 0 for row strings (which can't change)"""
+    return getattr(maze, "wall_changes", 0)
+
+
+def as_maze_grid(maze, grid_width, grid_height):
+    """Get maze as a MazeGrid of the given size, converting row strings if needed"""
+    if isinstance(maze, MazeGrid) and maze.width == grid_width and maze.height == grid_height:
+        return maze
+    return MazeGrid(maze, grid_width, grid_height)
@@ -0,0 +1,82 @@
+# maze_io.py - Loading and saving maze layouts as text files
+import os
+from collections import deque
+
+# Characters a layout may use: walls, floor, pellets, and the start markers
+MAZE_CHARACTERS = frozenset("X .OPG")
+
+
+class MazeFormatError(ValueError):
+    """Raised for maze files that can't be used as a layout"""
+
+
+def load_maze(path):
+    """
+    Read a maze layout from a text file
+    One line per row, using the characters of config.MAZE: 'X' walls,
+    ' ' floor, '.'/'O' pellets, 'P' Pac-Man's start and 'G' the ghosts'.
+    Trailing blank lines are ignored and short rows are padded with walls,
+    so the size is taken from the data.
+    Args:
+        path: File to read
+    Returns:
+        List of row strings, all the same length
+    """
+    with open(path) as f:
+        rows = f.read().splitlines()
+    while rows and not rows[-1].strip():
+        rows.pop()
+    if not rows:
+        raise MazeFormatError(f"{path}: maze is empty")
+
+    width = max(len(row) for row in rows)
+    for y, row in enumerate(rows):
+        unknown = set(row) - MAZE_CHARACTERS
+        if unknown:
+            raise MazeFormatError(f"{path}:{y + 1}: unknown maze characters {''.join(sorted(unknown))!r}")
+    return [row.ljust(width, 'X') for row in rows]
+
+
+def save_maze(path, rows):
+    """Write a maze layout (sequence of row strings) to a text file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(str(row) + "\n")
+
+
+def maze_size(rows):
+    """Get (width, height) of a layout"""
+    return (max((len(row) for row in rows), default=0), len(rows))
+
+
+def seal_unreachable(rows):
+    """
+    Wall off the floor Pac-Man can't reach from his start
+    Pellets there could never be eaten, so a level on the layout could
+    never be cleared.
+    Args:
+        rows: Layout row strings with a 'P' marker
+    Returns:
+        List of row strings, all the same length, with every cell
+        unreachable from 'P' turned into 'X' (the 'G' marker is kept)
+    """
+    width, height = maze_size(rows)
+    rows = [row.ljust(width, 'X') for row in rows]
+    start = next(((x, y) for y, row in enumerate(rows) for x, cell in enumerate(row) if cell == 'P'), None)
+    if start is None:
+        raise MazeFormatError("maze has no 'P' start")
+
+    reached = {start}
+    frontier = deque([start])
+    while frontier:
+        x, y = frontier.popleft()
+        for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if (0 <= nx < width and 0 <= ny < height and rows[ny][nx] != 'X'
+                    and (nx, ny) not in reached):
+                reached.add((nx, ny))
+                frontier.append((nx, ny))
+    return [''.join(cell if cell in 'XG' or (x, y) in reached else 'X' for x, cell in enumerate(row))
+            for y, row in enumerate(rows)]
@@ -0,0 +1,148 @@
+# profiler.py - Per-frame phase timing in fixed-size ring buffers
+import json
+import math
+import time
+from array import array
+from config import PROFILER_CPROFILE_FRAMES, PROFILER_CPROFILE_PATH, PROFILER_FRAMES
+
+
+class FrameProfiler:
+    """
+    Times the phases of each frame
+
+    Code calls mark(phase) at the end of each phase, which records the time
+    since the previous mark (or since begin_frame) for that phase. Samples
+    go into a ring buffer per phase holding the last `capacity` values, so
+    memory stays fixed however long the game runs. When disabled, mark
+    returns straight away.
+    """
+    def __init__(self, capacity=PROFILER_FRAMES, enabled=True):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.samples = {}  # phase -> array of seconds
+        self.counts = {}  # phase -> number of samples ever recorded
+        self.frame_start = 0.0
+        self.last = 0.0
+
+    def _record(self, phase, seconds):
+        """Store one sample in a phase's ring buffer"""
+        buffer = self.samples.get(phase)
+        if buffer is None:
+            buffer = array('d', [0.0]) * self.capacity
+            self.samples[phase] = buffer
+            self.counts[phase] = 0
+        count = self.counts[phase]
+        buffer[count % self.capacity] = seconds
+        self.counts[phase] = count + 1
+
+    def begin_frame(self):
+        """Start timing a frame"""
+        if not self.enabled:
+            return
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """Record the time since the previous mark as one sample of phase"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._record(phase, now - self.last)
+        self.last = now
+
+    def end_frame(self):
+        """Record the whole frame's time under the "frame" phase"""
+        if not self.enabled:
+            return
+        self._record("frame", time.perf_counter() - self.frame_start)
+
+    def reset(self):
+        """Drop all samples"""
+        self.samples.clear()
+        self.counts.clear()
+
+    def percentiles(self, phase, points=(50, 95, 99)):
+        """
+        Get percentiles of the buffered samples of a phase
+        Returns:
+            Dictionary of "p50" etc. to seconds, empty if there are no samples
+        """
+        count = min(self.counts.get(phase, 0), self.capacity)
+        if not count:
+            return {}
+        values = sorted(self.samples[phase][:count])
+        # Nearest-rank percentiles
+        return {f"p{p}": values[max(math.ceil(p / 100 * count) - 1, 0)] for p in points}
+
+    def summary(self):
+        """Get percentiles and sample counts for every phase"""
+        return {
+            phase: dict(self.percentiles(phase), samples=self.counts[phase])
+            for phase in self.samples
+        }
+
+    def dump(self, path):
+        """Write the summary as JSON"""
+        with open(path, "w") as f:
+            json.dump({
+                "capacity": self.capacity,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "phases": self.summary(),
+            }, f, indent=2)
+            f.write("\n")
+
+
+# Shared profiler for code that is not being profiled; mark() is a no-op
+DISABLED_PROFILER = FrameProfiler(capacity=1, enabled=False)
+
+
+class ProfileWindow:
+    """
+    Runs cProfile over a fixed number of frames
+
+    start() begins profiling; the main loop calls tick() once per frame and
+    the stats are written (and the top entries printed) when the window
+    closes. cProfile is only imported when a window is started.
+    """
+    def __init__(self, frames=PROFILER_CPROFILE_FRAMES, path=PROFILER_CPROFILE_PATH):
+        self.frames = frames
+        self.path = path
+        self.profile = None
+        self.frames_left = 0
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def start(self):
+        """Start a window, unless one is already running"""
+        if self.active:
+            return
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.frames_left = self.frames
+        self.profile.enable()
+
+    def tick(self):
+        """
+        Count one frame of the running window
+        Returns:
+            True if this frame closed the window and the stats were written
+        """
+        if self.profile is None:
+            return False
+        self.frames_left -= 1
+        if self.frames_left > 0:
+            return False
+        self.stop()
+        return True
+
+    def stop(self):
+        """Close the window early, writing what was collected"""
+        if self.profile is None:
+            return
+        import pstats
+        self.profile.disable()
+        self.profile.dump_stats(self.path)
+        print(f"cProfile: {self.frames - self.frames_left} frames written to {self.path}", flush=True)
+        pstats.Stats(self.profile).sort_stats("cumulative").print_stats(15)
+        self.profile = None
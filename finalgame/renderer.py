@@ -0,0 +1,216 @@
+# renderer.py - Cached maze layers and dirty-rectangle drawing
+from collections import OrderedDict
+import pygame
+from config import *
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces keyed by (font, text, color)"""
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Get the rendered surface for a string, rendering it only on a miss"""
+        key = (font, text, color, antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Get hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class Renderer:
+    """
+    Draws the playfield from cached layers
+
+    Walls are pre-rendered once per wall layout into a background surface.
+    Pellets are drawn on a copy of it (the maze layer) once per level and
+    erased from it one tile at a time as they are eaten. During normal play
+    each frame only restores and redraws the rectangles that changed, and
+    pushes just those to the display.
+    """
+    def __init__(self, screen, sprites):
+        self.screen = screen
+        self.sprites = sprites
+        self.background = None
+        self.background_version = None
+        self.maze_layer = None
+        self.maze = None
+
+        # Pellets currently drawn on the maze layer
+        self.drawn_pellets = set()
+        self.drawn_power_pellets = set()
+
+        # Screen rectangles drawn over the maze layer last frame
+        self.overdrawn = []
+        self.full_update = True
+
+        # Translucent full-screen overlays, by alpha
+        self.overlays = {}
+
+    def overlay(self, alpha):
+        """Get a full-screen black overlay with the given alpha, built once"""
+        overlay = self.overlays.get(alpha)
+        if overlay is None:
+            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA).convert_alpha()
+            overlay.fill((0, 0, 0, alpha))
+            self.overlays[alpha] = overlay
+        return overlay
+
+    def _build_background(self, game):
+        """Render the walls of the current maze into the background surface"""
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        background.fill(BLACK)
+        maze = game.maze
+        for y in range(maze.height):
+            for x in range(maze.width):
+                if maze.is_wall(x, y):
+                    background.blit(self.sprites.wall_sprite, (x * TILE_SIZE, y * TILE_SIZE))
+        self.background = background
+        self.background_version = game.wall_version
+
+    def _build_maze_layer(self, game):
+        """Draw the remaining pellets over the background for a new level"""
+        if self.background is None or game.wall_version != self.background_version:
+            self._build_background(game)
+        self.maze_layer = self.background.copy()
+        for x, y in game.pellet_cells:
+            self.maze_layer.blit(self.sprites.pellet_sprite, (x * TILE_SIZE, y * TILE_SIZE))
+        for x, y in game.power_pellet_cells:
+            self.maze_layer.blit(self.sprites.power_pellet_sprite, (x * TILE_SIZE, y * TILE_SIZE))
+        self.drawn_pellets = set(game.pellet_cells)
+        self.drawn_power_pellets = set(game.power_pellet_cells)
+        self.maze = game.maze
+        self.full_update = True
+
+    def _erase_eaten_pellets(self, game):
+        """
+        Erase pellets that were eaten since the last frame
+        Returns:
+            List of screen rectangles that changed
+        """
+        changed = []
+        if len(self.drawn_pellets) != game.pellets_left:
+            eaten = self.drawn_pellets - game.pellet_cells
+            self.drawn_pellets -= eaten
+            changed.extend(eaten)
+        if len(self.drawn_power_pellets) != game.power_pellets_left:
+            eaten = self.drawn_power_pellets - game.power_pellet_cells
+            self.drawn_power_pellets -= eaten
+            changed.extend(eaten)
+
+        rects = []
+        for x, y in changed:
+            rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            self.maze_layer.blit(self.background, rect, rect)
+            rects.append(rect)
+        return rects
+
+    def sync(self, game):
+        """Bring the maze layer up to date with the game"""
+        if game.maze is not self.maze:
+            self._build_maze_layer(game)
+            return []
+        return self._erase_eaten_pellets(game)
+
+    def invalidate(self):
+        """Force the next incremental frame to repaint the whole screen"""
+        self.full_update = True
+
+    def draw_maze(self, game):
+        """Blit the whole maze layer to the screen (for full redraws)"""
+        self.sync(game)
+        self.screen.blit(self.maze_layer, (0, 0))
+
+    def draw_entities(self, game, alpha=1.0):
+        """
+        Draw pacman and ghosts
+        Args:
+            game: Game to draw
+            alpha: Fraction of the next simulation tick that has elapsed;
+                entities are drawn that far between their last two positions
+        Returns:
+            List of screen rectangles covered by the sprites
+        """
+        screen = self.screen
+        sprites = self.sprites
+        rects = []
+
+        # Draw pacman
+        pacman = game.pacman
+        pacman_sprite = sprites.pacman_sprites[pacman.direction][pacman.animation_frame]
+        x, y = pacman.render_position(alpha)
+        rects.append(screen.blit(pacman_sprite, (x * TILE_SIZE, y * TILE_SIZE)))
+
+        # Draw ghosts
+        for ghost in game.ghosts:
+            x, y = ghost.render_position(alpha)
+            ghost_pos = (x * TILE_SIZE, y * TILE_SIZE)
+            if ghost.scared:
+                rects.append(screen.blit(sprites.scared_ghost_sprite, ghost_pos))
+            else:
+                rects.append(screen.blit(sprites.ghost_sprites[ghost.name], ghost_pos))
+        return rects
+
+    def begin_frame(self, game):
+        """
+        Start an incremental frame: apply eaten pellets and restore the
+        maze layer under everything drawn over it last frame
+        Returns:
+            List of screen rectangles that changed so far
+        """
+        rects = self.sync(game)
+        if self.full_update:
+            self.screen.blit(self.maze_layer, (0, 0))
+            return [self.screen.get_rect()]
+
+        rects.extend(self.overdrawn)
+        for rect in rects:
+            self.screen.blit(self.maze_layer, rect, rect)
+        return rects
+
+    def end_frame(self, rects, overdrawn):
+        """
+        Push the changed rectangles to the display
+        Args:
+            rects: Rectangles returned by begin_frame
+            overdrawn: Rectangles drawn over the maze layer this frame
+                (sprites, HUD text), restored at the start of the next frame
+        """
+        if self.full_update:
+            pygame.display.flip()
+            self.full_update = False
+        else:
+            pygame.display.update(rects + overdrawn)
+        self.overdrawn = overdrawn
@@ -0,0 +1,262 @@
+# replay.py - Compact binary input recordings and headless replay
+import argparse
+import os
+import struct
+import time
+from config import *
+from game import Game
+from rng import MASK64
+
+# File layout: header, then one varint per event, then the trailer
+#   header:  magic, version, seed (u64), level (u16), tick rate (u16),
+#            ghost speed and ghost speed step (f64)
+#   event:   varint (delta << 2) | value, where delta is the number of
+#            ticks since the previous direction event (the first counts
+#            from tick -1, so a direction event always has delta >= 1)
+#            and value is the ACTION_* direction. Delta 0 marks a control
+#            event instead, with value one of the CONTROL_* codes; a reset
+#            is followed by a varint of its tick minus the previous
+#            direction event's tick.
+#   trailer: after CONTROL_END, varints of the final tick, score, level and
+#            pacman tile (y * width + x), checked when replaying
+REPLAY_MAGIC = b"PMRP"
+REPLAY_VERSION = 1
+HEADER = struct.Struct("<4sBQHHdd")
+
+# Control events (encoded with a tick delta of 0)
+CONTROL_RESET = 0  # Game.reset_game() was called (new level or restart), then the tick
+CONTROL_END = 1  # End of events, the trailer follows
+
+# Event kinds yielded when reading
+EVENT_ACTION = "action"
+EVENT_RESET = "reset"
+
+
+class ReplayError(Exception):
+    """Raised for malformed replays and replays that don't reproduce"""
+
+
+def write_varint(out, value):
+    """Append an unsigned LEB128 varint to a bytearray"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(stream):
+    """Read an unsigned LEB128 varint from a binary stream"""
+    value = 0
+    shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            raise ReplayError("Replay ends in the middle of an event")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def final_state(game):
+    """Get the values stored in the trailer, which a replay must reproduce"""
+    x, y = game.pacman.get_position()
+    return (game.ticks, game.pacman.score, game.level, y * game.grid_width + x)
+
+
+class ReplayRecorder:
+    """
+    Records the inputs of one game as it is played
+
+    Attach it to a Game before the game's first tick; the game then reports
+    every direction it applies and every reset_game() call. Several
+    directions given before the same tick collapse into the last one, since
+    that is the only one the tick sees.
+    """
+    def __init__(self, game):
+        if game.ticks or game.rng.state != game.rng.seed & MASK64:
+            raise ReplayError("A recorder must be attached before the game starts")
+        self.game = game
+        self.header = HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, game.rng.seed & MASK64, game.level, FPS,
+                                  game.ghost_speed, game.ghost_speed_step)
+        self.events = bytearray()
+        self.last_tick = -1  # Tick of the last written direction event
+        self.pending = None  # (tick, action) not written yet
+        self.event_count = 0
+        game.recorder = self
+
+    def _flush(self):
+        """Write the pending direction event"""
+        if self.pending is not None:
+            tick, action = self.pending
+            write_varint(self.events, ((tick - self.last_tick) << 2) | action)
+            self.last_tick = tick
+            self.pending = None
+
+    def record_action(self, tick, action):
+        """Record a direction (ACTION_UP..ACTION_RIGHT) applied before a tick"""
+        if self.pending is None or self.pending[0] != tick:
+            self._flush()
+            self.event_count += 1
+        self.pending = (tick, action)
+
+    def record_reset(self, tick):
+        """Record a reset_game() call"""
+        self._flush()
+        write_varint(self.events, CONTROL_RESET)
+        write_varint(self.events, tick - self.last_tick)
+        self.event_count += 1
+
+    def to_bytes(self):
+        """Get the finished recording, ending at the game's current tick"""
+        self._flush()
+        out = bytearray(self.header)
+        out += self.events
+        write_varint(out, CONTROL_END)
+        for value in final_state(self.game):
+            write_varint(out, value)
+        return bytes(out)
+
+    def save(self, path):
+        """Write the recording to a file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+
+class Replay:
+    """A recording read back from disk"""
+    def __init__(self, seed, level, tick_rate, ghost_speed, ghost_speed_step,
+                 events, final):
+        self.seed = seed
+        self.level = level
+        self.tick_rate = tick_rate
+        self.ghost_speed = ghost_speed
+        self.ghost_speed_step = ghost_speed_step
+        self.events = events  # List of (tick, EVENT_*, action or None)
+        self.final = final  # final_state() of the recorded game
+
+    @property
+    def total_ticks(self):
+        return self.final[0]
+
+    @property
+    def final_score(self):
+        return self.final[1]
+
+    @classmethod
+    def load(cls, path):
+        """Read a replay file"""
+        with open(path, "rb") as f:
+            header = read_header(f)
+            events = list(iter_events(f))
+            final = tuple(read_varint(f) for _ in range(4))
+        return cls(*header, events, final)
+
+
+def read_header(stream):
+    """
+    Read a replay header
+    Returns:
+        (seed, level, tick_rate, ghost_speed, ghost_speed_step)
+    """
+    data = stream.read(HEADER.size)
+    if len(data) != HEADER.size:
+        raise ReplayError("Replay header is truncated")
+    magic, version, *fields = HEADER.unpack(data)
+    if magic != REPLAY_MAGIC:
+        raise ReplayError("Not a replay file")
+    if version != REPLAY_VERSION:
+        raise ReplayError(f"Unsupported replay version {version}")
+    return tuple(fields)
+
+
+def iter_events(stream):
+    """
+    Stream the events of a replay whose header was already read
+    Yields (tick, EVENT_*, action or None) without holding the whole file,
+    and stops at CONTROL_END, leaving the stream at the trailer.
+    """
+    tick = -1  # Tick of the last direction event
+    while True:
+        value = read_varint(stream)
+        delta, code = value >> 2, value & 3
+        if delta:
+            tick += delta
+            yield tick, EVENT_ACTION, code
+        elif code == CONTROL_RESET:
+            yield tick + read_varint(stream), EVENT_RESET, None
+        elif code == CONTROL_END:
+            return
+        else:
+            raise ReplayError(f"Unknown control event {code}")
+
+
+def play(replay, game_options=None, verify=True):
+    """
+    Re-run a replay headless, as fast as possible
+    Args:
+        replay: Replay to run
+        game_options: Extra Game arguments, for games recorded with a
+            non-default ghost mode schedule
+        verify: Raise ReplayError if the game ends in a different state
+    Returns:
+        The Game at the end of the replay
+    """
+    game = Game(replay.seed, ghost_speed=replay.ghost_speed,
+                ghost_speed_step=replay.ghost_speed_step, **(game_options or {}))
+    game.level = replay.level
+    dt = 1.0 / replay.tick_rate
+
+    def run_until(tick):
+        while game.ticks < tick and game.state == GAME_RUNNING:
+            game.update(dt)
+
+    for tick, kind, action in replay.events:
+        run_until(tick)
+        if kind == EVENT_RESET:
+            game.reset_game()
+        else:
+            game.apply_action(action)
+    run_until(replay.total_ticks)
+
+    if verify and final_state(game) != replay.final:
+        raise ReplayError(
+            f"Replay diverged: ended at (tick, score, level, tile) {final_state(game)}, "
+            f"recorded {replay.final}"
+        )
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run recorded games headless and check they reproduce")
+    parser.add_argument("paths", nargs="+", help="replay files")
+    parser.add_argument("--info", action="store_true", help="only print the header and event count")
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.paths:
+        try:
+            replay = Replay.load(path)
+            if args.info:
+                print(f"{path}: seed {replay.seed}, level {replay.level}, {len(replay.events)} events, "
+                      f"{replay.total_ticks} ticks, score {replay.final_score}, "
+                      f"{os.path.getsize(path)} bytes")
+                continue
+            start = time.perf_counter()
+            game = play(replay)
+            elapsed = time.perf_counter() - start
+        except (OSError, ReplayError) as e:
+            print(f"{path}: {e}")
+            failed += 1
+            continue
+        rate = game.ticks / elapsed if elapsed > 0 else 0.0
+        print(f"{path}: OK, {game.ticks} ticks, score {game.pacman.score}, "
+              f"{elapsed:.2f}s ({rate:.0f} ticks/s)")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
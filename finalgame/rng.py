@@ -0,0 +1,46 @@
+# rng.py - Small seeded random generator that can also be stepped with NumPy
+import random
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+GAMMA = 0x9E3779B97F4A7C15
+
+
+def mix64(z):
+    """SplitMix64 output function"""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+class GameRandom:
+    """
+    SplitMix64 generator used for in-game randomness
+
+    Each draw is a pure function of (seed, draw count), so the batch
+    simulator can advance thousands of these in lockstep with NumPy and
+    still make exactly the same choices as the object model.
+    """
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.state = seed & MASK64
+
+    def next64(self):
+        """Get the next 64-bit output"""
+        self.state = (self.state + GAMMA) & MASK64
+        return mix64(self.state)
+
+    def random(self):
+        """Get a float in [0, 1)"""
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+    def randbelow(self, n):
+        """Get an integer in [0, n)"""
+        return self.next64() % n
+
+    def choice(self, seq):
+        """Pick an element of a non-empty sequence"""
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[self.randbelow(len(seq))]
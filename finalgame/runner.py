@@ -0,0 +1,136 @@
+# runner.py - Parallel, seeded episode runner for balance evaluation
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import *
+from rng import mix64
+from simulator import Simulator, random_policy
+
+# Balance settings an episode can override, with their defaults
+DEFAULT_BALANCE = {
+    "ghost_speed": GHOST_SPEED,
+    "ghost_speed_step": GHOST_SPEED_STEP,
+    "ghost_modes": None,  # None keeps Game's own schedule
+}
+
+
+def episode_seed(base_seed, index):
+    """Derive the seed of one episode from the run's base seed"""
+    return mix64((base_seed << 32) + index)
+
+
+def run_episode(seed, balance=None, max_levels=10, max_steps=20000):
+    """
+    Play one headless episode with a seeded random policy
+    Args:
+        seed: Seeds both the game and the policy
+        balance: Dictionary overriding DEFAULT_BALANCE entries
+        max_levels: Stop after clearing this many levels
+        max_steps: Stop after this many steps in total
+    Returns:
+        Dictionary with the seed, total score, level reached, frames and deaths
+    """
+    settings = dict(DEFAULT_BALANCE)
+    if balance:
+        settings.update(balance)
+
+    simulator = Simulator(seed=seed, game_options=settings)
+    game = simulator.game
+    policy = random_policy(seed)
+    score = 0
+    deaths = 0
+    lives = game.pacman.lives
+
+    while simulator.steps < max_steps:
+        simulator.step(policy(game))
+        if game.pacman.lives < lives:
+            deaths += lives - game.pacman.lives
+        lives = game.pacman.lives
+
+        if game.state == GAME_WON:
+            if game.level >= max_levels:
+                break
+            # A new level starts with a fresh Pacman, so bank the score
+            score += game.pacman.score
+            game.reset_game()
+            lives = game.pacman.lives
+        elif game.state == GAME_OVER:
+            break
+
+    return {
+        "seed": seed,
+        "score": score + game.pacman.score,
+        "level": game.level,
+        "frames": simulator.steps,
+        "deaths": deaths,
+        "won": game.state == GAME_WON,
+    }
+
+
+def _run_chunk(seeds, balance, max_levels, max_steps):
+    """Worker entry point: run a few episodes to amortize task overhead"""
+    return [run_episode(seed, balance, max_levels, max_steps) for seed in seeds]
+
+
+def run_episodes(count, base_seed=0, balance=None, workers=None, chunk_size=8,
+                 max_levels=10, max_steps=20000):
+    """
+    Run episodes over a process pool, yielding results as they finish
+    Args:
+        count: Number of episodes
+        base_seed: Seed the per-episode seeds are derived from
+        balance: Dictionary overriding DEFAULT_BALANCE entries
+        workers: Number of worker processes (defaults to the CPU count)
+        chunk_size: Episodes handed to a worker per task
+        max_levels: Passed on to run_episode
+        max_steps: Passed on to run_episode
+    Yields:
+        run_episode result dictionaries, each tagged with its episode index
+    """
+    seeds = [episode_seed(base_seed, index) for index in range(count)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for start in range(0, count, chunk_size):
+            chunk = seeds[start:start + chunk_size]
+            future = executor.submit(_run_chunk, chunk, balance, max_levels, max_steps)
+            futures[future] = start
+        for future in as_completed(futures):
+            for offset, result in enumerate(future.result()):
+                result["episode"] = futures[future] + offset
+                yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run seeded headless episodes in parallel")
+    parser.add_argument("--episodes", type=int, default=1000, help="number of episodes")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for the run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=8, help="episodes per worker task")
+    parser.add_argument("--ghost-speed", type=float, default=GHOST_SPEED, help="starting ghost speed")
+    parser.add_argument("--ghost-speed-step", type=float, default=GHOST_SPEED_STEP,
+                        help="ghost speed added per level")
+    parser.add_argument("--max-levels", type=int, default=10, help="levels before an episode stops")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    balance = {"ghost_speed": args.ghost_speed, "ghost_speed_step": args.ghost_speed_step}
+    start = time.perf_counter()
+    results = []
+    for result in run_episodes(args.episodes, args.seed, balance, args.workers,
+                               args.chunk_size, args.max_levels):
+        results.append(result)
+        if not args.quiet:
+            print(json.dumps(result))
+    elapsed = time.perf_counter() - start
+
+    episodes = len(results)
+    mean_score = sum(r["score"] for r in results) / episodes if episodes else 0.0
+    mean_level = sum(r["level"] for r in results) / episodes if episodes else 0.0
+    print(f"{episodes} episodes in {elapsed:.2f}s ({episodes / elapsed:.1f}/s) with "
+          f"{args.workers} workers: mean score {mean_score:.1f}, mean level {mean_level:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# sim_clock.py - Fixed-step simulation clock, decoupled from the render rate
+from config import *
+
+
+class FixedStepClock:
+    """
+    Turns variable frame times into a whole number of fixed simulation ticks
+
+    Real time is scaled by the fast-forward speed and added to an
+    accumulator, and every full step in it becomes one tick. What is left
+    over is the fraction of the next tick that has already elapsed (alpha),
+    which the renderer uses to interpolate entity positions between the
+    last two ticks.
+
+    Two limits stop a slow frame from snowballing: a frame counts for at
+    most max_frame_time seconds of real time (a window drag or a breakpoint
+    shouldn't be replayed at full speed afterwards), and at most
+    max_ticks_per_frame ticks run per frame, dropping the rest so the game
+    slows down instead of falling further behind.
+    """
+    def __init__(self, step=1.0 / FPS, max_frame_time=SIM_MAX_FRAME_TIME,
+                 max_ticks_per_frame=SIM_MAX_TICKS_PER_FRAME, speed=1.0):
+        self.step = step
+        self.max_frame_time = max_frame_time
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.speed = speed
+        self.accumulator = 0.0
+        self.ticks = 0  # Total ticks handed out
+        self.dropped = 0  # Ticks skipped by the catch-up limits
+
+    @property
+    def alpha(self):
+        """Fraction of the next tick already elapsed, in [0, 1)"""
+        return self.accumulator / self.step
+
+    def advance(self, frame_time):
+        """
+        Add one frame's worth of real time
+        Args:
+            frame_time: Seconds since the previous frame
+        Returns:
+            Number of ticks to run this frame
+        """
+        self.accumulator += min(frame_time, self.max_frame_time) * self.speed
+        ticks = int(self.accumulator / self.step)
+        if ticks > self.max_ticks_per_frame:
+            self.dropped += ticks - self.max_ticks_per_frame
+            ticks = self.max_ticks_per_frame
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.step
+        self.ticks += ticks
+        return ticks
+
+    def reset(self):
+        """Drop any partially accumulated tick"""
+        self.accumulator = 0.0
@@ -0,0 +1,159 @@
+# simulator.py - Headless simulation entry point (no pygame required)
+import argparse
+import random
+import time
+from config import *
+from game import Game
+from maze_io import load_maze
+
+
+def random_policy(seed=None, turn_chance=0.2):
+    """
+    Create a policy that keeps going and occasionally turns at random
+    Args:
+        seed: Seed for the policy's own random generator
+        turn_chance: Chance per step of picking a new direction
+    Returns:
+        Callable taking a Game and returning an ACTION_* value
+    """
+    rng = random.Random(seed)
+
+    def policy(game):
+        if rng.random() < turn_chance:
+            return rng.choice([ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT])
+        return ACTION_NONE
+
+    return policy
+
+
+def pellet_policy(seed=None, danger=3, turn_chance=0.05):
+    """
+    Create a policy that eats its way through the maze and runs from ghosts
+    It heads for the nearest pellet, except that when a ghost that can
+    catch it is within danger steps it takes the open neighbor farthest
+    from such ghosts. It needs the game's maze tables, and falls back to
+    random_policy's moves on mazes without them.
+    Args:
+        seed: Seed for the policy's own random generator
+        danger: Maze distance at which a ghost is run from
+        turn_chance: Chance per step of a random direction instead
+    Returns:
+        Callable taking a Game and returning an ACTION_* value
+    """
+    rng = random.Random(seed)
+
+    def policy(game):
+        analysis = game.maze_analysis
+        if analysis is None or rng.random() < turn_chance:
+            return rng.choice([ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT])
+        position = game.pacman.get_position()
+        threats = [ghost.get_position() for ghost in game.ghosts if not ghost.scared and not ghost.eaten]
+        threats = [ghost for ghost in threats
+                   if (analysis.distance(ghost, position) or danger + 1) <= danger]
+        if threats:
+            best_action, best_margin = ACTION_NONE, -1
+            for action, (dx, dy) in enumerate(DIRECTIONS):
+                step = (position[0] + dx, position[1] + dy)
+                distances = [analysis.distance(ghost, step) for ghost in threats]
+                if None in distances:
+                    continue
+                if min(distances) > best_margin:
+                    best_action, best_margin = action, min(distances)
+            return best_action
+        target, _ = game.nearest_pellet(position)
+        step = analysis.next_step(position, target) if target is not None else None
+        if step is None:
+            return ACTION_NONE
+        return DIRECTIONS.index((step[0] - position[0], step[1] - position[1]))
+
+    return policy
+
+
+class Simulator:
+    """Drives a Game with abstract actions and a fixed time step"""
+    def __init__(self, dt=1.0 / FPS, seed=None, game_options=None):
+        self.dt = dt
+        self.seed = seed
+        self.game_options = game_options or {}
+        self.game = None
+        self.steps = 0
+        self.reset()
+
+    def reset(self, seed=None):
+        """Start a fresh game, already running on level 1"""
+        if seed is not None:
+            self.seed = seed
+        self.game = Game(self.seed, **self.game_options)
+        self.game.state = GAME_RUNNING
+        self.steps = 0
+        return self.game
+
+    @property
+    def done(self):
+        """Whether the game has ended (won or lost)"""
+        return self.game.state in (GAME_OVER, GAME_WON)
+
+    def step(self, action=ACTION_NONE):
+        """Apply an action and advance the game by one fixed time step"""
+        self.game.apply_action(action)
+        self.game.update(self.dt)
+        self.steps += 1
+        return self.game.state
+
+    def run(self, policy=None, max_steps=10000):
+        """
+        Step the game as fast as possible until it ends or max_steps is hit
+        Args:
+            policy: Callable taking the Game and returning an ACTION_* value,
+                or None to send ACTION_NONE every step
+            max_steps: Upper bound on the number of steps
+        Returns:
+            Dictionary with the outcome and steps per second
+        """
+        start_steps = self.steps
+        start_time = time.perf_counter()
+        while not self.done and self.steps - start_steps < max_steps:
+            action = policy(self.game) if policy else ACTION_NONE
+            self.step(action)
+        elapsed = time.perf_counter() - start_time
+
+        steps = self.steps - start_steps
+        return {
+            "steps": steps,
+            "seconds": elapsed,
+            "steps_per_second": steps / elapsed if elapsed > 0 else 0.0,
+            "state": self.game.state,
+            "score": self.game.pacman.score,
+            "lives": self.game.pacman.lives,
+            "level": self.game.level,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Pac-Man headless and report steps per second")
+    parser.add_argument("--steps", type=int, default=10000, help="total steps to simulate")
+    parser.add_argument("--dt", type=float, default=1.0 / FPS, help="fixed time step in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random policy")
+    parser.add_argument("--maze", default=None, help="maze file to play instead of config.MAZE")
+    args = parser.parse_args()
+
+    game_options = {"layout": load_maze(args.maze)} if args.maze else None
+    simulator = Simulator(dt=args.dt, game_options=game_options)
+    policy = random_policy(args.seed)
+    total_steps = 0
+    total_time = 0.0
+    episodes = 0
+    while total_steps < args.steps:
+        result = simulator.run(policy, max_steps=args.steps - total_steps)
+        total_steps += result["steps"]
+        total_time += result["seconds"]
+        episodes += 1
+        simulator.reset()
+
+    rate = total_steps / total_time if total_time > 0 else 0.0
+    print(f"{total_steps} steps over {episodes} episodes in {total_time:.2f}s "
+          f"({rate:.0f} steps/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# sprite_atlas.py - Packing sprite frames into one sheet, cached on disk
+import json
+import os
+import pygame
+from config import TILE_SIZE
+
+# Bump when the procedural sprites change, so stale cached sheets are ignored
+ATLAS_VERSION = 1
+
+# Where built sheets are kept between launches
+SPRITE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sprite_cache")
+
+# Frames per row of the sheet
+ATLAS_COLUMNS = 8
+
+
+class SpriteAtlas:
+    """
+    One texture sheet holding every sprite frame, on a TILE_SIZE grid
+
+    Frames are served as subsurfaces of the sheet, so converting the sheet
+    to the display format once converts every frame.
+    """
+    def __init__(self, sheet, names, tile_size=TILE_SIZE):
+        self.sheet = sheet
+        self.names = list(names)
+        self.tile_size = tile_size
+        self.frames = {}
+
+    @classmethod
+    def pack(cls, surfaces, tile_size=TILE_SIZE):
+        """
+        Build an atlas from frames
+        Args:
+            surfaces: Dictionary of frame name to tile_size x tile_size surface,
+                in the order they should be laid out
+            tile_size: Size of one frame
+        Returns:
+            SpriteAtlas holding copies of the frames
+        """
+        rows = (len(surfaces) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+        sheet = pygame.Surface((ATLAS_COLUMNS * tile_size, max(rows, 1) * tile_size), pygame.SRCALPHA)
+        atlas = cls(sheet, surfaces.keys(), tile_size)
+        for name, surface in surfaces.items():
+            sheet.blit(surface, atlas.rect(name))
+        return atlas
+
+    @staticmethod
+    def _paths(cache_dir, tile_size):
+        """Get the pixel and index file paths of a cached sheet"""
+        base = os.path.join(cache_dir, f"atlas_{tile_size}_v{ATLAS_VERSION}")
+        return base + ".rgba", base + ".json"
+
+    @classmethod
+    def load(cls, names, cache_dir=SPRITE_CACHE_DIR, tile_size=TILE_SIZE):
+        """
+        Load a cached sheet
+        Args:
+            names: Frame names the caller expects, in layout order
+            cache_dir: Directory the sheet was saved in
+            tile_size: Size of one frame
+        Returns:
+            SpriteAtlas, or None if there is no usable cached sheet
+        """
+        pixels_path, index_path = cls._paths(cache_dir, tile_size)
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+            if index["names"] != list(names):
+                return None
+            with open(pixels_path, "rb") as f:
+                pixels = f.read()
+            sheet = pygame.image.frombytes(pixels, tuple(index["size"]), "RGBA")
+        except (OSError, ValueError, KeyError, TypeError, pygame.error):
+            return None
+        return cls(sheet, names, tile_size)
+
+    def save(self, cache_dir=SPRITE_CACHE_DIR):
+        """
+        Write the sheet to the cache, returning False if that isn't possible
+        Pixels are stored raw rather than as PNG: loading them is a plain
+        read, where decoding a PNG costs about as much as drawing the
+        sprites again.
+        """
+        pixels_path, index_path = self._paths(cache_dir, self.tile_size)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(pixels_path, "wb") as f:
+                f.write(pygame.image.tobytes(self.sheet, "RGBA"))
+            with open(index_path, "w") as f:
+                json.dump({"size": list(self.sheet.get_size()), "names": self.names}, f)
+        except (OSError, pygame.error):
+            return False
+        return True
+
+    def convert(self):
+        """Convert the sheet to the display format (needs a display mode set)"""
+        if pygame.display.get_surface() is not None:
+            self.sheet = self.sheet.convert_alpha()
+            self.frames.clear()
+
+    def rect(self, name):
+        """Get the area of a frame on the sheet"""
+        index = self.names.index(name)
+        row, column = divmod(index, ATLAS_COLUMNS)
+        return pygame.Rect(column * self.tile_size, row * self.tile_size,
+                           self.tile_size, self.tile_size)
+
+    def get(self, name):
+        """Get a frame as a subsurface of the sheet"""
+        frame = self.frames.get(name)
+        if frame is None:
+            frame = self.sheet.subsurface(self.rect(name))
+            self.frames[name] = frame
+        return frame
+
+    def get_opaque(self, name):
+        """
+        Get a fully opaque frame without per-pixel alpha, in the display format
+        Blitting it skips alpha blending, which matters for tiles like walls.
+        """
+        key = (name, "opaque")
+        frame = self.frames.get(key)
+        if frame is None:
+            frame = self.get(name)
+            frame = frame.convert() if pygame.display.get_surface() is not None else frame.copy()
+            self.frames[key] = frame
+        return frame
@@ -2,16 +2,60 @@
 import pygame
 import os
 from config import TILE_SIZE
+from sprite_atlas import SPRITE_CACHE_DIR, SpriteAtlas
+
+# Atlas frame names for each pacman direction
+PACMAN_DIRECTIONS = {(1, 0): "right", (-1, 0): "left", (0, -1): "up", (0, 1): "down"}
+# Distinct pacman frames (closed, half-open, open) and the order they animate in
+PACMAN_FRAMES = 3
+PACMAN_ANIMATION = [0, 1, 2, 1]
+GHOST_NAMES = ["blinky", "pinky", "inky", "clyde"]
+
+def frame_names():
+    """Get the names of all atlas frames, in layout order"""
+    names = [f"pacman_{direction}_{i}" for direction in PACMAN_DIRECTIONS.values()
+             for i in range(PACMAN_FRAMES)]
+    names += [f"ghost_{name}" for name in GHOST_NAMES]
+    names += ["ghost_scared", "wall", "pellet", "power_pellet"]
+    return names
 
 class SpriteLoader:
-    def __init__(self):
-        # Create placeholder graphics
-        self.pacman_sprites = self._create_pacman_sprites()
-        self.ghost_sprites = self._create_ghost_sprites()
-        self.wall_sprite = self._create_wall_sprite()
-        self.pellet_sprite = self._create_pellet_sprite()
-        self.power_pellet_sprite = self._create_power_pellet_sprite()
-        self.scared_ghost_sprite = self.create_scared_ghost_sprite()  # Remove the underscore
+    def __init__(self, cache_dir=SPRITE_CACHE_DIR):
+        # Reuse the sheet from an earlier launch, or draw and pack the sprites
+        self.atlas = SpriteAtlas.load(frame_names(), cache_dir) if cache_dir else None
+        self.from_cache = self.atlas is not None
+        if self.atlas is None:
+            self.atlas = SpriteAtlas.pack(self._create_frames())
+            if cache_dir:
+                self.atlas.save(cache_dir)
+        self.atlas.convert()
+        
+        atlas = self.atlas
+        self.pacman_sprites = {
+            direction: [atlas.get(f"pacman_{name}_{i}") for i in PACMAN_ANIMATION]
+            for direction, name in PACMAN_DIRECTIONS.items()
+        }
+        self.ghost_sprites = {name: atlas.get(f"ghost_{name}") for name in GHOST_NAMES}
+        self.wall_sprite = atlas.get_opaque("wall")
+        self.pellet_sprite = atlas.get("pellet")
+        self.power_pellet_sprite = atlas.get("power_pellet")
+        self.scared_ghost_sprite = atlas.get("ghost_scared")
+    
+    def _create_frames(self):
+        """Draw every sprite procedurally, keyed by atlas frame name"""
+        frames = {}
+        pacman_sprites = self._create_pacman_sprites()
+        for direction, name in PACMAN_DIRECTIONS.items():
+            for i in range(PACMAN_FRAMES):
+                frames[f"pacman_{name}_{i}"] = pacman_sprites[direction][i]
+        ghost_sprites = self._create_ghost_sprites()
+        for name in GHOST_NAMES:
+            frames[f"ghost_{name}"] = ghost_sprites[name]
+        frames["ghost_scared"] = self.create_scared_ghost_sprite()
+        frames["wall"] = self._create_wall_sprite()
+        frames["pellet"] = self._create_pellet_sprite()
+        frames["power_pellet"] = self._create_power_pellet_sprite()
+        return frames
         
     def _create_pacman_sprites(self):
         """Create pacman animation sprites"""